@@ -55,6 +55,10 @@ logger = logging.getLogger('signac-benchmark')
 COMPLEXITY = {
     'iterate': 'N',
     'iterate_single_pass': 'N',
+    'iterate_load_sp': 'N',
+    'iterate_load_doc': 'N',
+    'iterate_load_doc_buffered': 'N',
+    'open_by_statepoint': 'N',
     'search_lean_filter': 'N',
     'search_rich_filter': 'N',
     'determine_len': 'N',
@@ -216,6 +220,18 @@ def benchmark_project(project, keys=None):
 
     run('iterate_single_pass', Timer("list(project)", setup), number=1)
 
+    run('iterate_load_sp', Timer("[job.sp() for job in project]", setup), 3, 10)
+
+    run('iterate_load_doc', Timer("[job.doc() for job in project]", setup), 3, 10)
+
+    run('iterate_load_doc_buffered', Timer(
+        stmt="with signac.buffered():\n    [job.doc() for job in project]",
+        setup=setup), 3, 10)
+
+    run('open_by_statepoint', Timer(
+        stmt="[project.open_job(sp) for sp in statepoints]",
+        setup=setup + "statepoints = [job.statepoint() for job in project]"), 3, 10)
+
     run('search_lean_filter', Timer(
         stmt="len(project.find_jobs(f))",
         setup=setup +
@@ -305,6 +321,29 @@ def main_run(args):
         store_result(key, doc)
 
 
+def main_collection(args):
+    random.seed(args.seed)
+    docs = [_make_doc(i, args.num_keys, args.data_size) for i in range(args.N)]
+    with TemporaryDirectory(dir=args.root) as tmp:
+        for filename in ('collection.txt', 'collection.txt.gz'):
+            fn = os.path.join(tmp, filename)
+            with signac.Collection.open(fn, 'wb') as c:
+                c.update(docs)
+            print("{} (N={}, {:.1f} MB):".format(filename, args.N, size(fn) / 1e6))
+            baseline = None
+            for workers in args.workers:
+                timer = Timer(
+                    stmt="Collection.open(fn, 'rb', workers=workers).close()",
+                    setup="from signac import Collection; fn = {!r}; workers = {}".format(
+                        fn, workers))
+                runtime = min(t for n, t in timer.repeat(repeat=3, number=1))
+                if baseline is None:
+                    baseline = runtime
+                print("  workers={:<3} {:8.3f} s {:12.0f} docs/s {:8.1f} MB/s  {:.2f}x".format(
+                    workers, runtime, args.N / runtime, size(fn) / 1e6 / runtime,
+                    baseline / runtime))
+
+
 def strip_complexity(cat):
     if len(cat) > 1 and cat[1] == '_':
         return COMPLEXITY[cat[2:]], cat[2:]
@@ -328,6 +367,10 @@ def tr(s):
         'determine_len': "Determine N",
         'iterate': "Iterate (multiple passes)",
         'iterate_single_pass': "Iterate (single pass)",
+        'iterate_load_sp': "Iterate and load state point",
+        'iterate_load_doc': "Iterate and load document",
+        'iterate_load_doc_buffered': "Iterate and load document (buffered)",
+        'open_by_statepoint': "Open by state point",
         'search_lean_filter': "Search w/ lean filter",
         'search_rich_filter': "Search w/ rich filter",
         'datreant.core': "datreant",
@@ -503,6 +546,31 @@ if __name__ == '__main__':
              "is above this value.")
     parser_compare.set_defaults(func=main_compare)
 
+    parser_collection = subparsers.add_parser(
+        name='collection',
+        description="Measure the throughput of opening collection files with "
+                    "a varying number of parser processes.")
+    parser_collection.add_argument(
+        '-N', type=int, default=100000,
+        help="The number of documents within the collection (default=100000).")
+    parser_collection.add_argument(
+        '-k', '--num-keys', type=int, default=10,
+        help="The number of keys per document.")
+    parser_collection.add_argument(
+        '-s', '--data-size', type=int, default=10,
+        help="The mean data size per key.")
+    parser_collection.add_argument(
+        '-w', '--workers', type=int, nargs='+', default=[1, 2, 4, 8],
+        help="The number of worker processes to test (default: 1 2 4 8).")
+    parser_collection.add_argument(
+        '-r', '--seed', type=int, default=0,
+        help="The random seed to use.")
+    parser_collection.add_argument(
+        '--root', type=str,
+        help="Specify the root directory for the temporary directory. "
+             "Defaults to the system default temp directory.")
+    parser_collection.set_defaults(func=main_collection)
+
     args = parser.parse_args()
 
     logging.basicConfig(level=logging.INFO)
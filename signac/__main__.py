@@ -35,6 +35,7 @@ from .common.tqdm import tqdm
 from .contrib.utility import query_yes_no, prompt_password, add_verbosity_argument
 from .contrib.filterparse import parse_filter_arg
 from .contrib.import_export import export_jobs, _SchemaPathEvaluationError
+from .contrib.server import IndexServer, query_server
 from .errors import DestinationExistsError
 from .sync import FileSync
 from .sync import DocSync
@@ -190,7 +191,7 @@ def _open_job_by_id(project, job_id):
         return project.open_job(id=job_id)
     except KeyError:
         close_matches = difflib.get_close_matches(
-            job_id, [jid[:len(job_id)] for jid in project.find_job_ids()])
+            job_id, sorted({jid[:len(job_id)] for jid in project.find_job_ids()}))
         msg = "Did not find job corresponding to id '{}'.".format(job_id)
         if len(close_matches) == 1:
             msg += " Did you mean '{}'?".format(close_matches[0])
@@ -224,6 +225,10 @@ def find_with_filter(args):
 
     f = parse_filter_arg(args.filter)
     df = parse_filter_arg(args.doc_filter)
+    if index is None:
+        job_ids = query_server(project, 'find', filter=f, doc_filter=df)
+        if job_ids is not None:
+            return job_ids
     return get_project().find_job_ids(index=index, filter=f, doc_filter=df)
 
 
@@ -403,12 +408,33 @@ def main_init(args):
 
 def main_schema(args):
     project = get_project()
-    print(project.detect_schema(
+    subset = find_with_filter_or_none(args)
+    schema = query_server(
+        project, 'schema',
         exclude_const=args.exclude_const,
-        subset=find_with_filter_or_none(args)).format(
-            depth=args.depth,
-            precision=args.precision,
-            max_num_range=args.max_num_range))
+        subset=None if subset is None else list(subset),
+        depth=args.depth,
+        precision=args.precision,
+        max_num_range=args.max_num_range)
+    if schema is None:
+        schema = project.detect_schema(
+            exclude_const=args.exclude_const,
+            subset=subset).format(
+                depth=args.depth,
+                precision=args.precision,
+                max_num_range=args.max_num_range)
+    print(schema)
+
+
+def main_serve(args):
+    project = get_project()
+    server = IndexServer(project, poll_interval=args.poll_interval or None)
+    _print_err("Serving project '{}' on '{}'. Press Ctrl-C to stop.".format(
+        project, server.filename))
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        _print_err("Stopped.")
 
 
 def main_sync(args):
@@ -1366,6 +1392,19 @@ def main():
         help="Detect schema only for jobs with the given job ids.")
     parser_schema.set_defaults(func=main_schema)
 
+    parser_serve = subparsers.add_parser(
+        'serve',
+        description="""Serve the project's index from a local daemon process. While the
+server is running, the find, schema, and view commands query the server instead
+of reading the project's metadata from the workspace.""")
+    parser_serve.add_argument(
+        '-p', '--poll-interval',
+        type=float,
+        default=5,
+        help="The number of seconds between two refreshes of the index, "
+             "defaults to 5. A value of 0 disables the periodic refresh.")
+    parser_serve.set_defaults(func=main_serve)
+
     parser_shell = subparsers.add_parser('shell')
     parser_shell.add_argument(
         'file',
@@ -53,6 +53,9 @@ cfg = """
 workspace_dir = string(default='workspace')
 project = string()
 signac_version = version(default='0,1,0')
+workspace_listing_ttl = float(min=0)
+index_parallel = integer(min=1)
+document_read_cache = boolean()
 
 [General]
 default_host = string()
@@ -13,12 +13,22 @@
 #
 # [1]: https://github.com/mongodb/mongo-python-driver
 import argparse
+import errno
+import hashlib
 import io
 import logging
+import mmap
 import operator
+import os
 import re
+import struct
 import sys
+import zlib
+from bisect import bisect_left, bisect_right, insort
+from functools import partial
 from itertools import islice
+from multiprocessing import Pool
+from math import isinf, isnan
 from numbers import Number
 
 from ..core import json
@@ -44,6 +54,25 @@ _INDEX_OPERATORS = ('$eq', '$gt', '$gte', '$lt', '$lte', '$ne',
                     '$in', '$nin', '$regex', '$type', '$where',
                     '$near')
 
+# These operators are evaluated with a sorted index where possible.
+_SORTED_INDEX_OPERATORS = ('$eq', '$gt', '$gte', '$lt', '$lte', '$near')
+
+# The size of the blocks at the beginning and end of a collection file,
+# which are checksummed to validate persisted index files.
+_SIGNATURE_BLOCK_SIZE = 64 * 1024
+
+# The key of journal records, which mark the deletion of a document.
+_JOURNAL_TOMBSTONE = '$deleted'
+
+# The approximate uncompressed size of each gzip member of a compressed
+# collection file and of each chunk of a file parsed by the parallel loader.
+_CHUNK_SIZE = 4 * 1024 * 1024
+
+# The header of gzip members with an extra field, which contains the size of
+# the member in the subfield with this id.
+_GZIP_HEADER = b'\x1f\x8b\x08\x04'
+_GZIP_SIZE_SUBFIELD = b'SG'
+
 _TYPES = {
     'int': int,
     'float': float,
@@ -73,6 +102,13 @@ def _to_tuples(l):
         return l
 
 
+def _to_lists(t):
+    if type(t) is tuple:
+        return [_to_lists(_) for _ in t]
+    else:
+        return t
+
+
 class _DictPlaceholder(object):
     pass
 
@@ -168,9 +204,13 @@ class _TypedSetDefaultDict(dict):
 
 
 def _build_index(docs, key, primary_key):
-    "Build an index for 'key'; highly performance critical code path."
+    """Build an index for 'key'; highly performance critical code path.
+
+    Returns the index and a mapping of ids to the indexed values.
+    """
     nodes = key.split('.')
     index = _TypedSetDefaultDict()
+    values = dict()
 
     for doc in docs:
         try:
@@ -190,9 +230,10 @@ def _build_index(docs, key, primary_key):
             if type(v) is dict:
                 continue
             elif type(v) is list:   # performance
-                index[_to_tuples(v)].add(doc[primary_key])
-            else:
-                index[v].add(doc[primary_key])
+                v = _to_tuples(v)
+            _id = doc[primary_key]
+            index[v].add(_id)
+            values[_id] = v
 
         if len(nodes) > 1:
             try:
@@ -211,58 +252,373 @@ def _build_index(docs, key, primary_key):
                     index[_to_tuples(v)].add(doc[primary_key])
                 else:
                     index[v].add(doc[primary_key])
-    return index
+    return index, values
+
+
+def _file_signature(filename):
+    """Return the signature of a file used to validate persisted indexes.
+
+    The signature consists of the file's size, modification time, inode number,
+    and a checksum of the file's first and last block.
+    """
+    stat = os.stat(filename)
+    with open(filename, 'rb') as file:
+        checksum = zlib.crc32(file.read(_SIGNATURE_BLOCK_SIZE))
+        if stat.st_size > _SIGNATURE_BLOCK_SIZE:
+            file.seek(max(_SIGNATURE_BLOCK_SIZE, stat.st_size - _SIGNATURE_BLOCK_SIZE))
+            checksum = zlib.crc32(file.read(), checksum)
+    return [stat.st_size, stat.st_mtime, stat.st_ino, checksum & 0xffffffff]
+
+
+def _dump_index(index):
+    "Return a JSON-encodable representation of an index."
+    values = []
+    dicts = []
+    for value, group in index.items():
+        if value is _DictPlaceholder:
+            dicts = list(group)
+        else:
+            values.append([value, list(group)])
+    return dict(values=values, dicts=dicts)
+
+
+def _load_index(data):
+    "Restore an index and the mapping of ids to the indexed values from its representation."
+    index = _TypedSetDefaultDict()
+    values = dict()
+    for value, ids in data['values']:
+        value = _to_tuples(value)
+        index[value] = set(ids)
+        for _id in ids:
+            values[_id] = value
+    if data['dicts']:
+        index[_DictPlaceholder] = set(data['dicts'])
+        for _id in data['dicts']:
+            values[_id] = _DictPlaceholder
+    return index, values
+
+
+def _gzip_member(data, compresslevel):
+    """Compress data into a single gzip member.
+
+    The size of the member is stored in the extra field of its header, such
+    that the members of a file can be located without decompressing them.
+    """
+    compressor = zlib.compressobj(compresslevel, zlib.DEFLATED, -zlib.MAX_WBITS)
+    body = compressor.compress(data) + compressor.flush()
+    extra_length = len(_GZIP_SIZE_SUBFIELD) + 6
+    size = 12 + extra_length + len(body) + 8
+    return b''.join((
+        _GZIP_HEADER, struct.pack('<IBBH', 0, 0, 255, extra_length),
+        _GZIP_SIZE_SUBFIELD, struct.pack('<HI', 4, size),
+        body, struct.pack('<II', zlib.crc32(data) & 0xffffffff, len(data) & 0xffffffff)))
+
+
+def _gzip_member_chunks(filename):
+    """Return the offsets of all gzip members of a file as a list of tuples.
+
+    Returns None if the size of any member is unknown, e.g., because the file
+    was written by a different gzip implementation.
+    """
+    chunks = []
+    start = 0
+    size = os.path.getsize(filename)
+    with open(filename, 'rb') as file:
+        while start < size:
+            file.seek(start)
+            header = file.read(12)
+            if len(header) < 12 or header[:4] != _GZIP_HEADER:
+                return None
+            extra = file.read(struct.unpack('<H', header[10:12])[0])
+            i = 0
+            while i + 4 <= len(extra):
+                subfield_id = extra[i:i + 2]
+                subfield_length = struct.unpack('<H', extra[i + 2:i + 4])[0]
+                if subfield_id == _GZIP_SIZE_SUBFIELD and subfield_length == 4:
+                    end = start + struct.unpack('<I', extra[i + 4:i + 8])[0]
+                    break
+                i += 4 + subfield_length
+            else:
+                return None
+            chunks.append((start, end))
+            start = end
+    return chunks
+
+
+def _text_chunks(filename):
+    "Split a file into chunks of approximately _CHUNK_SIZE bytes on line boundaries."
+    chunks = []
+    start = 0
+    size = os.path.getsize(filename)
+    with open(filename, 'rb') as file:
+        while start < size:
+            end = start + _CHUNK_SIZE
+            if end < size:
+                file.seek(end)
+                file.readline()
+                end = file.tell()
+            else:
+                end = size
+            chunks.append((start, end))
+            start = end
+    return chunks
+
+
+def _ends_with_newline(filename):
+    "Return True if the file is empty or its last byte is a newline."
+    with open(filename, 'rb') as file:
+        file.seek(0, io.SEEK_END)
+        if file.tell() == 0:
+            return True
+        file.seek(-1, io.SEEK_END)
+        return file.read(1) == b'\n'
+
 
+def _load_lines(lines, journal=False):
+    """Yield the documents decoded from the lines of a collection file.
 
-def _find_with_index_operator(index, op, argument):
+    In journal mode, a last line without trailing newline that cannot be
+    decoded is the torn record of an interrupted flush and ignored.
+    """
+    for line in lines:
+        try:
+            yield json.loads(line)
+        except ValueError:
+            if journal and not line.endswith('\n'):
+                logger.warning("Ignoring torn journal record at the end of the collection file.")
+                return
+            raise
+
+
+def _primary_key_regex(primary_key):
+    "Return a regular expression matching the string-valued key on any level of a document."
+    return re.compile(
+        br'[{,]\s*"' + re.escape(primary_key.encode('utf-8')) + br'"\s*:\s*("(?:[^"\\]|\\.)*")')
+
+
+def _scan_primary_key(line, regex):
+    """Return the primary key of a JSON-encoded document or None if it must be decoded.
+
+    Quotes within strings are escaped, which is why the regular expression
+    only matches actual keys. A match is only accepted if it is unique and
+    on the top level of the document, which is certain if it is neither
+    preceded by any bracket nor followed by anything but the end of the
+    document.
+    """
+    if not line.startswith(b'{'):
+        return None
+    matches = list(regex.finditer(line))
+    if len(matches) != 1:
+        return None
+    match = matches[0]
+    prefix = line[1:match.start() + 1]
+    if (b'{' in prefix or b'[' in prefix) and line[match.end():].strip() != b'}':
+        return None
+    return json.loads(match.group(1).decode('utf-8'))
+
+
+def _parse_chunk(args):
+    "Parse the documents of one chunk of a collection file; executed by the parallel loader."
+    filename, start, end, compressed, journal = args
+    with open(filename, 'rb') as file:
+        file.seek(start)
+        data = file.read(end - start)
+    if compressed:
+        data = zlib.decompress(data, 16 + zlib.MAX_WBITS)
+    lines = [line + '\n' for line in data.decode('utf-8').split('\n')]
+    lines[-1] = lines[-1][:-1]
+    if not lines[-1]:
+        lines.pop()
+    return [Collection._validate_doc(doc) for doc in _load_lines(lines, journal)]
+
+
+def _parse_parallel(filename, chunks, compressed, workers, journal=False):
+    "Yield the documents of all chunks of a collection file parsed in a process pool."
+    pool = Pool(workers)
+    try:
+        tasks = [(filename, start, end, compressed, journal) for start, end in chunks]
+        for docs in pool.imap(_parse_chunk, tasks):
+            for doc in docs:
+                yield doc
+        pool.close()
+    finally:
+        pool.terminate()
+
+
+def _parse_near_argument(argument):
+    "Return the value, the relative, and the absolute tolerance of a $near expression."
+    rel_tol, abs_tol = 1e-9, 0.0  # default values
+    if isinstance(argument, (list, tuple)):
+        if len(argument) == 1:
+            argument = argument[0]
+        elif len(argument) == 2:
+            argument, rel_tol = argument
+        elif len(argument) == 3:
+            argument, rel_tol, abs_tol = argument
+        else:
+            err_msg = 'The argument of the $near operator must be a float '
+            err_msg += 'or a list of floats with length 1, 2, or 3.'
+            raise ValueError(err_msg)
+    return float(argument), float(rel_tol), float(abs_tol)
+
+
+def _is_number(value):
+    "Return True if value is a number, but neither a boolean nor NaN."
+    return isinstance(value, Number) and type(value) is not bool and value == value
+
+
+class _SortedIndex(object):
+    """The sorted values of an index, partitioned by type.
+
+    Only numbers and strings are ordered with respect to values of the same
+    kind, which is why they are kept in separate partitions. Booleans are not
+    considered numbers, since they are sorted after all other values. A query is only
+    answered from a partition if all values of the index belong to it,
+    otherwise the caller must fall back to a linear scan of the index.
+    All values are stored as keys of the underlying index dict.
+    """
+    __slots__ = ('numbers', 'strings', 'num_other')
+
+    def __init__(self, values):
+        self.numbers = []
+        self.strings = []
+        self.num_other = 0
+        for value in values:
+            partition = self._partition(value)
+            if partition is None:
+                self.num_other += 1
+            else:
+                partition.append(value)
+        self.numbers.sort()
+        self.strings.sort()
+
+    def _partition(self, value):
+        if _is_number(value):
+            return self.numbers
+        elif isinstance(value, six.string_types):
+            return self.strings
+
+    def add(self, value):
+        "Add a new value of the index."
+        value = _float(value) if type(value) is float else value
+        partition = self._partition(value)
+        if partition is None:
+            self.num_other += 1
+        else:
+            insort(partition, value)
+
+    def remove(self, value):
+        "Remove a value, which was removed from the index."
+        value = _float(value) if type(value) is float else value
+        # A boolean may have been removed under the index key of an equal
+        # integer and vice versa, which is why numbers are also looked up for
+        # booleans and the other values are counted down for missing integers.
+        if isinstance(value, Number) and value == value:
+            partition = self.numbers
+        else:
+            partition = self._partition(value)
+        if partition is not None:
+            # Equal numbers are distinct values of an index if exactly one of
+            # them is a float.
+            i = bisect_left(partition, value)
+            while i < len(partition) and partition[i] == value:
+                if (type(partition[i]) is _float) == (type(value) is _float):
+                    del partition[i]
+                    return
+                i += 1
+        if partition is not self.strings:
+            self.num_other -= 1
+
+    def _values(self, argument):
+        "Return the partition of the argument, if all values of the index belong to it."
+        if _is_number(argument):
+            if not (self.strings or self.num_other):
+                return self.numbers
+        elif isinstance(argument, six.string_types):
+            if not (self.numbers or self.num_other):
+                return self.strings
+
+    def supports(self, op, argument):
+        "Return True if the operator expression can be answered from this index."
+        if op == '$near':
+            return self.find_near(*argument) is not None
+        return self._values(argument) is not None
+
+    def find(self, op, argument):
+        """Return the values matching the operator expression or None.
+
+        For the $near operator, the returned values are only candidates,
+        which must be checked by the caller.
+        """
+        values = self._values(argument)
+        if values is None:
+            return None
+        if op == '$eq':
+            return values[bisect_left(values, argument):bisect_right(values, argument)]
+        elif op == '$gt':
+            return values[bisect_right(values, argument):]
+        elif op == '$gte':
+            return values[bisect_left(values, argument):]
+        elif op == '$lt':
+            return values[:bisect_left(values, argument)]
+        elif op == '$lte':
+            return values[:bisect_right(values, argument)]
+
+    def find_near(self, argument, rel_tol, abs_tol):
+        "Return candidates for values close to argument or None."
+        if self.strings or self.num_other or not 0 <= rel_tol < 1 or abs_tol < 0:
+            return None
+        # A value v is close to a, if |v-a| <= max(rel_tol * max(|v|, |a|), abs_tol),
+        # which implies that |v-a| <= max(rel_tol * |a| / (1 - rel_tol), abs_tol).
+        # The window is widened to account for rounding errors.
+        width = max(rel_tol * abs(argument) / (1 - rel_tol), abs_tol)
+        width = width * (1 + 1e-6) + abs(argument) * 1e-15
+        lo, hi = argument - width, argument + width
+        if isinf(lo) or isinf(hi) or isnan(lo) or isnan(hi):
+            return None
+        return self.numbers[bisect_left(self.numbers, lo):bisect_right(self.numbers, hi)]
+
+
+def _index_operator(op, argument):
+    "Return a function that evaluates the operator expression for an index value."
     if op == '$in':
-        def op(value, argument):
+        def match(value):
             return value in argument
     elif op == '$nin':
-        def op(value, argument):
+        def match(value):
             return value not in argument
     elif op == '$regex':
-        def op(value, argument):
+        pattern = re.compile(argument)
+
+        def match(value):
             if isinstance(value, six.string_types):
-                return re.search(argument, value)
+                return pattern.search(value)
             else:
                 return False
     elif op == '$type':
-        def op(value, argument):
-            if argument in _TYPES:
-                t = _TYPES[argument]
-            else:
-                raise ValueError("Unknown argument for $type operator: '{}'.".format(argument))
+        if argument in _TYPES:
+            t = _TYPES[argument]
+        else:
+            raise ValueError("Unknown argument for $type operator: '{}'.".format(argument))
+
+        def match(value):
             return isinstance(value, t)
     elif op == '$where':
-        def op(value, argument):
-            return eval(argument)(value)
+        func = eval(argument)
+
+        def match(value):
+            return func(float(value) if type(value) is _float else value)
     elif op == '$near':
-        rel_tol, abs_tol = 1e-9, 0.0  # default values
-        if isinstance(argument, (list, tuple)):
-            if len(argument) == 1:
-                argument = argument[0]
-            elif len(argument) == 2:
-                argument, rel_tol = argument
-            elif len(argument) == 3:
-                argument, rel_tol, abs_tol = argument
-            else:
-                err_msg = 'The argument of the $near operator must be a float '
-                err_msg += 'or a list of floats with length 1, 2, or 3.'
-                raise ValueError(err_msg)
-        argument = float(argument)
-        rel_tol = float(rel_tol)
-        abs_tol = float(abs_tol)
-
-        def op(value, argument):
+        argument, rel_tol, abs_tol = _parse_near_argument(argument)
+
+        def match(value):
             return isclose(value, argument, rel_tol=rel_tol, abs_tol=abs_tol)
     else:
-        op = getattr(operator, {'$gte': '$ge', '$lte': '$le'}.get(op, op)[1:])
-    matches = set()
-    for value in index:
-        if op(value, argument):
-            matches.update(index[value])
-    return matches
+        # The comparison is reflected to avoid the overhead of a Python-level
+        # function call per value, e.g., 'value < argument' is 'argument > value'.
+        reflected = {'$gt': 'lt', '$gte': 'le', '$lt': 'gt', '$lte': 'ge'}.get(op, op[1:])
+        match = partial(getattr(operator, reflected), argument)
+    return match
 
 
 def _check_logical_operator_argument(op, argument):
@@ -272,15 +628,216 @@ def _check_logical_operator_argument(op, argument):
         raise ValueError("The argument of logical-operator '{}' cannot be empty!".format(op))
 
 
+class _Expression(object):
+    """A compiled (sub-)expression of a query plan.
+
+    The empty expression matches all documents, which means that its
+    negation matches none.
+    """
+    __slots__ = ('primary_key', 'equal', 'operators', 'exists', 'terms', 'not_', 'and_',
+                 'or_', 'match_all')
+
+    def __init__(self, expr, primary_key):
+        self.match_all = not len(expr)
+        expr = dict(expr)
+        self.primary_key = expr.pop(primary_key, None)
+        or_expressions = expr.pop('$or', None)
+        and_expressions = expr.pop('$and', None)
+        not_expression = expr.pop('$not', None)
+        equal, operators, exists, terms = [], [], [], []
+        for key, value in _traverse_filter(expr):
+            if '$' in key:
+                if key.count('$') > 1:
+                    raise KeyError("Bad operator expression '{}'.".format(key))
+                nodes = key.split('.')
+                op = nodes[-1]
+                if not op.startswith('$'):
+                    raise KeyError("Bad operator placement '{}'.".format(key))
+                key = '.'.join(nodes[:-1])
+                if op in _INDEX_OPERATORS:
+                    match = _index_operator(op, value)
+                    if op == '$near':
+                        value = _parse_near_argument(value)
+                    operators.append((key, op, value, match))
+                    terms.append(('_find_with_operator', operators[-1]))
+                elif op == '$exists':
+                    if not isinstance(value, bool):
+                        raise ValueError("The value of the '$exists' operator must be boolean.")
+                    exists.append((key, value))
+                    terms.append(('_find_exists', exists[-1]))
+                else:
+                    raise KeyError("Unknown expression-operator '{}'.".format(op))
+            else:
+                equal.append((key, value))
+                terms.append(('_find_equal', equal[-1]))
+        self.equal = tuple(equal)
+        self.operators = tuple(operators)
+        self.exists = tuple(exists)
+        # All terms in the order of the filter, see Collection._evaluate().
+        self.terms = tuple(terms)
+        self.not_ = None if not_expression is None else _compile(not_expression, primary_key)
+        if and_expressions is not None:
+            _check_logical_operator_argument('$and', and_expressions)
+            and_expressions = tuple(_compile(e, primary_key) for e in and_expressions)
+        self.and_ = and_expressions
+        if or_expressions is not None:
+            _check_logical_operator_argument('$or', or_expressions)
+            or_expressions = tuple(_compile(e, primary_key) for e in or_expressions)
+        self.or_ = or_expressions
+
+
+def _compile(expr, primary_key):
+    "Compile a normalized filter expression."
+    return _Expression(expr, primary_key)
+
+
+class _QueryPlan(object):
+    """A compiled filter, which can be used in place of the filter for repeated searches.
+
+    Query plans are immutable and do not depend on the content of a collection.
+    Use :py:meth:`Collection.compile` to create a query plan.
+    """
+    __slots__ = ('_filter', '_primary_key', '_root')
+
+    def __init__(self, filter, primary_key='_id'):
+        self._filter = json.dumps(filter)
+        self._primary_key = primary_key
+        self._root = _compile(filter or {}, primary_key)
+
+    @property
+    def filter(self):
+        "The (normalized) filter of this query plan."
+        return json.loads(self._filter)
+
+    def __repr__(self):
+        return "{}(filter={})".format(type(self).__name__, self._filter)
+
+
+class _Projection(object):
+    """A parsed projection, which selects the fields of documents returned by a search.
+
+    The selected fields of a document are referenced, not copied, and only
+    the mappings along the path of a nested field are copied.
+    """
+    __slots__ = ('include', 'paths', 'primary_key', 'include_primary_key')
+
+    def __init__(self, projection, primary_key='_id'):
+        if isinstance(projection, Mapping):
+            fields = [key for key in projection if key != primary_key]
+            flags = set(bool(projection[key]) for key in fields)
+            if len(flags) > 1:
+                raise ValueError(
+                    "A projection can not mix the inclusion and exclusion of fields.")
+            include = flags.pop() if flags else bool(projection.get(primary_key, True))
+            include_primary_key = bool(projection.get(primary_key, True))
+        elif isinstance(projection, six.string_types):
+            raise TypeError("The projection must be a mapping or a sequence of keys.")
+        else:
+            fields = [key for key in projection if key != primary_key]
+            include = include_primary_key = True
+        for key in fields:
+            if not isinstance(key, six.string_types) or not key or '$' in key:
+                raise ValueError("Invalid key for projection: '{}'.".format(key))
+        paths = set(fields)
+        for key in paths:
+            nodes = key.split('.')
+            for i in range(1, len(nodes)):
+                if '.'.join(nodes[:i]) in paths:
+                    raise ValueError("Projection paths '{}' and '{}' collide.".format(
+                        '.'.join(nodes[:i]), key))
+        self.include = include
+        self.paths = tuple(tuple(key.split('.')) for key in sorted(paths))
+        self.primary_key = primary_key
+        self.include_primary_key = include_primary_key
+
+    def apply(self, doc):
+        "Return the projection of doc."
+        if self.include:
+            result = dict()
+            for nodes in self.paths:
+                src, dst = doc, result
+                for node in nodes[:-1]:
+                    src = src.get(node)
+                    if type(src) is not dict:
+                        break
+                    dst = dst.setdefault(node, dict())
+                else:
+                    if nodes[-1] in src:
+                        dst[nodes[-1]] = src[nodes[-1]]
+            if self.include_primary_key and self.primary_key in doc:
+                result[self.primary_key] = doc[self.primary_key]
+        else:
+            result = doc.copy()
+            for nodes in self.paths:
+                dst = result
+                for node in nodes[:-1]:
+                    value = dst.get(node)
+                    if type(value) is not dict:
+                        break
+                    dst[node] = dst = value.copy()
+                else:
+                    dst.pop(nodes[-1], None)
+            if not self.include_primary_key:
+                result.pop(self.primary_key, None)
+        return result
+
+
+def _parse_sort(sort):
+    "Return the sort argument as a list of (key, direction) tuples."
+    if isinstance(sort, six.string_types):
+        return [(sort, 1)]
+    result = []
+    for item in sort:
+        if isinstance(item, six.string_types):
+            key, direction = item, 1
+        else:
+            key, direction = item
+        if not isinstance(key, six.string_types):
+            raise ValueError("Invalid sort key '{}'.".format(key))
+        if direction not in (1, -1):
+            raise ValueError(
+                "The sort direction must be 1 (ascending) or -1 (descending), "
+                "got '{}'.".format(direction))
+        result.append((key, direction))
+    if not result:
+        raise ValueError("The sort argument can not be empty.")
+    return result
+
+
+def _sort_key(value):
+    """Return the key of an index value for sorting.
+
+    Values of different types are ordered like in MongoDB: null and missing values
+    first, followed by numbers, strings, mappings, lists, and booleans.
+    """
+    if value is None:
+        return (0, )
+    elif type(value) is bool:
+        return (5, value)
+    elif isinstance(value, Number):
+        return (1, value)
+    elif isinstance(value, six.string_types):
+        return (2, value)
+    elif value is _DictPlaceholder or isinstance(value, Mapping):
+        return (3, )
+    else:
+        return (4, tuple(_sort_key(v) for v in value))
+
+
 class _CollectionSearchResults(object):
     "Iterator for a Collection result vector."
 
-    def __init__(self, collection, _ids):
+    def __init__(self, collection, _ids, projection=None):
         self._collection = collection
         self._ids = _ids
+        self._projection = projection
 
     def __iter__(self):
-        return (self._collection[_id] for _id in self._ids)
+        if self._projection is None:
+            return (self._collection[_id] for _id in self._ids)
+        else:
+            docs = self._collection._docs
+            return (self._projection.apply(docs[_id]) for _id in self._ids)
 
     def __len__(self):
         return len(self._ids)
@@ -288,6 +845,46 @@ class _CollectionSearchResults(object):
     count = __len__
 
 
+class _LazyDocuments(Mapping):
+    """A read-only mapping of ids to documents, which are decoded on access.
+
+    The documents remain in the memory-mapped collection file and only the
+    offsets of each document's line are kept in memory.
+    """
+
+    def __init__(self, buffer, primary_key):
+        self._buffer = buffer
+        self._primary_key = primary_key
+        self._offsets = dict()
+
+    def __getitem__(self, _id):
+        start, end = self._offsets[_id]
+        doc = json.loads(self._buffer[start:end].decode('utf-8'))
+        doc.setdefault(self._primary_key, _id)
+        return doc
+
+    def __iter__(self):
+        return iter(self._offsets)
+
+    def __len__(self):
+        return len(self._offsets)
+
+    def __contains__(self, _id):
+        return _id in self._offsets
+
+    def _read_only(self, *args, **kwargs):
+        raise io.UnsupportedOperation(
+            "Collections opened with lazy=True are read-only.")
+
+    __setitem__ = __delitem__ = clear = _read_only
+
+    def close(self):
+        if isinstance(self._buffer, mmap.mmap):
+            self._buffer.close()
+        self._buffer = None
+        self._offsets = None
+
+
 class JSONParseError(ValueError):
     pass
 
@@ -348,12 +945,14 @@ class Collection(object):
         implies compression and is used by the underlying gzip implementation.
         Default value is 0 (no compression).
     """
+    MAX_CACHED_PLANS = 1000
+    "The maximum number of query plans that are cached by :py:meth:`~.compile`."
+
     def __init__(self, docs=None, primary_key='_id', compresslevel=0, _trust=False):
         if isinstance(docs, six.string_types):
             raise ValueError(
                 "First argument cannot be of str type. "
                 "Did you mean to use {}.open()?".format(type(self).__name__))
-        self.index_rebuild_threshold = 0.1
         self._primary_key = primary_key
         if compresslevel > 0:
             self._file = io.BytesIO()
@@ -363,6 +962,17 @@ class Collection(object):
         self._requires_flush = False
         self._dirty = set()
         self._indexes = dict()
+        self._index_values = dict()
+        self._sorted_indexes = dict()
+        self._plans = dict()
+        self._index_dir = None
+        self._index_signature = None
+        self._journal = False
+        self._requires_compaction = False
+        self._num_journal_records = 0
+        self._track_modified = False
+        self._modified = set()
+        self._persisted = set()
         self._next_default_id_ = None
         self._docs = dict()
         if docs is not None:
@@ -388,33 +998,150 @@ class Collection(object):
                 return _id
         raise RuntimeError("Unable to determine default id.")
 
+    def _remove_from_index(self, key, _id):
+        try:
+            value = self._index_values[key].pop(_id)
+        except KeyError:
+            return  # The document has no value for this key.
+        index = self._indexes[key]
+        group = index.get(value)
+        group.discard(_id)
+        if not group:
+            del index[value]
+            sorted_index = self._sorted_indexes.get(key)
+            if sorted_index is not None:
+                sorted_index.remove(value)
+
     def _remove_from_indexes(self, _id):
-        for index in self._indexes.values():
-            remove_keys = set()
-            for key, group in index.items():
-                if _id in group:    # faster than exception handling (performance)
-                    group.remove(_id)
-                if not len(group):
-                    remove_keys.add(key)
-            for key in remove_keys:
-                del index[key]
+        for key in self._indexes:
+            self._remove_from_index(key, _id)
+
+    def _reindex(self, key, ids):
+        "Update the index for key for the documents with the given ids."
+        for _id in ids:
+            self._remove_from_index(key, _id)
+        docs = [self._docs[_id] for _id in ids if _id in self._docs]
+        tmp, values = _build_index(docs, key, self._primary_key)
+        index = self._indexes[key]
+        sorted_index = self._sorted_indexes.get(key)
+        for v, group in tmp.items():
+            if sorted_index is not None and index.get(v) is None:
+                sorted_index.add(v)
+            index[v].update(group)
+        self._index_values[key].update(values)
 
     def _update_indexes(self):
         if self._dirty:
-            for _id in self._dirty:
-                self._remove_from_indexes(_id)
-            docs = [self[_id] for _id in self._dirty]
-            for key, index in self._indexes.items():
-                tmp = _build_index(docs, key, self._primary_key)
-                for v, group in tmp.items():
-                    index[v].update(group)
+            for key in self._indexes:
+                self._reindex(key, self._dirty)
             self._dirty.clear()
 
     def _build_index(self, key):
         logger.debug("Building index for key '{}'...".format(key))
-        self._indexes[key] = _build_index(self._docs.values(), key, self._primary_key)
+        self._indexes[key], self._index_values[key] = _build_index(
+            self._docs.values(), key, self._primary_key)
+        self._sorted_indexes.pop(key, None)
         logger.debug("Built index for key '{}'.".format(key))
 
+    def _sorted_index(self, key, index):
+        "Return the sorted index for key, which is built from the index if necessary."
+        try:
+            return self._sorted_indexes[key]
+        except KeyError:
+            logger.debug("Building sorted index for key '{}'...".format(key))
+            sorted_index = self._sorted_indexes[key] = _SortedIndex(dict.keys(index))
+            return sorted_index
+
+    def _index_filename(self, key):
+        return os.path.join(
+            self._index_dir, hashlib.md5(key.encode('utf-8')).hexdigest() + '.json')
+
+    def _read_index_file(self, filename):
+        "Read an index file, returns None if the file is missing, corrupted, or outdated."
+        try:
+            with open(filename, 'rb') as file:
+                data = json.loads(file.read().decode('utf-8'))
+        except (IOError, OSError) as error:
+            if error.errno != errno.ENOENT:
+                logger.warning("Unable to read index file '{}': {}".format(filename, error))
+            return None
+        except ValueError as error:
+            logger.warning("Ignoring corrupted index file '{}': {}".format(filename, error))
+            return None
+        if not isinstance(data, dict) or \
+                data.get('primary_key') != self._primary_key or \
+                data.get('signature') != self._index_signature:
+            logger.debug("Ignoring outdated index file '{}'.".format(filename))
+            return None
+        return data
+
+    def _load_persisted_index(self, key, data=None):
+        "Load the index for key from its index file, returns True if successful."
+        if self._index_signature is None:
+            return False
+        if data is None:
+            data = self._read_index_file(self._index_filename(key))
+            if data is None or data.get('key') != key:
+                return False
+        logger.debug("Loading index for key '{}'...".format(key))
+        try:
+            index, values = _load_index(data)
+        except (KeyError, TypeError, ValueError) as error:
+            logger.warning("Ignoring corrupted index file for key '{}': {}".format(key, error))
+            return False
+        self._indexes[key], self._index_values[key] = index, values
+        self._sorted_indexes.pop(key, None)
+        # Apply all modifications since the index file was written.
+        self._reindex(key, self._modified)
+        if not self._modified:
+            self._persisted.add(key)
+        return True
+
+    def _write_index_file(self, key):
+        filename = self._index_filename(key)
+        data = _dump_index(self._indexes[key])
+        data.update(key=key, primary_key=self._primary_key, signature=self._index_signature)
+        fn_tmp = filename + '~'
+        with open(fn_tmp, 'wb') as file:
+            file.write(json.dumps(data).encode('utf-8'))
+        if six.PY2:
+            os.rename(fn_tmp, filename)
+        else:
+            os.replace(fn_tmp, filename)
+
+    def _flush_indexes(self, changed):
+        """Write all indexes, which are not persisted yet, to index files.
+
+        :param changed: Whether the collection file has been rewritten.
+        """
+        try:
+            if not os.path.isdir(self._index_dir):
+                os.mkdir(self._index_dir)
+            if changed:
+                # Indexes, which are only persisted, are loaded, such that
+                # they can be updated and stored with the new signature.
+                for fn in os.listdir(self._index_dir):
+                    if not fn.endswith('.json'):
+                        continue
+                    fn = os.path.join(self._index_dir, fn)
+                    data = self._read_index_file(fn)
+                    key = None if data is None else data.get('key')
+                    if not isinstance(key, six.string_types):
+                        os.remove(fn)
+                    elif key not in self._indexes:
+                        self._load_persisted_index(key, data)
+                self._update_indexes()
+                self._index_signature = _file_signature(self._file.name)
+                self._persisted.clear()
+            for key in self._indexes:
+                if key not in self._persisted:
+                    logger.debug("Writing index for key '{}'...".format(key))
+                    self._write_index_file(key)
+                    self._persisted.add(key)
+        except (IOError, OSError) as error:
+            logger.warning("Unable to write index files to '{}': {}".format(
+                self._index_dir, error))
+
     def index(self, key, build=False):
         """Get (and optionally build) the index for a given key.
 
@@ -446,18 +1173,14 @@ class Collection(object):
         if key == self._primary_key:
             raise KeyError("Can't access index for primary key via index() method.")
         elif key in self._indexes:
-            if len(self._dirty) > self.index_rebuild_threshold * len(self):
-                logger.debug("Indexes outdated, rebuilding...")
-                self._indexes.clear()
-                self._build_index(key)
-                self._dirty.clear()
-            else:
-                self._update_indexes()
+            self._update_indexes()
         else:
-            if build:
-                self._build_index(key)
-            else:
-                raise KeyError("No index for key '{}'.".format(key))
+            self._update_indexes()
+            if not self._load_persisted_index(key):
+                if build:
+                    self._build_index(key)
+                else:
+                    raise KeyError("No index for key '{}'.".format(key))
         return self._indexes[key]
 
     def __str__(self):
@@ -533,6 +1256,8 @@ class Collection(object):
                     "Serialization of document '{}' failed with error: {}".format(doc, error))
             self._docs[_id] = self._validate_doc(doc_)
         self._dirty.add(_id)
+        if self._track_modified:
+            self._modified.add(_id)
         self._requires_flush = True
 
     def insert_one(self, doc):
@@ -572,13 +1297,20 @@ class Collection(object):
             self._dirty.remove(_id)
         except KeyError:
             pass
+        if self._track_modified:
+            self._modified.add(_id)
         self._requires_flush = True
 
     def clear(self):
         "Remove all documents from the collection."
+        if self._track_modified:
+            self._modified.update(self._docs)
         self._docs.clear()
         self._indexes.clear()
+        self._index_values.clear()
+        self._sorted_indexes.clear()
         self._dirty.clear()
+        self._requires_compaction = True
         self._requires_flush = True
 
     def update(self, docs):
@@ -597,105 +1329,326 @@ class Collection(object):
                 _id = doc[self._primary_key] = self._next_default_id()
             self[_id] = doc
 
-    def _find_expression(self, key, value):
-        logger.debug("Find documents for expression '{}: {}'.".format(key, value))
-        if '$' in key:
-            if key.count('$') > 1:
-                raise KeyError("Bad operator expression '{}'.".format(key))
-            nodes = key.split('.')
-            op = nodes[-1]
-            if not op.startswith('$'):
-                raise KeyError("Bad operator placement '{}'.".format(key))
-            key = '.'.join(nodes[:-1])
-            if op in _INDEX_OPERATORS:
-                index = self.index(key, build=True)
-                return _find_with_index_operator(index, op, value)
-            elif op == '$exists':
-                if not isinstance(value, bool):
-                    raise ValueError("The value of the '$exists' operator must be boolean.")
-                index = self.index(key, build=True)
-                match = {elem for elems in index.values() for elem in elems}
-                return match if value else set(self.ids).difference(match)
-            else:
-                raise KeyError("Unknown expression-operator '{}'.".format(op))
+    def _find_equal(self, key, value):
+        index = self.index(key, build=True)
+        # Check to see if 'value' is a floating point type but an
+        # integer value (e.g., 4.0), and search for both the int and float
+        # values. This allows the user to find statepoints that have
+        # integer-valued keys that are stored as floating point types.
+        # Note that this both cases: 1) user searches for an int and hopes
+        # to find values that are stored as integer-valued floats and 2) user
+        # searches for a integer-valued float and hopes to find ints.
+        # This way, both `signac find x 4.0` and `signac find x 4` would
+        # return jobs where `sp.x` is stored as either 4.0 or 4.
+        if isinstance(value, Number) and float(value).is_integer():
+            result_float = index.get(_float(value), set())
+            result_int = index.get(int(value), set())
+            if not result_float:
+                return result_int
+            return result_int.union(result_float)
         else:
-            index = self.index(key, build=True)
-            # Check to see if 'value' is a floating point type but an
-            # integer value (e.g., 4.0), and search for both the int and float
-            # values. This allows the user to find statepoints that have
-            # integer-valued keys that are stored as floating point types.
-            # Note that this both cases: 1) user searches for an int and hopes
-            # to find values that are stored as integer-valued floats and 2) user
-            # searches for a integer-valued float and hopes to find ints.
-            # This way, both `signac find x 4.0` and `signac find x 4` would
-            # return jobs where `sp.x` is stored as either 4.0 or 4.
-            if isinstance(value, Number) and float(value).is_integer():
-                result_float = index.get(_float(value), set())
-                result_int = index.get(int(value), set())
-                return result_int.union(result_float)
-            else:
-                return index.get(value, set())
+            return index.get(value, set())
+
+    def _find_with_sorted_index(self, key, op, argument, match):
+        "Evaluate an operator expression with a sorted index, returns None if not possible."
+        if op not in _SORTED_INDEX_OPERATORS:
+            return None
+        index = self.index(key, build=True)
+        if op == '$near':
+            values = self._sorted_index(key, index).find_near(*argument)
+            if values is not None:
+                values = [value for value in values if match(value)]
+        else:
+            values = self._sorted_index(key, index).find(op, argument)
+        if values is not None:
+            matches = set()
+            for value in values:
+                matches.update(dict.__getitem__(index, value))
+            return matches
+
+    def _find_with_operator(self, key, op, argument, match):
+        matches = self._find_with_sorted_index(key, op, argument, match)
+        if matches is None:
+            matches = set()
+            # Iterating over the underlying dict is significantly faster and all
+            # operators treat _float values like float values.
+            for value, group in dict.items(self.index(key, build=True)):
+                if match(value):
+                    matches.update(group)
+        return matches
+
+    def _find_exists(self, key, value):
+        self.index(key, build=True)
+        match = set(self._index_values[key])
+        return match if value else set(self.ids).difference(match)
+
+    def _may_raise(self, key, op, argument):
+        """Return True if the operator expression may raise an error for some index values.
+
+        Comparisons of values of different types raise a TypeError on Python 3,
+        unless they are answered from a sorted index, and $where expressions
+        may raise any error.
+        """
+        if op in ('$eq', '$ne', '$in', '$nin', '$regex', '$type'):
+            return False
+        elif op in _SORTED_INDEX_OPERATORS:
+            return not self._sorted_index(key, self.index(key, build=True)).supports(op, argument)
+        return True
+
+    def _index_cardinality(self, key):
+        "Return the number of distinct values of an index or infinity if it was not built yet."
+        try:
+            return len(self._indexes[key])
+        except KeyError:
+            return float('inf')
+
+    def _match_equal(self, key, value, _id):
+        "Return True if the document with _id matches the equality expression."
+        index = self.index(key, build=True)
+        # See _find_equal() for the treatment of integer-valued numbers.
+        if isinstance(value, Number) and float(value).is_integer():
+            return _id in index.get(int(value), ()) or _id in index.get(_float(value), ())
+        else:
+            return _id in index.get(value, ())
+
+    def _match_operator(self, key, op, argument, match, _id, matches):
+        """Return True if the document with _id matches the operator expression.
+
+        The operator is applied to the indexed value of the document, like in
+        :meth:`_find_with_operator`. However, booleans share the index key of
+        the integers 0 and 1, and the key of a group may therefore differ in
+        type from the value of a specific document; the same applies to lists,
+        which are indexed as tuples. For such values, the expression is evaluated
+        for the whole index once and the result is stored in matches.
+        """
+        values = self._index_values[key]
+        if _id not in values:
+            return False    # The document has no value for key.
+        value = values[_id]
+        if type(value) is bool or type(value) is tuple or (type(value) is int and value in (0, 1)):
+            try:
+                result = matches[match]
+            except KeyError:
+                result = matches[match] = self._find_with_operator(key, op, argument, match)
+            return _id in result
+        return match(value)
+
+    def _match(self, expr, _id, matches):
+        """Return True if the document with _id matches the compiled expression.
+
+        The result is identical to the membership of _id in the result of
+        :meth:`_evaluate` for the same expression.
+        """
+        if expr.match_all:
+            return True
+        if expr.primary_key is not None and expr.primary_key != _id:
+            return False
+        for key, value in expr.equal:
+            if not self._match_equal(key, value, _id):
+                return False
+        for key, op, argument, match in expr.operators:
+            self.index(key, build=True)
+            if not self._match_operator(key, op, argument, match, _id, matches):
+                return False
+        for key, value in expr.exists:
+            self.index(key, build=True)
+            if (_id in self._index_values[key]) != value:
+                return False
+        if expr.not_ is not None and self._match(expr.not_, _id, matches):
+            return False
+        if expr.and_ is not None and not all(
+                self._match(e, _id, matches) for e in expr.and_):
+            return False
+        if expr.or_ is not None and not any(
+                self._match(e, _id, matches) for e in expr.or_):
+            return False
+        return True
+
+    def _candidates(self, expr):
+        """Return an iterable of candidate ids for the compiled expression.
+
+        The candidates are the ids of the smallest set that can be determined
+        without a full index scan, or all ids otherwise.
+        """
+        if expr.primary_key is not None:
+            return (expr.primary_key, ) if expr.primary_key in self else ()
+        if expr.equal:
+            return min((self._find_equal(key, value) for key, value in expr.equal), key=len)
+        for key, op, argument, match in expr.operators:
+            matches = self._find_with_sorted_index(key, op, argument, match)
+            if matches is not None:
+                return matches
+        if expr.or_ is not None:
+            return self._stream_or(expr.or_)
+        return self.ids
+
+    def _stream_or(self, or_expressions):
+        seen = set()
+        for expr in or_expressions:
+            for _id in self._stream(expr):
+                if _id not in seen:
+                    seen.add(_id)
+                    yield _id
+
+    def _stream(self, expr):
+        """Yield the ids of all documents matching the compiled expression.
+
+        Unlike :meth:`_evaluate`, the ids are determined incrementally by
+        checking the candidates of the expression one by one.
+        """
+        if expr.match_all:
+            for _id in self.ids:
+                yield _id
+        else:
+            matches = dict()
+            for _id in self._candidates(expr):
+                if self._match(expr, _id, matches):
+                    yield _id
+
+    def _term_results(self, expr):
+        """Yield the results of the terms of a compiled expression in the order of evaluation.
+
+        The equality terms are evaluated first, since the size of each term's
+        result is known immediately from the index, followed by the operator
+        terms, which can be evaluated with a sorted index, and all other operator
+        terms ordered by the number of distinct values that must be scanned.
+
+        If any of the operator terms may raise an error, all terms are evaluated
+        in the order of the filter instead, since whether an error is raised
+        depends on the terms evaluated before the result is empty.
+        """
+        if any(self._may_raise(key, op, argument) for key, op, argument, _ in expr.operators):
+            for method, args in expr.terms:
+                yield getattr(self, method)(*args)
+            return
+
+        matches = [self._find_equal(key, value) for key, value in expr.equal]
+        for match in sorted(matches, key=len):
+            yield match
 
-    def _find_result(self, expr):
-        if not len(expr):
+        # Operators, which can be evaluated with a sorted index, are considered cheapest.
+        operators = sorted(expr.operators, key=lambda op: (
+            op[1] not in _SORTED_INDEX_OPERATORS, self._index_cardinality(op[0])))
+        for key, op, argument, match in operators:
+            yield self._find_with_operator(key, op, argument, match)
+
+        for key, value in expr.exists:
+            yield self._find_exists(key, value)
+
+    def _evaluate(self, expr):
+        """Return the set of ids of all documents matching the compiled expression.
+
+        The terms are evaluated in the order determined by :meth:`_term_results`
+        and the evaluation stops as soon as the result is empty.
+        """
+        if expr.match_all:
             return set(self.ids)    # Empty expression yields all ids...
 
-        class result:
-            "Mutable local result context class."
-            # Once we drop Python 2.7 support we can replace `result.ids`
-            # simply with `result_ids`, remove the `result` class, and use
-            # a local function and `nonlocal result_ids`.
-            ids = None
-
-            @classmethod
-            def reduce(cls, match):
-                if result.ids is None:  # First match
-                    result.ids = match
-                else:               # Update previous match
-                    result.ids = result.ids.intersection(match)
-
-        # Check if filter contains primary key, in which case we can
-        # immediately reduce the result.
-        _id = expr.pop(self._primary_key, None)
-        if _id is not None and _id in self:
-            result.reduce({_id})
-
-        # Extract all logical-operator expressions for now.
-        or_expressions = expr.pop('$or', None)
-        and_expressions = expr.pop('$and', None)
-        not_expression = expr.pop('$not', None)
+        result = None
+        if expr.primary_key is not None:
+            result = {expr.primary_key} if expr.primary_key in self else set()
 
-        # Reduce the result based on the remaining non-logical expression:
-        for key, value in _traverse_filter(expr):
-            result.reduce(self._find_expression(key, value))
-            if not result.ids:          # No match, no need to continue...
+        def reduce(result, match):
+            return match if result is None else result.intersection(match)
+
+        for match in self._term_results(expr):
+            result = reduce(result, match)
+            if not result:
                 return set()
 
-        # Reduce the result based on the logical-operator expressions:
-        if not_expression is not None:
-            not_match = self._find_result(not_expression)
-            result.reduce(set(self.ids).difference(not_match))
+        if expr.not_ is not None:
+            not_match = self._evaluate(expr.not_)
+            if result is None:
+                result = set(self.ids).difference(not_match)
+            else:
+                result = result.difference(not_match)
 
-        if and_expressions is not None:
-            _check_logical_operator_argument('$and', and_expressions)
-            for expr_ in and_expressions:
-                result.reduce(self._find_result(expr_))
+        if expr.and_ is not None:
+            for expr_ in expr.and_:
+                result = reduce(result, self._evaluate(expr_))
 
-        if or_expressions is not None:
-            _check_logical_operator_argument('$or', or_expressions)
+        if expr.or_ is not None:
             or_results = set()
-            for expr_ in or_expressions:
-                or_results.update(self._find_result(expr_))
-            result.reduce(or_results)
+            for expr_ in expr.or_:
+                or_results.update(self._evaluate(expr_))
+            result = reduce(result, or_results)
+
+        return set() if result is None else result
+
+    def compile(self, filter):
+        """Compile a filter into a query plan for repeated searches.
+
+        The returned query plan can be passed to all methods that accept
+        a filter argument in place of the filter, e.g.:
+
+        .. code-block:: python
 
-        assert result.ids is not None
-        return result.ids
+            plan = collection.compile({'age': {'$gt': 30}})
+            for i in range(1000):
+                docs = collection.find(plan)
+
+        The filter is normalized, validated, and translated into a tree of
+        expressions only once. Query plans are also cached internally by
+        their normalized filter, which means that searches with repeatedly
+        used filters benefit even without explicit compilation.
+        The sub-expressions of a plan are evaluated in the order of their
+        estimated selectivity based on the collection's indexes, unless
+        the evaluation of an operator expression may raise an error.
+
+        :param filter: The filter argument that all documents must match.
+        :type filter: Mapping
+        :returns: A query plan object.
+        :raises ValueError: In case that the filter argument is invalid.
+        :raises KeyError: In case that the filter argument contains an invalid
+            operator expression.
+        """
+        # The key order is preserved, since it determines the evaluation order
+        # of terms which may raise an error, see _evaluate().
+        key = json.dumps(filter)
+        try:
+            return self._plans[key]
+        except KeyError:
+            filter = json.loads(key)  # Normalize
+            if not _valid_filter(filter):
+                raise ValueError(filter)
+            plan = _QueryPlan(filter, primary_key=self._primary_key)
+            if len(self._plans) >= self.MAX_CACHED_PLANS:
+                self._plans.clear()
+            self._plans[key] = plan
+            return plan
+
+    def _query_plan(self, filter):
+        "Return the query plan for filter or None for an empty filter."
+        if isinstance(filter, _QueryPlan):
+            if filter._primary_key != self._primary_key:
+                filter = self.compile(filter.filter)
+        elif filter:
+            filter = self.compile(filter)
+        return filter or None
+
+    def _find_range(self, filter, skip, limit):
+        """Return the list of ids of the matching documents from skip to skip + limit.
+
+        The ids are in the order, in which they are determined by a search
+        with a limit, which means that the results of consecutive ranges,
+        including the results of :meth:`_find` with a limit, do not overlap.
+        """
+        self._assert_open()
+        filter = self._query_plan(filter)
+        stop = skip + limit if limit else None
+        if filter is None:
+            return list(islice(self._docs.keys(), skip, stop))
+        try:
+            return list(islice(self._stream(filter._root), skip, stop))
+        except TypeError:
+            # See _find().
+            return sorted(self._evaluate(filter._root))[skip:stop]
 
     def _find(self, filter=None, limit=0):
         """Returns a result vector of ids for the given filter and limit.
 
-        This function normalizes the filter argument and then attempts to
-        build a result vector for the given key-value queries.
+        This function compiles the filter argument into a query plan
+        (see :py:meth:`~.compile`) and then evaluates the plan.
         For each key that is queried, an internal index is built and then
         searched.
 
@@ -708,25 +1661,93 @@ class Collection(object):
                all documents will match an empty filter.
             2. If the filter argument contains a primary key, the result
                is directly returned since no search operation is necessary.
-            3. The filter is processed key by key, once the result vector is
-               empty it is immediately returned.
-
-        :param filter: The filter argument that all documents must match.
+            3. The filter is processed key by key in the order of the estimated
+               selectivity, once the result vector is empty it is immediately
+               returned.
+            4. If a limit is provided, the candidates of the smallest set of
+               ids, that can be determined without a full index scan, are
+               checked one by one until the limit is reached.
+
+        :param filter: The filter argument that all documents must match
+            or a query plan.
         :param limit: Limit the size of the result vector.
         :raises ValueError: In case that the filter argument is invalid.
         :returns: A set of ids of documents that match the given filter.
         """
         self._assert_open()
-        if filter:
-            filter = json.loads(json.dumps(filter))  # Normalize
-            if not _valid_filter(filter):
-                raise ValueError(filter)
-            result = self._find_result(filter)
-            return set(islice(result, limit if limit else None))
+        filter = self._query_plan(filter)
+        if filter and limit:
+            try:
+                return set(islice(self._stream(filter._root), limit))
+            except TypeError:
+                # The candidates are checked term by term in a different order
+                # than by the full evaluation, which may therefore never compare
+                # the values of incompatible types that raised the error.
+                return set(islice(self._evaluate(filter._root), limit))
+        elif filter:
+            return set(self._evaluate(filter._root))
         else:
             return set(islice(self._docs.keys(), limit if limit else None))
 
-    def find(self, filter=None, limit=0):
+    def _sort_value(self, key, _id):
+        "Return the sort key of the value of key for the document with _id."
+        if key == self._primary_key:
+            return (2, _id)
+        return _sort_key(self._index_values[key].get(_id))
+
+    def _sort_with_index(self, ids, key, reverse, stop):
+        """Sort ids by the value of key with a sorted index, returns None if not possible.
+
+        The sorted index is only used if the index has no more distinct values
+        than there are ids to sort and all values are either numbers or strings.
+        Booleans are equal to the integers 0 and 1 and may therefore be stored
+        under a number key of the index, which is why the values are checked.
+        The iteration stops once stop ids have been determined.
+        """
+        index = self.index(key, build=True)
+        if len(index) > len(ids):
+            return None
+        sorted_index = self._sorted_index(key, index)
+        if sorted_index.num_other:
+            return None
+        values = self._index_values[key]
+        missing = []
+        for _id in ids:
+            if _id not in values:
+                missing.append(_id)
+            elif type(values[_id]) is bool:
+                return None
+        if reverse:
+            result = []
+            groups = (reversed(sorted_index.strings), reversed(sorted_index.numbers))
+        else:
+            result = missing
+            groups = (sorted_index.numbers, sorted_index.strings)
+        for group in groups:
+            for value in group:
+                result.extend(dict.__getitem__(index, value).intersection(ids))
+                if stop and len(result) >= stop:
+                    return result
+        if reverse:
+            result.extend(missing)
+        return result
+
+    def _sort(self, ids, sort, skip, limit):
+        "Return a list of the ids sorted by the (key, direction) tuples of sort."
+        stop = skip + limit if limit else None
+        result = None
+        if len(sort) == 1 and sort[0][0] != self._primary_key:
+            key, direction = sort[0]
+            result = self._sort_with_index(ids, key, direction < 0, stop)
+        if result is None:
+            result = list(ids)
+            for key, direction in reversed(sort):
+                if key != self._primary_key:
+                    self.index(key, build=True)
+                result.sort(key=partial(self._sort_value, key), reverse=direction < 0)
+        return result[skip:stop]
+
+    def find(self, filter=None, limit=0, projection=None, sort=None, skip=0):
         """Find all documents matching filter, but not more than limit.
 
         This function searches the collection for all documents that match
@@ -832,15 +1853,163 @@ class Collection(object):
 
             Matches all docs, where the value for foo starts with the word 'bar'.
 
-        :param filter: All documents must match the given filter.
+        Projection, sort, and skip
+
+            Similar to pymongo, the returned fields can be selected with a
+            projection, either as a list of (nested) keys to include or as a
+            mapping of keys to 1 (include) or 0 (exclude). The primary key is
+            always included unless it is explicitly excluded:
+
+                    .. code-block:: python
+
+                        collection.find(projection=['a', 'b.c'])
+                        collection.find(projection={'a': 0, '_id': 0})
+
+            The results are sorted with a list of (key, direction) tuples,
+            where the direction is either 1 (ascending) or -1 (descending).
+            The first skip documents of the (sorted) results are omitted:
+
+                    .. code-block:: python
+
+                        collection.find(sort=[('a', 1), ('b', -1)], skip=10, limit=10)
+
+            Sorting by a single key is directly determined from the key's
+            sorted index where possible. Values of different types are sorted
+            in the order null and missing values, numbers, strings, mappings,
+            lists, and booleans. Without a sort argument, the order of the
+            results is undefined, but consecutive pages of results determined
+            with the skip and limit arguments do not overlap.
+
+        :param filter: All documents must match the given filter
+            or query plan (see :py:meth:`~.compile`).
         :type filter: Mapping
         :param limit: Do not return more than limit number of documents.
             A limit value of 0 (the default) means no limit.
         :type limit: int
+        :param projection: The keys to include in or exclude from the returned
+            documents; defaults to None, which returns the whole documents.
+        :type projection: list or Mapping
+        :param sort: A key or a list of (key, direction) tuples to sort by.
+        :type sort: str or list
+        :param skip: The number of documents to omit from the results.
+        :type skip: int
         :returns: A result object that iterates over all matching documents.
+        :raises ValueError: In case that the filter, projection, or sort
+            arguments are invalid.
+        """
+        if projection is not None:
+            projection = _Projection(projection, self._primary_key)
+        if skip < 0 or limit < 0:
+            raise ValueError("The skip and limit arguments must not be negative.")
+        if sort is not None:
+            ids = self._sort(self._find(filter), _parse_sort(sort), skip, limit)
+        elif skip:
+            ids = self._find_range(filter, skip, limit)
+        else:
+            ids = self._find(filter, limit=limit)
+        return _CollectionSearchResults(self, ids, projection)
+
+    def _value_counts(self, key, ids=None):
+        """Return a mapping of the values of key to the number of documents having them.
+
+        The counts are determined from the index for key and restricted to the
+        documents with the given ids, if provided. Mapping values are ignored.
+        """
+        index = self.index(key, build=True)
+        counts = dict()
+        if ids is not None and len(ids) < len(index):
+            values = self._index_values[key]
+            for _id in ids:
+                value = values.get(_id, _DictPlaceholder)
+                if value is not _DictPlaceholder:
+                    counts[value] = counts.get(value, 0) + 1
+        else:
+            for value, group in dict.items(index):
+                if value is _DictPlaceholder:
+                    continue
+                num = len(group) if ids is None else len(group.intersection(ids))
+                if num:
+                    value = float(value) if type(value) is _float else value
+                    counts[value] = counts.get(value, 0) + num
+        return counts
+
+    def count(self, filter=None):
+        """Return the number of documents matching the filter.
+
+        The number is determined from the indexes without accessing any document.
+
+        :param filter: The documents must match the given filter
+            or query plan (see :py:meth:`~.compile`).
+        :raises ValueError: In case that the filter argument is invalid.
+        :returns: The number of matching documents.
+        """
+        if not filter:
+            return len(self)
+        return len(self._find(filter))
+
+    def distinct(self, key, filter=None):
+        """Return a list of the distinct values of key.
+
+        For example, to determine all values of 'b' among documents with 'a' being 0:
+
+        .. code-block:: python
+
+            values = collection.distinct('b', {'a': 0})
+
+        The values are determined from the index for key without accessing
+        any document. Documents without a value for key and mapping values
+        are ignored. Like in any search, numbers of integer and float type
+        with the same value are considered identical.
+
+        :param key: The (nested) key of the values.
+        :type key: str
+        :param filter: Only consider documents matching the given filter
+            or query plan (see :py:meth:`~.compile`).
         :raises ValueError: In case that the filter argument is invalid.
+        :returns: A list of distinct values.
         """
-        return _CollectionSearchResults(self, self._find(filter, limit=limit))
+        ids = self._find(filter) if filter else None
+        return [_to_lists(value) for value in self._value_counts(key, ids)]
+
+    def group_count(self, keys, filter=None):
+        """Return the number of documents per distinct value(s) of one or more keys.
+
+        For example, to count the documents per value of 'a', and per
+        combination of values of 'a' and 'b':
+
+        .. code-block:: python
+
+            collection.group_count('a')         # {0: 10, 1: 12, ...}
+            collection.group_count(['a', 'b'])  # {(0, 'x'): 3, (0, 'y'): 7, ...}
+
+        The counts are determined from the indexes without accessing any
+        document. Documents without a value for any of the keys and mapping
+        values are ignored. List values are represented as tuples.
+
+        :param keys: The (nested) key or a sequence of keys to group by.
+        :type keys: str or sequence of str
+        :param filter: Only consider documents matching the given filter
+            or query plan (see :py:meth:`~.compile`).
+        :raises ValueError: In case that the filter argument is invalid.
+        :returns: A mapping of values, or tuples of values for a sequence of keys,
+            to the number of documents.
+        """
+        ids = self._find(filter) if filter else None
+        if isinstance(keys, six.string_types):
+            return self._value_counts(keys, ids)
+        keys = list(keys)
+        for key in keys:
+            self.index(key, build=True)
+        values = [self._index_values[key] for key in keys]
+        counts = dict()
+        for _id in self.ids if ids is None else ids:
+            try:
+                group = tuple(v[_id] for v in values)
+            except KeyError:
+                continue
+            if _DictPlaceholder not in group:
+                counts[group] = counts.get(group, 0) + 1
+        return counts
 
     def find_one(self, filter=None):
         """Return one document that matches the filter or None.
@@ -877,13 +2046,13 @@ class Collection(object):
         :returns: The _id of the replaced (or upserted) documented.
         """
         self._assert_open()
-        if len(filter) == 1 and self._primary_key in filter:
+        if isinstance(filter, Mapping) and len(filter) == 1 and self._primary_key in filter:
             _id = filter[self._primary_key]
             if upsert or _id in self:
                 self[_id] = replacement
                 return _id
         else:
-            for _id in self._find(filter):
+            for _id in self._find(filter, limit=1):
                 self[_id] = replacement
                 return _id
             else:
@@ -902,15 +2071,70 @@ class Collection(object):
         for _id in to_delete:
             del self[_id]
 
-    def _dump(self, text_buffer):
-        "Dump collection content serialized to JSON to text-buffer."
+    @staticmethod
+    def _dump(text_buffer, docs):
+        "Dump documents serialized to JSON to text-buffer."
         if six.PY2:
-            for doc in self._docs.values():
+            for doc in docs:
                 text_buffer.write(unicode(json.dumps(doc) + '\n', 'utf-8'))  # noqa
         else:
-            for doc in self._docs.values():
+            for doc in docs:
                 text_buffer.write((json.dumps(doc) + '\n'))
 
+    def _write(self, file, docs):
+        """Write documents to file.
+
+        Compressed documents are written as a sequence of gzip members of
+        about equal size, which can be decompressed independently.
+        """
+        if self._compresslevel > 0:
+            chunk = []
+            size = 0
+            for doc in docs:
+                line = (json.dumps(doc) + '\n').encode('utf-8')
+                chunk.append(line)
+                size += len(line)
+                if size >= _CHUNK_SIZE:
+                    file.write(_gzip_member(b''.join(chunk), self._compresslevel))
+                    chunk = []
+                    size = 0
+            if chunk:
+                file.write(_gzip_member(b''.join(chunk), self._compresslevel))
+        else:
+            self._dump(file, docs)
+
+    def _journal_records(self):
+        "Yield the records of all documents modified or deleted since the last flush."
+        for _id in self._modified:
+            doc = self._docs.get(_id)
+            yield {_JOURNAL_TOMBSTONE: _id} if doc is None else doc
+
+    def _replay(self, records, validated=False):
+        """Insert documents from the records of a collection file.
+
+        Later records supersede earlier records of the same document and
+        tombstone records delete the document. The records are decoded from
+        JSON and therefore only validated, but not serialized again.
+
+        :param validated: Whether the records have already been validated.
+        :returns: The number of records.
+        """
+        num_records = 0
+        for doc in records:
+            num_records += 1
+            if len(doc) == 1 and _JOURNAL_TOMBSTONE in doc:
+                _id = doc[_JOURNAL_TOMBSTONE]
+                if _id in self._docs:
+                    del self[_id]
+                continue
+            if self._primary_key not in doc:
+                doc[self._primary_key] = self._next_default_id()
+            if not validated:
+                self._validate_doc(doc)
+            self.__setitem__(doc[self._primary_key], doc, _trust=True)
+        self._update_indexes()
+        return num_records
+
     def dump(self, file=sys.stdout):
         """Dump the collection in JSON-encoding to file.
 
@@ -928,32 +2152,40 @@ class Collection(object):
         :param file: The file to write the encoded blob to.
         """
         self._assert_open()
-        if self._compresslevel > 0:
-            import gzip
-            with gzip.GzipFile(
-                    compresslevel=self._compresslevel, fileobj=file, mode='wb') as gzipfile:
-                text_io = io.TextIOWrapper(gzipfile, encoding='utf-8')
-                self._dump(text_io)
-                text_io.flush()
-        else:
-            self._dump(file)
+        self._write(file, self._docs.values())
 
     @classmethod
-    def _open(cls, file, compresslevel=0):
+    def _open(cls, file, compresslevel=0, workers=None, journal=False):
+        collection = cls()
+        num_records = 0
         try:
-            if compresslevel > 0:
+            chunks = None
+            if workers is not None and workers > 1 and file.readable():
+                if compresslevel > 0:
+                    chunks = _gzip_member_chunks(file.name)
+                    if chunks is None:
+                        logger.debug("Unable to locate gzip members of '{}', parsing "
+                                     "the file sequentially.".format(file.name))
+                else:
+                    chunks = _text_chunks(file.name)
+            if chunks is not None:
+                num_records = collection._replay(
+                    _parse_parallel(file.name, chunks, compresslevel > 0, workers,
+                                    journal and compresslevel == 0),
+                    validated=True)
+            elif compresslevel > 0:
                 import gzip
                 with gzip.GzipFile(fileobj=file, mode='rb') as gzipfile:
                     if six.PY2 or (sys.version_info.major == 3 and sys.version_info.minor < 6):
                         text = gzipfile.read().decode('utf-8')
                         docs = [json.loads(line) for line in text.splitlines()]
-                        collection = cls(docs=docs)
+                        num_records = collection._replay(docs)
                     else:
                         text_io = io.TextIOWrapper(gzipfile, encoding='utf-8')
-                        collection = cls(docs=(json.loads(line) for line in text_io))
+                        num_records = collection._replay(json.loads(line) for line in text_io)
                         text_io.detach()
             else:
-                collection = cls(docs=(json.loads(line) for line in file))
+                num_records = collection._replay(_load_lines(file, journal))
         except (IOError, io.UnsupportedOperation) as error:
             if str(error) in ('not readable', 'read'):
                 collection = cls()
@@ -977,10 +2209,66 @@ class Collection(object):
         collection._file = file
         collection._compresslevel = compresslevel
         collection._requires_flush = False  # not needed after initial read
+        collection._num_journal_records = max(0, num_records - len(collection))
+        if journal and compresslevel == 0 and hasattr(file, 'name') \
+                and not _ends_with_newline(file.name):
+            # Rewrite the file on the next flush, instead of appending to a torn record.
+            collection._requires_compaction = True
         return collection
 
     @classmethod
-    def open(cls, filename, mode=None, compresslevel=None):
+    def _open_lazy(cls, file):
+        """Open a collection file without decoding its documents.
+
+        The file is memory-mapped and scanned once to record the offsets
+        of the line of each document by primary key. The primary key is
+        extracted without decoding the document where possible, see
+        :func:`_scan_primary_key`.
+        """
+        collection = cls()
+        size = os.fstat(file.fileno()).st_size
+        buffer = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) if size else b''
+        docs = collection._docs = _LazyDocuments(buffer, collection._primary_key)
+        offsets = docs._offsets
+        regex = _primary_key_regex(collection._primary_key)
+        tombstone = ('{"' + _JOURNAL_TOMBSTONE + '"').encode('utf-8')
+        start = 0
+        try:
+            while start < size:
+                end = buffer.find(b'\n', start)
+                if end == -1:
+                    end = size
+                line = buffer[start:end]
+                _id = None if line.startswith(tombstone) else _scan_primary_key(line, regex)
+                if _id is not None:
+                    offsets.pop(_id, None)
+                    offsets[_id] = (start, end)
+                    start = end + 1
+                    continue
+                doc = json.loads(line.decode('utf-8'))
+                if len(doc) == 1 and _JOURNAL_TOMBSTONE in doc:
+                    offsets.pop(doc[_JOURNAL_TOMBSTONE], None)
+                else:
+                    _id = doc.get(collection._primary_key)
+                    if _id is None:
+                        _id = collection._next_default_id()
+                    elif not isinstance(_id, six.string_types):
+                        raise TypeError("The primary key must be of type str!")
+                    # A later record of the same document supersedes earlier ones.
+                    offsets.pop(_id, None)
+                    offsets[_id] = (start, end)
+                start = end + 1
+        except ValueError as error:
+            docs.close()
+            file.close()
+            raise JSONParseError(
+                "Error while trying to parse file '{}': {}.".format(file.name, error))
+        collection._file = file
+        return collection
+
+    @classmethod
+    def open(cls, filename, mode=None, compresslevel=None,
+             persistent_indexes=False, journal=False, lazy=False, workers=None):
         """Open a collection associated with a file on disk.
 
         Using this factory method will return a collection that is
@@ -1014,6 +2302,53 @@ class Collection(object):
         sure to open the file in read, write, or append mode as required. Due to
         the manner in which gzip works, opening a file in `mode=wt` will
         effectively erase the current file, so take care using `mode=wt`.
+
+        With `persistent_indexes=True`, all indexes are stored in index files
+        within the `<filename>.idx` directory when the collection is flushed.
+        Those index files are loaded lazily per key instead of building the
+        index from scratch, as long as the collection file has not been
+        modified otherwise. The validation is based on the size, modification
+        time, and a checksum of the first and last block of the collection file.
+
+        With `journal=True`, flushing the collection appends the modified
+        documents and tombstone records for deleted documents to the file
+        instead of rewriting all documents. The journal is replayed when the
+        file is opened and the file is compacted when the collection is closed
+        or :py:meth:`~Collection.compact` is called.
+
+        With `lazy=True`, the collection is opened in read-only mode for
+        uncompressed files that are too large to be held in memory. The file
+        is memory-mapped and only the offsets of each document are recorded
+        when opening it. Documents are decoded when they are accessed, e.g.,
+        when they are returned by :py:meth:`~Collection.find`, and indexes are
+        built by streaming over the file. Any attempt to modify a lazily
+        opened collection raises :py:class:`io.UnsupportedOperation`.
+
+        With `workers=N`, the collection file is split into chunks, which are
+        parsed by a pool of N processes. Uncompressed files are split on line
+        boundaries. Compressed files are written as a sequence of independent
+        gzip members, which store their size in the gzip header; files written
+        by other gzip implementations are parsed sequentially.
+
+        :param filename: The name of the collection file.
+        :type filename: str
+        :param mode: The file open-mode.
+        :type mode: str
+        :param compresslevel: The level of compression; defaults to 9 for
+            filenames ending with '.gz', otherwise 0 (no compression).
+        :type compresslevel: int
+        :param persistent_indexes: Store indexes in index files next to the
+            collection file and load them instead of building them.
+        :type persistent_indexes: bool
+        :param journal: Append changes to the collection file on flush
+            instead of rewriting it, see :py:meth:`~Collection.compact`.
+        :type journal: bool
+        :param lazy: Memory-map the collection file in read-only mode and
+            decode documents only on access.
+        :type lazy: bool
+        :param workers: The number of processes used to parse the collection
+            file; defaults to None, which means the file is parsed sequentially.
+        :type workers: int
         """
         if compresslevel is None:
             compresslevel = 9 if filename.endswith('.gz') else 0
@@ -1022,8 +2357,19 @@ class Collection(object):
         if filename == ':memory:':
             if mode is not None:
                 raise RuntimeError("File open-mode must be None for in-memory collection.")
+            if persistent_indexes or journal or lazy:
+                raise RuntimeError(
+                    "Persistent indexes, journal, and lazy mode require a collection file.")
             return cls(compresslevel=compresslevel)    # That's the default open mode.
         else:
+            if lazy:
+                if mode not in (None, 'r', 'rb'):
+                    raise RuntimeError("Lazily opened collections are read-only.")
+                if compresslevel > 0 or journal:
+                    raise RuntimeError(
+                        "Compressed collections and journal mode do not support lazy mode.")
+                mode = 'rb'
+
             # Set default mode
             if mode is None:
                 mode = 'ab+'
@@ -1031,16 +2377,27 @@ class Collection(object):
             file = io.open(filename, mode)
             file.seek(0)
 
-            if 'b' in mode:
+            if lazy:
+                collection = cls._open_lazy(file)
+            elif 'b' in mode:
                 if compresslevel > 0:
-                    return cls._open(file, compresslevel=compresslevel)
+                    collection = cls._open(
+                        file, compresslevel=compresslevel, workers=workers, journal=journal)
                 else:
-                    return cls._open(io.TextIOWrapper(file, encoding='utf-8'))
+                    collection = cls._open(
+                        io.TextIOWrapper(file, encoding='utf-8'), workers=workers,
+                        journal=journal)
             elif compresslevel > 0:
                 raise RuntimeError(
                     "Compressed collections must be opened in binary mode, for example: 'ab+'.")
             else:
-                return cls._open(file)
+                collection = cls._open(file, workers=workers, journal=journal)
+            if persistent_indexes:
+                collection._index_dir = filename + '.idx'
+                collection._index_signature = _file_signature(filename)
+            collection._journal = journal
+            collection._track_modified = persistent_indexes or journal
+            return collection
 
     def flush(self):
         """Write all changes to the associated file.
@@ -1051,11 +2408,27 @@ class Collection(object):
 
         This method is also called when the collection is explicitly or
         implicitly closed.
+
+        In journal mode, only the modified documents and tombstone records
+        for deleted documents are appended to the file, see also
+        :py:meth:`~Collection.compact`.
         """
         self._assert_open()
+        changed = False
         if self._requires_flush:
             if self._file is None:
                 logger.debug("Flushed collection.")
+            elif self._journal and not self._requires_compaction:
+                logger.debug("Append journal to file '{}'.".format(self._file))
+                self._file.seek(0, io.SEEK_END)
+                if self._compresslevel == 0:
+                    self._file.flush()
+                    if not _ends_with_newline(self._file.name):
+                        self._file.write(u'\n')
+                self._write(self._file, self._journal_records())
+                self._file.flush()
+                self._num_journal_records += len(self._modified)
+                changed = True
             else:
                 logger.debug("Flush collection to file '{}'.".format(self._file))
                 try:
@@ -1070,9 +2443,29 @@ class Collection(object):
                 else:
                     self.dump(self._file)
                     self._file.flush()
+                    self._num_journal_records = 0
+                    self._requires_compaction = False
+                    changed = True
             self._requires_flush = False
         else:
             logger.debug("Flushed collection (no changes).")
+        if self._index_dir is not None:
+            self._flush_indexes(changed)
+        self._modified.clear()
+
+    def compact(self):
+        """Rewrite the associated file with exactly one record per document.
+
+        In journal mode, the :py:meth:`~Collection.flush` method appends
+        records of modified and deleted documents to the file. This method
+        removes all superseded records and tombstones from the file. It is
+        called automatically when the collection is closed.
+        """
+        self._assert_open()
+        if self._num_journal_records:
+            self._requires_compaction = True
+            self._requires_flush = True
+        self.flush()
 
     def close(self):
         """Close this collection instance.
@@ -1085,10 +2478,17 @@ class Collection(object):
         """
         if self._file is not None:
             try:
-                self.flush()
+                if self._journal and self._file.writable():
+                    self.compact()
+                else:
+                    self.flush()
             finally:
                 self._file.close()
+                if isinstance(self._docs, _LazyDocuments):
+                    self._docs.close()
                 self._indexes.clear()
+                self._index_values.clear()
+                self._sorted_indexes.clear()
                 self._docs = None
                 self._file = None
 
@@ -36,6 +36,32 @@ class _sp_save_hook(object):
         self.job._reset_sp()
 
 
+def _validate_keys(obj):
+    "Raise an InvalidKeyError if any (nested) key of obj is invalid."
+    if isinstance(obj, dict):
+        for key, value in obj.items():
+            SyncedAttrDict._validate_key(key)
+            _validate_keys(value)
+    elif isinstance(obj, list):
+        for value in obj:
+            _validate_keys(value)
+
+
+class _JobDocument(JSONDict):
+    "The job document, which keeps the project's metadata store up to date."
+
+    def __init__(self, filename=None, write_concern=False, parent=None, job=None, cache=False):
+        self._job = job
+        super(_JobDocument, self).__init__(
+            filename=filename, write_concern=write_concern, parent=parent, cache=cache)
+
+    def _save(self, data=None):
+        if data is None:
+            data = self._as_dict()
+        super(_JobDocument, self)._save(data)
+        self._job._project._metadata_store_update_document(self._job._id, data)
+
+
 class Job(object):
     """The job instance is a handle to the data of a unique statepoint.
 
@@ -55,32 +81,39 @@ class Job(object):
 
     KEY_DATA = 'signac_data'
 
+    __slots__ = ('_project', '_statepoint', '_id', '_sp', '_wd', '_document', '_stores',
+                 '_cwd', '__weakref__')
+
     def __init__(self, project, statepoint, _id=None):
         self._project = project
 
         # Ensure that the job id is configured
         if _id is None:
             self._statepoint = json.loads(json.dumps(statepoint))
+            _validate_keys(self._statepoint)
             self._id = calc_id(self._statepoint)
         else:
             self._statepoint = dict(statepoint)
             self._id = _id
 
-        # Prepare job statepoint
-        self._sp = SyncedAttrDict(self._statepoint, parent=_sp_save_hook(self))
-
-        # Prepare job working directory
-        self._wd = os.path.join(project.workspace(), self._id)
-
-        # Prepare job document
-        self._fn_doc = os.path.join(self._wd, self.FN_DOCUMENT)
+        # The statepoint, working directory, document, h5-stores, and the
+        # stack of previous working directories are initialized on first access.
+        self._sp = None
+        self._wd = None
         self._document = None
+        self._stores = None
+        self._cwd = None
 
-        # Prepare job h5-stores
-        self._stores = H5StoreManager(self._wd)
+    def __getstate__(self):
+        state = dict(getattr(self, '__dict__', ()))
+        state.update(_project=self._project, _statepoint=self._statepoint, _id=self._id)
+        return state
 
-        # Prepare current working directory for context management
-        self._cwd = list()
+    def __setstate__(self, state):
+        state = dict(state)
+        Job.__init__(self, state.pop('_project'), state.pop('_statepoint'), state.pop('_id'))
+        for key, value in state.items():
+            setattr(self, key, value)
 
     def get_id(self):
         """The unique identifier for the job's statepoint.
@@ -90,7 +123,7 @@ class Job(object):
         return self._id
 
     def __hash__(self):
-        return hash(os.path.realpath(self._wd))
+        return hash(os.path.realpath(self.workspace()))
 
     def __str__(self):
         "Returns the job's id."
@@ -109,8 +142,14 @@ class Job(object):
 
         :return: The path to the job's workspace directory.
         :rtype: str"""
+        if self._wd is None:
+            self._wd = os.path.join(self._project.workspace(), self._id)
         return self._wd
 
+    @property
+    def _fn_doc(self):
+        return os.path.join(self.workspace(), self.FN_DOCUMENT)
+
     @property
     def ws(self):
         """Alias for :attr:`Job.workspace`."""
@@ -135,7 +174,7 @@ class Job(object):
         dst = self._project.open_job(new_statepoint)
         if dst == self:
             return
-        fn_manifest = os.path.join(self._wd, self.FN_MANIFEST)
+        fn_manifest = os.path.join(self.workspace(), self.FN_MANIFEST)
         fn_manifest_backup = fn_manifest + '~'
         try:
             os.rename(fn_manifest, fn_manifest_backup)
@@ -148,6 +187,8 @@ class Job(object):
                 else:
                     raise
             else:
+                self._project._metadata_store_remove(self._id)
+                self._project._invalidate_job_dirs()
                 dst.init()
         except OSError as error:
             if error.errno == errno.ENOENT:
@@ -157,12 +198,11 @@ class Job(object):
         # Update this instance
         self._statepoint = dst._statepoint
         self._id = dst._id
-        self._sp = SyncedAttrDict(self._statepoint, parent=_sp_save_hook(self))
-        self._wd = dst._wd
-        self._fn_doc = dst._fn_doc
+        self._sp = None
+        self._wd = None
         self._document = None
-        self._data = None
-        self._cwd = list()
+        self._stores = None
+        self._cwd = None
         logger.info("Moved '{}' -> '{}'.".format(self, dst))
 
     def _reset_sp(self, new_sp=None):
@@ -250,6 +290,7 @@ class Job(object):
             os.rename(fn_tmp, self._fn_doc)
         else:
             os.replace(fn_tmp, self._fn_doc)
+        self._project._metadata_store_update_document(self._id, new_doc)
 
     @property
     def document(self):
@@ -269,7 +310,9 @@ class Job(object):
         """
         if self._document is None:
             self.init()
-            self._document = JSONDict(filename=self._fn_doc, write_concern=True)
+            self._document = _JobDocument(
+                filename=self._fn_doc, write_concern=True, job=self,
+                cache=self._project._document_read_cache())
         return self._document
 
     @document.setter
@@ -325,7 +368,10 @@ class Job(object):
         :rtype:
             :class:`~signac.H5StoreManager`
         """
-        return self.init()._stores
+        self.init()
+        if self._stores is None:
+            self._stores = H5StoreManager(self.workspace())
+        return self._stores
 
     @property
     def data(self):
@@ -347,16 +393,18 @@ class Job(object):
         self.stores[self.KEY_DATA] = new_data
 
     def _init(self, force=False):
-        fn_manifest = os.path.join(self._wd, self.FN_MANIFEST)
+        fn_manifest = os.path.join(self.workspace(), self.FN_MANIFEST)
 
         # Create the workspace directory if it did not exist yet.
         try:
-            _mkdir_p(self._wd)
+            _mkdir_p(self.workspace())
         except OSError:
             logger.error("Error occured while trying to create "
                          "workspace directory for job '{}'.".format(self))
             raise
 
+        # The manifest file does not need to be verified if it was written by this call.
+        written = False
         try:
             # Ensure to create the binary to write before file creation
             blob = json.dumps(self._statepoint, indent=2)
@@ -377,9 +425,11 @@ class Job(object):
                     else:
                         with os.fdopen(fd, 'w') as file:
                             file.write(blob)
+                        written = True
                 else:
                     with open(fn_manifest, 'w' if force else 'x') as file:
                         file.write(blob)
+                    written = True
             except (IOError, OSError) as error:
                 if error.errno not in (errno.EEXIST, errno.EACCES):
                     raise
@@ -391,11 +441,15 @@ class Job(object):
                 pass
             raise error
         else:
-            self._check_manifest()
+            if written:
+                self._project._invalidate_job_dirs()
+            else:
+                self._check_manifest()
+            self._project._metadata_store_add(self)
 
     def _check_manifest(self):
         "Check whether the manifest file, if it exists, is correct."
-        fn_manifest = os.path.join(self._wd, self.FN_MANIFEST)
+        fn_manifest = os.path.join(self.workspace(), self.FN_MANIFEST)
         try:
             with open(fn_manifest, 'rb') as file:
                 assert calc_id(json.loads(file.read().decode())) == self._id
@@ -438,10 +492,10 @@ class Job(object):
         initialized.
         """
         try:
-            for fn in os.listdir(self._wd):
+            for fn in os.listdir(self.workspace()):
                 if fn in (self.FN_MANIFEST, self.FN_DOCUMENT):
                     continue
-                path = os.path.join(self._wd, fn)
+                path = os.path.join(self.workspace(), fn)
                 if os.path.isfile(path):
                     os.remove(path)
                 elif os.path.isdir(path):
@@ -470,6 +524,8 @@ class Job(object):
             if error.errno != errno.ENOENT:
                 raise
         else:
+            self._project._metadata_store_remove(self._id)
+            self._project._invalidate_job_dirs()
             if self._document is not None:
                 try:
                     self._document.clear()
@@ -477,7 +533,6 @@ class Job(object):
                     if not error.errno == errno.ENOENT:
                         raise error
                 self._document = None
-            self._data = None
 
     def move(self, project):
         """Move this job to project.
@@ -512,7 +567,15 @@ class Job(object):
                     "Cannot move jobs across different devices (file systems).")
             else:
                 raise error
-        self.__dict__.update(dst.__dict__)
+        self._project._metadata_store_remove(self._id)
+        project._metadata_store_add(dst)
+        self._project._invalidate_job_dirs()
+        project._invalidate_job_dirs()
+        self._project = project
+        self._sp = None
+        self._wd = None
+        self._document = None
+        self._stores = None
 
     def sync(self, other, strategy=None, exclude=None, doc_sync=None, **kwargs):
         """Perform a one-way synchronization of this job with the other job.
@@ -569,7 +632,7 @@ class Job(object):
         :param filename: The filename of the file.
         :type filename: str
         :return: The full workspace path of the file."""
-        return os.path.join(self._wd, filename)
+        return os.path.join(self.workspace(), filename)
 
     def isfile(self, filename):
         """Return True if file exists in the job's workspace.
@@ -593,17 +656,19 @@ class Job(object):
         Opening the context will switch into the job's workspace,
         leaving it will switch back to the previous working directory.
         """
+        if self._cwd is None:
+            self._cwd = list()
         self._cwd.append(os.getcwd())
         self.init()
-        logger.info("Enter workspace '{}'.".format(self._wd))
-        os.chdir(self._wd)
+        logger.info("Enter workspace '{}'.".format(self.workspace()))
+        os.chdir(self.workspace())
 
     def close(self):
         "Close the job and switch to the previous working directory."
         try:
             os.chdir(self._cwd.pop())
             logger.info("Leave workspace.")
-        except IndexError:
+        except (AttributeError, IndexError):
             pass
 
     def __enter__(self):
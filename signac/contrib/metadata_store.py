@@ -0,0 +1,340 @@
+# Copyright (c) 2019 The Regents of the University of Michigan
+# All rights reserved.
+# This software is licensed under the BSD 3-Clause License.
+"""A SQLite-based store for job state points and documents.
+
+The metadata store holds the state points and documents of all jobs of a
+project in a single SQLite database file. All (nested) keys of the job index
+documents are stored in a key-value table, which is indexed by key and value.
+Filters are translated into indexed SQL queries which return a (conservative)
+superset of matching jobs; the exact filter is then evaluated only on these
+candidates with a :class:`~.Collection`.
+"""
+import os
+import logging
+import threading
+from numbers import Number
+
+from ..core import json
+from ..common import six
+from .collection import Collection, _traverse_filter, _valid_filter
+
+try:
+    import sqlite3
+except ImportError:
+    SQLITE3 = False
+else:
+    SQLITE3 = True
+
+if six.PY2:
+    from collections import Mapping
+else:
+    from collections.abc import Mapping
+
+logger = logging.getLogger(__name__)
+
+
+# Value types stored in the key-value table.
+_NULL, _NUMBER, _STRING, _LIST, _DICT = range(5)
+
+# SQLite integers are limited to 64 bits.
+_INT_MIN, _INT_MAX = -2**63, 2**63 - 1
+
+_RANGE_OPERATORS = {'$gt': '>', '$gte': '>=', '$lt': '<', '$lte': '<='}
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    statepoint TEXT NOT NULL,
+    document TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS kv (
+    id TEXT NOT NULL,
+    key TEXT NOT NULL,
+    type INTEGER NOT NULL,
+    value);
+CREATE INDEX IF NOT EXISTS kv_key_type_value ON kv (key, type, value);
+CREATE INDEX IF NOT EXISTS kv_id ON kv (id);
+"""
+
+
+def _encode_value(value):
+    "Return the type and the SQL representation of a document value."
+    if value is None:
+        return _NULL, None
+    elif isinstance(value, bool):
+        return _NUMBER, int(value)
+    elif isinstance(value, six.integer_types):
+        # Integers exceeding the SQLite range are stored with reduced precision,
+        # which is why query terms on such values are not translated to SQL.
+        return _NUMBER, value if _INT_MIN <= value <= _INT_MAX else float(value)
+    elif isinstance(value, float):
+        return _NUMBER, value
+    elif isinstance(value, six.string_types):
+        return _STRING, value
+    elif isinstance(value, Mapping):
+        return _DICT, None
+    else:
+        return _LIST, None
+
+
+def _flatten(doc, prefix=None):
+    "Yield all (nested) keys of doc together with their encoded value."
+    for key, value in doc.items():
+        if prefix is not None:
+            key = '.'.join((prefix, key))
+        yield (key, ) + _encode_value(value)
+        if isinstance(value, Mapping):
+            for item in _flatten(value, key):
+                yield item
+
+
+def _index_doc(statepoint, document):
+    "Return the index document for a job's state point and document."
+    doc = dict(statepoint=statepoint)
+    doc.update(document)
+    return doc
+
+
+def _is_scalar(value):
+    return value is None or isinstance(value, (Number, six.string_types))
+
+
+def _is_exact(value):
+    "Return True if value can be compared to the stored values without loss of precision."
+    # Integers outside of the SQLite range are stored as floats with a magnitude
+    # of at least 2**63, which is the magnitude of the lower bound itself.
+    return not isinstance(value, Number) or isinstance(value, bool) or \
+        _INT_MIN < value <= _INT_MAX
+
+
+class _Query(object):
+    "Translate a filter into SQL conditions, which select a superset of all matches."
+
+    def __init__(self, filter):
+        self.conditions = []
+        self.params = []
+        # The query is exact if all matches are guaranteed to match the filter.
+        self.exact = True
+        self.conditions.extend(self._translate(filter))
+
+    def _term(self, sql, *params):
+        self.params.extend(params)
+        return 'id IN (SELECT id FROM kv WHERE {})'.format(sql)
+
+    def _translate(self, filter):
+        if not isinstance(filter, Mapping):
+            self.exact = False
+            return
+        filter = dict(filter)
+        and_expressions = filter.pop('$and', None)
+        or_expressions = filter.pop('$or', None)
+        if '$not' in filter or '_id' in filter:
+            self.exact = False
+            filter.pop('$not', None)
+            filter.pop('_id', None)
+        for key, value in _traverse_filter(filter):
+            condition = self._translate_expression(key, value)
+            if condition is None:
+                self.exact = False
+            else:
+                yield condition
+        if isinstance(and_expressions, list):
+            for expr in and_expressions:
+                for condition in self._translate(expr):
+                    yield condition
+        elif and_expressions is not None:
+            self.exact = False
+        if isinstance(or_expressions, list) and or_expressions:
+            num_params = len(self.params)
+            or_conditions = [list(self._translate(expr)) for expr in or_expressions]
+            if all(or_conditions):
+                yield '({})'.format(' OR '.join(
+                    '({})'.format(' AND '.join(c)) for c in or_conditions))
+            else:
+                # At least one of the alternatives is unconstrained.
+                del self.params[num_params:]
+                self.exact = False
+        elif or_expressions is not None:
+            self.exact = False
+
+    def _translate_expression(self, key, value):
+        if key.count('$') == 1 and key.split('.')[-1].startswith('$'):
+            nodes = key.split('.')
+            op = nodes[-1]
+            key = '.'.join(nodes[:-1])
+            if op == '$exists' and value is True:
+                return self._term('key = ?', key)
+            self.exact = False
+            if op == '$eq':
+                return self._translate_expression(key, value)
+            elif op in _RANGE_OPERATORS and _is_scalar(value) and value is not None \
+                    and _is_exact(value):
+                type_, value = _encode_value(value)
+                return self._term(
+                    'key = ? AND type = ? AND value {} ?'.format(_RANGE_OPERATORS[op]),
+                    key, type_, value)
+            elif op == '$in' and isinstance(value, list) and all(map(_is_scalar, value)) \
+                    and all(map(_is_exact, value)):
+                if not value:
+                    return '0'
+                values = [_encode_value(v)[1] for v in value]
+                return self._term('key = ? AND (value IS NULL OR value IN ({}))'.format(
+                    ', '.join('?' * len(values))), key, *values)
+        elif '$' not in key and _is_scalar(value) and _is_exact(value):
+            type_, value = _encode_value(value)
+            if type_ == _NULL:
+                return self._term('key = ? AND type = ?', key, type_)
+            if type_ != _STRING:
+                # Numbers and booleans of equal value are considered equal.
+                self.exact = False
+            return self._term('key = ? AND type = ? AND value = ?', key, type_, value)
+
+
+class MetadataStore(object):
+    """A SQLite database of job state points and documents.
+
+    The metadata store allows to search for jobs with state point and
+    document filters without reading any data from the workspace.
+
+    :param filename: The filename of the SQLite database file.
+    """
+    DatabaseError = sqlite3.DatabaseError if SQLITE3 else None
+    "Raised by all methods if the database file is corrupted."
+
+    def __init__(self, filename):
+        if not SQLITE3:
+            raise RuntimeError("The metadata store requires the sqlite3 module.")
+        self._filename = filename
+        self._lock = threading.RLock()
+        self._connection = None
+        self._pid = None
+
+    def __getstate__(self):
+        return dict(filename=self._filename)
+
+    def __setstate__(self, state):
+        self.__init__(state['filename'])
+
+    def _connect(self):
+        # Connections must not be shared with forked processes.
+        if self._connection is None or self._pid != os.getpid():
+            connection = sqlite3.connect(self._filename, check_same_thread=False, timeout=60)
+            # The store can always be rebuilt from the workspace, there is no
+            # need to wait for the data to be physically written to disk.
+            connection.execute('PRAGMA synchronous = OFF')
+            connection.executescript(_SCHEMA)
+            self._connection = connection
+            self._pid = os.getpid()
+        return self._connection
+
+    def close(self):
+        "Close the connection to the database file."
+        with self._lock:
+            if self._connection is not None:
+                self._connection.close()
+                self._connection = None
+
+    def __len__(self):
+        with self._lock:
+            return self._connect().execute('SELECT COUNT(*) FROM jobs').fetchone()[0]
+
+    def __contains__(self, _id):
+        with self._lock:
+            return self._connect().execute(
+                'SELECT 1 FROM jobs WHERE id = ?', (_id, )).fetchone() is not None
+
+    def ids(self):
+        "Return the set of ids of all jobs in the store."
+        with self._lock:
+            return {row[0] for row in self._connect().execute('SELECT id FROM jobs')}
+
+    @staticmethod
+    def _insert(connection, _id, statepoint, document):
+        connection.execute(
+            'INSERT OR REPLACE INTO jobs VALUES (?, ?, ?)',
+            (_id, json.dumps(statepoint), json.dumps(document)))
+        connection.execute('DELETE FROM kv WHERE id = ?', (_id, ))
+        connection.executemany(
+            'INSERT INTO kv VALUES (?, ?, ?, ?)',
+            ((_id, ) + row for row in _flatten(_index_doc(statepoint, document))))
+
+    def update(self, jobs):
+        """Insert or replace jobs in the store.
+
+        :param jobs: An iterable of (id, statepoint, document) tuples.
+        """
+        with self._lock:
+            connection = self._connect()
+            with connection:
+                for _id, statepoint, document in jobs:
+                    self._insert(connection, _id, statepoint, document)
+
+    def update_document(self, _id, document):
+        """Replace the document of a job; no-op if the job is not in the store.
+
+        :param _id: The job id.
+        :param document: The job document.
+        """
+        document = json.loads(json.dumps(document))  # Normalize
+        with self._lock:
+            connection = self._connect()
+            with connection:
+                row = connection.execute(
+                    'SELECT statepoint FROM jobs WHERE id = ?', (_id, )).fetchone()
+                if row is not None:
+                    self._insert(connection, _id, json.loads(row[0]), document)
+
+    def remove(self, ids):
+        """Remove jobs from the store.
+
+        :param ids: An iterable of job ids.
+        """
+        with self._lock:
+            connection = self._connect()
+            with connection:
+                for _id in ids:
+                    connection.execute('DELETE FROM jobs WHERE id = ?', (_id, ))
+                    connection.execute('DELETE FROM kv WHERE id = ?', (_id, ))
+
+    def clear(self):
+        "Remove all jobs from the store."
+        with self._lock:
+            connection = self._connect()
+            with connection:
+                connection.execute('DELETE FROM jobs')
+                connection.execute('DELETE FROM kv')
+
+    def find_statepoints(self, filter=None):
+        """Find all jobs whose index document matches filter.
+
+        The filter is applied to index documents of the form
+        ``{'statepoint': {...}, <document keys>}``.
+
+        :param filter: The filter argument that all index documents must match.
+        :returns: A mapping of the ids of all matching jobs to their JSON-encoded
+            state points.
+        :raises ValueError: In case that the filter argument is invalid.
+        """
+        if filter:
+            filter = json.loads(json.dumps(filter))  # Normalize
+            if not _valid_filter(filter):
+                raise ValueError(filter)
+            query = _Query(filter)
+        else:
+            query = _Query(dict())
+        sql = 'SELECT id, statepoint, document FROM jobs'
+        if query.conditions:
+            sql += ' WHERE ' + ' AND '.join(query.conditions)
+        with self._lock:
+            rows = self._connect().execute(sql, query.params).fetchall()
+        if query.exact:
+            return {_id: statepoint for _id, statepoint, _ in rows}
+        statepoints = dict()
+        docs = []
+        for _id, statepoint, document in rows:
+            statepoints[_id] = statepoint
+            doc = _index_doc(json.loads(statepoint), json.loads(document))
+            doc['_id'] = _id
+            docs.append(doc)
+        matches = Collection(docs, _trust=True)._find(filter)
+        return {_id: statepoints[_id] for _id in matches}
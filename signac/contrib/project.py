@@ -11,8 +11,10 @@ import errno
 import uuid
 import gzip
 import time
+from collections import OrderedDict
 from contextlib import contextmanager
-from itertools import groupby
+from bisect import bisect_left
+from itertools import groupby, islice
 from multiprocessing.pool import ThreadPool
 
 from .. import syncutil
@@ -20,8 +22,10 @@ from ..core import json
 from ..core.jsondict import JSONDict
 from ..core.h5store import H5StoreManager
 from .collection import Collection
+from .metadata_store import MetadataStore, SQLITE3
 from ..common import six
 from ..common.config import load_config
+from ..common.configobj.validate import is_boolean
 from ..common.tempdir import TemporaryDirectory
 from ..sync import sync_projects
 from .job import Job
@@ -42,6 +46,16 @@ logger = logging.getLogger(__name__)
 
 JOB_ID_REGEX = re.compile('[a-f0-9]{32}')
 
+# The time (in seconds) that needs to pass since the last modification of a file
+# or directory before cached data derived from it is validated by its modification
+# time. Files that were modified more recently may be modified again without a
+# detectable change of their modification time stamp.
+MTIME_RESOLUTION = 2
+
+# The maximum number of segments appended to the state point cache log
+# before the log is merged into the state point cache file.
+CACHE_MAX_SEGMENTS = 100
+
 ACCESS_MODULE_MINIMAL = """import signac
 
 def get_indexes(root):
@@ -77,16 +91,6 @@ class JobSearchIndex(object):
     def __len__(self):
         return len(self._collection)
 
-    def _resolve_statepoint_filter(self, q):
-        for k, v in q.items():
-            if k in ('$and', '$or'):
-                if not isinstance(v, list) or isinstance(v, tuple):
-                    raise ValueError(
-                        "The argument to a logical operator must be a sequence (e.g. a list)!")
-                yield k, [dict(self._resolve_statepoint_filter(i)) for i in v]
-            else:
-                yield 'statepoint.{}'.format(k), v
-
     def find_job_ids(self, filter=None, doc_filter=None):
         """Find the job_ids of all jobs matching the filters.
 
@@ -104,13 +108,29 @@ class JobSearchIndex(object):
         :raises RuntimeError: If the filters are not supported
             by the index.
         """
-        if filter:
-            filter = dict(self._resolve_statepoint_filter(filter))
-            if doc_filter:
-                filter.update(doc_filter)
-        elif doc_filter:
-            filter = doc_filter
-        return self._collection._find(filter)
+        return self._collection._find(_resolve_index_filter(filter, doc_filter))
+
+
+def _resolve_statepoint_filter(q):
+    for k, v in q.items():
+        if k in ('$and', '$or'):
+            if not isinstance(v, list) or isinstance(v, tuple):
+                raise ValueError(
+                    "The argument to a logical operator must be a sequence (e.g. a list)!")
+            yield k, [dict(_resolve_statepoint_filter(i)) for i in v]
+        else:
+            yield 'statepoint.{}'.format(k), v
+
+
+def _resolve_index_filter(filter=None, doc_filter=None):
+    "Combine a state point and a document filter into one filter for job index documents."
+    if filter:
+        filter = dict(_resolve_statepoint_filter(filter))
+        if doc_filter:
+            filter.update(doc_filter)
+    elif doc_filter:
+        filter = doc_filter
+    return filter
 
 
 class Project(object):
@@ -133,6 +153,15 @@ class Project(object):
     FN_CACHE = '.signac_sp_cache.json.gz'
     "The default filename for the state point cache file."
 
+    FN_CACHE_LOG = '.signac_sp_cache.log'
+    "The default filename for the state point cache log file."
+
+    FN_DOC_CACHE = '.signac_doc_cache.json.gz'
+    "The default filename for the job document cache file."
+
+    FN_METADATA_STORE = '.signac_metadata.sqlite'
+    "The default filename for the metadata store database file."
+
     _use_pandas_for_html_repr = True  # toggle use of pandas for html repr
 
     def __init__(self, config=None):
@@ -154,6 +183,17 @@ class Project(object):
         self._sp_cache_warned = False
         self._sp_cache_miss_warning_threshold = self._config.get(
             'statepoint_cache_miss_warning_threshold', 500)
+        self._cache_num_segments = 0
+        self._cache_ids = None, None
+        self._doc_cache = None
+        self._doc_cache_modified = False
+        self._metadata_store = None
+        self._metadata_store_checked = False
+        self._metadata_store_pending = set()
+        self._job_dirs_cache = None
+        self._job_dirs_set = None, set()
+        self._sorted_ids = None, []
+        self._sp_search_index = None, None
 
     def __str__(self):
         "Returns the project's id."
@@ -225,18 +265,19 @@ class Project(object):
 
     def min_len_unique_id(self):
         "Determine the minimum length required for an id to be unique."
-        job_ids = list(self.find_job_ids())
-        tmp = set()
-        for i in range(32):
-            tmp.clear()
-            for _id in job_ids:
-                if _id[:i] in tmp:
-                    break
-                else:
-                    tmp.add(_id[:i])
-            else:
-                break
-        return i
+        job_ids = self._sorted_job_ids()
+        # The longest common prefix of any two ids is found between neighbors.
+        max_common_prefix = -1
+        for pair in zip(job_ids, islice(job_ids, 1, None)):
+            max_common_prefix = max(max_common_prefix, len(os.path.commonprefix(pair)))
+        return max_common_prefix + 1
+
+    def _sorted_job_ids(self):
+        "Return the sorted list of all job ids, which is only re-sorted when jobs changed."
+        job_ids = self._job_dirs()
+        if job_ids is not self._sorted_ids[0]:
+            self._sorted_ids = job_ids, sorted(job_ids)
+        return self._sorted_ids[1]
 
     def fn(self, filename):
         """Prepend a filename with the project's root directory path.
@@ -279,9 +320,17 @@ class Project(object):
         :rtype: :class:`~.JSONDict`
         """
         if self._document is None:
-            self._document = JSONDict(filename=self._fn_doc, write_concern=True)
+            self._document = JSONDict(
+                filename=self._fn_doc, write_concern=True, cache=self._document_read_cache())
         return self._document
 
+    def _document_read_cache(self):
+        """Return whether documents are read through the read cache.
+
+        Configured with the 'document_read_cache' option, disabled by default.
+        """
+        return is_boolean(self._config.get('document_read_cache', False))
+
     @document.setter
     def document(self, new_doc):
         self._reset_document(new_doc)
@@ -380,15 +429,107 @@ class Project(object):
         else:
             # worst case (no statepoint and cache miss)
             if len(id) < 32:
-                job_ids = self.find_job_ids()
-                matches = [_id for _id in job_ids if _id.startswith(id)]
+                job_ids = self._sorted_job_ids()
+                i = bisect_left(job_ids, id)
+                matches = [_id for _id in job_ids[i:i+2] if _id.startswith(id)]
                 if len(matches) == 1:
                     id = matches[0]
                 elif len(matches) > 1:
                     raise LookupError(id)
             return self.Job(project=self, statepoint=self.get_statepoint(id), _id=id)
 
+    def open_jobs(self, statepoints):
+        """Open the jobs associated with a sequence of state points.
+
+        This is equivalent to calling :meth:`~.open_job` for each state point,
+        but all jobs are registered with the project at once.
+
+        :param statepoints: The unique sets of parameters of all jobs.
+        :type statepoints: iterable of mappings
+        :return: The job instances.
+        :rtype: list of :class:`~.Job`
+        """
+        jobs = [self.Job(project=self, statepoint=sp) for sp in statepoints]
+        self._sp_cache.update(
+            (job._id, dict(job._statepoint)) for job in jobs if job._id not in self._sp_cache)
+        return jobs
+
+    def init_jobs(self, statepoints, parallel=None):
+        """Open and initialize the jobs associated with a sequence of state points.
+
+        The job workspace directories and manifest files are created concurrently
+        by a pool of threads, which is significantly faster than initializing the
+        jobs one by one, especially on network file systems.
+
+        :param statepoints: The sets of parameters of all jobs; each job is
+            initialized only once, even if its state point is repeated.
+        :type statepoints: iterable of mappings
+        :param parallel: The number of threads used to initialize the jobs,
+            defaults to the number of processors. Jobs are initialized serially if
+            this argument is 1.
+        :type parallel: int
+        :return: The initialized job instances.
+        :rtype: list of :class:`~.Job`
+        """
+        jobs = self.open_jobs(statepoints)
+        # Repeated state points must not be initialized concurrently.
+        unique_jobs = list(OrderedDict((job._id, job) for job in jobs).values())
+
+        def _init(job):
+            job.init()
+
+        if parallel == 1:
+            for job in unique_jobs:
+                _init(job)
+        elif six.PY2:
+            pool = ThreadPool(parallel)
+            try:
+                pool.map(_init, unique_jobs)
+            finally:
+                pool.close()
+                pool.join()
+        else:
+            with ThreadPool(parallel) as pool:
+                pool.map(_init, unique_jobs)
+        return jobs
+
     def _job_dirs(self):
+        """Return the ids of all jobs in the workspace.
+
+        The workspace listing is cached and only renewed when the workspace
+        directory's inode or modification time changed. The same list object
+        is returned as long as the listing does not change, which allows callers
+        to validate derived caches by identity. Alternatively, the
+        listing is reused without any check for the number of seconds
+        configured with the 'workspace_listing_ttl' option; jobs initialized,
+        removed, or moved through this project are reflected immediately.
+        """
+        now = time.time()
+        cache = self._job_dirs_cache
+        if cache is not None and now - cache[1] < float(
+                self._config.get('workspace_listing_ttl', 0)):
+            return cache[2]
+        try:
+            st = os.stat(self._wd)
+        except OSError:
+            key = None
+        else:
+            key = [st.st_ino, st.st_mtime]
+        if cache is not None and key is not None and cache[0] == key \
+                and cache[1] - st.st_mtime > MTIME_RESOLUTION:
+            self._job_dirs_cache = key, now, cache[2]
+            return cache[2]
+        job_ids = list(self._list_job_dirs())
+        if cache is not None and job_ids == cache[2]:
+            job_ids = cache[2]
+        self._job_dirs_cache = key, now, job_ids
+        return job_ids
+
+    def _invalidate_job_dirs(self):
+        "Discard the cached workspace listing after jobs were added or removed."
+        self._job_dirs_cache = None
+
+    def _list_job_dirs(self):
         try:
             for d in os.listdir(self._wd):
                 if JOB_ID_REGEX.match(d):
@@ -410,12 +551,7 @@ class Project(object):
 
     def num_jobs(self):
         "Return the number of initialized jobs."
-        # We simply count the the number of valid directories and avoid building a list
-        # for improved performance.
-        i = 0
-        for i, _ in enumerate(self._job_dirs(), 1):
-            pass
-        return i
+        return len(self._job_dirs())
 
     __len__ = num_jobs
 
@@ -427,7 +563,10 @@ class Project(object):
         :returns: True when the job is initialized for this project.
         :rtype: bool
         """
-        return job.get_id() in self.find_job_ids()
+        job_ids = self._job_dirs()
+        if job_ids is not self._job_dirs_set[0]:
+            self._job_dirs_set = job_ids, set(job_ids)
+        return job.get_id() in self._job_dirs_set[1]
 
     def build_job_search_index(self, index, _trust=False):
         """Build a job search index.
@@ -535,16 +674,29 @@ class Project(object):
         """
         if filter is None and doc_filter is None and index is None:
             return list(self._job_dirs())
+        if index is None and (filter or doc_filter):
+            job_ids = self._find_job_ids_in_metadata_store(filter, doc_filter)
+            if job_ids is not None:
+                return job_ids
         if index is None:
-            if doc_filter is None:
-                index = self._sp_index()
-            else:
-                index = self.index(include_job_document=True)
-            search_index = JobSearchIndex(index, _trust=True)
+            search_index = self._job_search_index(include_job_document=doc_filter is not None)
         else:
             search_index = JobSearchIndex(index)
         return search_index.find_job_ids(filter=filter, doc_filter=doc_filter)
 
+    def _job_search_index(self, include_job_document=False):
+        """Return a job search index for all jobs in the workspace.
+
+        The state point search index and its internal indexes are reused
+        until the workspace listing changes.
+        """
+        if include_job_document:
+            return JobSearchIndex(self.index(include_job_document=True), _trust=True)
+        job_ids = self._job_dirs()
+        if job_ids is not self._sp_search_index[0]:
+            self._sp_search_index = job_ids, JobSearchIndex(self._sp_index(), _trust=True)
+        return self._sp_search_index[1]
+
     def find_jobs(self, filter=None, doc_filter=None):
         """Find all jobs in the project's workspace.
 
@@ -553,6 +705,12 @@ class Project(object):
         statepoints, whereas the `doc_filter` argument compares against job
         document keys.
 
+        The search is executed on first access of the returned cursor and its
+        result is reused until jobs are added to or removed from the workspace.
+        Modifications of job documents do not renew the result, which means
+        that the result of a search with a `doc_filter` may be outdated; call
+        :meth:`JobsCursor.refresh` to repeat the search in that case.
+
         :param filter: A mapping of key-value pairs that all
             indexed job statepoints are compared against.
         :type filter: Mapping
@@ -642,6 +800,35 @@ class Project(object):
         """
         return self.find_jobs().groupbydoc(key, default=default)
 
+    def distinct(self, key, doc=False):
+        """Return a list of the distinct values of a state point or document key.
+
+        This method can be called on any :class:`~.JobsCursor`, see
+        :meth:`.JobsCursor.distinct`.
+
+        :param key: The (nested) state point key.
+        :type key: str
+        :param doc: If True, key refers to the job document instead of the state point.
+        :type doc: bool
+        :returns: A list of distinct values.
+        """
+        return self.find_jobs().distinct(key, doc=doc)
+
+    def group_count(self, keys, doc=False):
+        """Return the number of jobs per distinct value(s) of state point or document keys.
+
+        This method can be called on any :class:`~.JobsCursor`, see
+        :meth:`.JobsCursor.group_count`.
+
+        :param keys: The (nested) state point key or a sequence of keys to group by.
+        :type keys: str or sequence of str
+        :param doc: If True, the keys refer to the job document instead of the state point.
+        :type doc: bool
+        :returns: A mapping of values, or tuples of values for a sequence of keys,
+            to the number of jobs.
+        """
+        return self.find_jobs().group_count(keys, doc=doc)
+
     def to_dataframe(self, *args, **kwargs):
         """Export the project metadata to a pandas dataframe.
 
@@ -1191,22 +1378,86 @@ class Project(object):
             self._index_cache[_id] = dict(statepoint=self.get_statepoint(_id), _id=_id)
         return self._index_cache.values()
 
-    def _build_index(self, include_job_document=False):
+    def _get_job_document(self, wd, _id):
+        """Return the document of job with id _id from the workspace wd.
+
+        Documents are stored in the job document cache and only read from
+        disk if the file's inode, size, or modification time changed since
+        the last read.
+        """
+        self._load_doc_cache()
+        fn_doc = os.path.join(wd, _id, self.Job.FN_DOCUMENT)
+        try:
+            st = os.stat(fn_doc)
+        except OSError as error:
+            if error.errno != errno.ENOENT:
+                raise
+            if self._doc_cache.pop(_id, None) is not None:
+                self._doc_cache_modified = True
+            return dict()
+        key = [st.st_ino, st.st_size, st.st_mtime]
+        cached = self._doc_cache.get(_id)
+        if cached is not None and cached[0] == key:
+            return cached[1]
+        with open(fn_doc, 'rb') as file:
+            doc = json.loads(file.read().decode())
+        # Entries are only cached when the file's modification time is old enough
+        # to guarantee that a later modification would change the time stamp.
+        if time.time() - st.st_mtime > MTIME_RESOLUTION:
+            self._doc_cache[_id] = [key, doc]
+            self._doc_cache_modified = True
+        elif self._doc_cache.pop(_id, None) is not None:
+            self._doc_cache_modified = True
+        return doc
+
+    def _read_job_documents(self, job_ids, parallel=None, ordered=True):
+        """Yield tuples of job id and job document for all jobs in job_ids.
+
+        The documents are read by a pool of `parallel` threads, which defaults
+        to the 'index_parallel' configuration option. The tuples are yielded
+        in the order of job_ids, unless ordered is False.
+        """
+        if parallel is None:
+            parallel = int(self._config.get('index_parallel', 1))
+        if self.Job is Job:     # use optimized path
+            wd = self.workspace()
+            self._load_doc_cache()
+
+            def _read(_id):
+                return _id, self._get_job_document(wd, _id)
+        else:
+            def _read(_id):
+                return _id, dict(self.open_job(id=_id).document)
+
+        if parallel == 1:
+            for _id in job_ids:
+                yield _read(_id)
+            return
+        job_ids = list(job_ids)
+        chunksize = max(1, min(100, len(job_ids) // (4 * parallel)))
+        pool = ThreadPool(parallel)
+        try:
+            imap = pool.imap if ordered else pool.imap_unordered
+            for item in imap(_read, job_ids, chunksize):
+                yield item
+        finally:
+            pool.terminate()
+
+    def _build_index(self, include_job_document=False, parallel=None, ordered=True):
         "Return a basic state point index."
-        wd = self.workspace() if self.Job is Job else None
-        for _id in self.find_job_ids():
+        job_ids = self.find_job_ids()
+        if not include_job_document:
+            for _id in job_ids:
+                yield dict(_id=_id, statepoint=self.get_statepoint(_id))
+            return
+        for _id, document in self._read_job_documents(job_ids, parallel, ordered):
             doc = dict(_id=_id, statepoint=self.get_statepoint(_id))
-            if include_job_document:
-                if wd is None:
-                    doc.update(self.open_job(id=_id).document)
-                else:   # use optimized path
-                    try:
-                        with open(os.path.join(wd, _id, self.Job.FN_DOCUMENT), 'rb') as file:
-                            doc.update(json.loads(file.read().decode()))
-                    except IOError as error:
-                        if error.errno != errno.ENOENT:
-                            raise
+            doc.update(document)
             yield doc
+        if self.Job is Job:
+            self._prune_doc_cache(job_ids)
+            if self._doc_cache_modified and self.isfile(self.FN_DOC_CACHE):
+                self._write_doc_cache()
 
     def _update_in_memory_cache(self):
         "Update the in-memory state point cache to reflect the workspace."
@@ -1245,12 +1496,118 @@ class Project(object):
             logger.debug("In-memory cache is up to date.")
 
     def _remove_persistent_cache_file(self):
-        "Remove the persistent cache file (if it exists)."
+        "Remove the persistent cache files (if they exist)."
+        for fn in (self.FN_CACHE, self.FN_CACHE_LOG, self.FN_DOC_CACHE):
+            try:
+                os.remove(self.fn(fn))
+            except (OSError, IOError) as error:
+                if error.errno != errno.ENOENT:
+                    raise error
+
+    def _get_metadata_store(self, refresh=False):
+        """Return the metadata store if it exists, otherwise None.
+
+        The project root directory is only checked for the store once,
+        unless refresh is True, so that job operations do not need to access
+        the file system when the metadata store is not used.
+        """
+        if self._metadata_store is None and (refresh or not self._metadata_store_checked):
+            self._metadata_store_checked = True
+            if SQLITE3 and self.isfile(self.FN_METADATA_STORE):
+                self._metadata_store = MetadataStore(self.fn(self.FN_METADATA_STORE))
+        return self._metadata_store
+
+    def _read_job_document(self, _id):
+        "Read the document of job with id _id directly from the workspace."
         try:
-            os.remove(self.fn(self.FN_CACHE))
-        except (OSError, IOError) as error:
+            with open(os.path.join(self._wd, _id, self.Job.FN_DOCUMENT), 'rb') as file:
+                return json.loads(file.read().decode())
+        except (IOError, OSError) as error:
             if error.errno != errno.ENOENT:
-                raise error
+                raise
+            return dict()
+
+    def _metadata_store_add(self, job):
+        "Add an initialized job to the metadata store (if it exists)."
+        store = self._get_metadata_store()
+        if store is not None and job._id not in store:
+            store.update([(job._id, job._statepoint, self._read_job_document(job._id))])
+
+    def _metadata_store_update_document(self, _id, document):
+        "Update a job's document within the metadata store (if it exists)."
+        store = self._get_metadata_store()
+        if store is None:
+            # Synchronized in case the store was created by another process.
+            self._metadata_store_pending.add(_id)
+        else:
+            store.update_document(_id, document)
+
+    def _metadata_store_remove(self, _id):
+        "Remove a job from the metadata store (if it exists)."
+        store = self._get_metadata_store()
+        if store is not None:
+            store.remove([_id])
+
+    def _sync_metadata_store(self, store):
+        "Add jobs missing from the metadata store and remove jobs which no longer exist."
+        job_ids = set(self._job_dirs())
+        stored_ids = store.ids()
+        store.remove(stored_ids.difference(job_ids))
+        store.update((_id, self.get_statepoint(_id), self._read_job_document(_id))
+                     for _id in job_ids.difference(stored_ids))
+        for _id in self._metadata_store_pending.intersection(stored_ids, job_ids):
+            store.update_document(_id, self._read_job_document(_id))
+        self._metadata_store_pending.clear()
+
+    def _find_job_ids_in_metadata_store(self, filter, doc_filter):
+        "Find job ids with the metadata store; returns None if there is no store."
+        store = self._get_metadata_store(refresh=True)
+        if store is None:
+            return None
+        try:
+            self._sync_metadata_store(store)
+            statepoints = store.find_statepoints(_resolve_index_filter(filter, doc_filter))
+        except MetadataStore.DatabaseError as error:
+            logger.warning(
+                "Unable to search the metadata store, run update_metadata_store() "
+                "to rebuild it: '{}'.".format(error))
+            return None
+        # Register the state points to avoid reading them from the workspace.
+        for _id, statepoint in statepoints.items():
+            if _id not in self._sp_cache:
+                self._sp_cache[_id] = json.loads(statepoint)
+        return set(statepoints)
+
+    def update_metadata_store(self):
+        """Create or update the project's metadata store.
+
+        The metadata store is a SQLite database in the project root directory,
+        which holds the state points and documents of all jobs. Once created,
+        it is kept up to date by all job operations and searches with state
+        point and document filters are executed as indexed queries on the
+        database instead of reading the data from the workspace.
+
+        This function re-reads all state points and documents from the
+        workspace, which may be necessary after documents were modified
+        outside of signac.
+
+        :returns: The number of jobs in the metadata store.
+        """
+        if not SQLITE3:
+            raise RuntimeError("The metadata store requires the sqlite3 module.")
+        logger.info('Update metadata store...')
+        start = time.time()
+        store = self._get_metadata_store()
+        if store is None:
+            store = self._metadata_store = MetadataStore(self.fn(self.FN_METADATA_STORE))
+        job_ids = list(self._job_dirs())
+        store.clear()
+        store.update((_id, self.get_statepoint(_id), self._read_job_document(_id))
+                     for _id in job_ids)
+        self._metadata_store_pending.clear()
+        delta = time.time() - start
+        logger.info("Updated metadata store in {:.3f} seconds.".format(delta))
+        return len(job_ids)
 
     def update_cache(self):
         """Update the persistent state point cache.
@@ -1260,53 +1617,204 @@ class Project(object):
         including iteration and filtering or selection are expected
         to be significantly faster after calling this function, especially
         for large data spaces.
+
+        In addition, this function creates a persistent job document cache,
+        which is kept up to date by searches with document filters. Job
+        documents are only re-read when their size or modification time
+        changed.
+
+        Changes to the state point cache are appended as segments to a cache
+        log file, which is merged into the cache file once it contains more
+        than :const:`CACHE_MAX_SEGMENTS` segments or when calling
+        :meth:`~.compact_cache`.
         """
         logger.info('Update cache...')
         start = time.time()
-        cache = self._read_cache()
+        cache_ids = self._get_cache_ids()
         self._update_in_memory_cache()
-        if cache is None or set(cache) != set(self._sp_cache):
-            fn_cache = self.fn(self.FN_CACHE)
-            fn_cache_tmp = fn_cache + '~'
+        if cache_ids is None:
+            self._update_doc_cache(self._sp_cache)
+            self._write_cache(self._sp_cache)
+        else:
+            to_add = set(self._sp_cache).difference(cache_ids)
+            to_remove = cache_ids.difference(self._sp_cache)
+            self._update_doc_cache(to_add)
+            if not (to_add or to_remove):
+                logger.info("Cache is up to date.")
+                return
+            elif self._cache_num_segments >= CACHE_MAX_SEGMENTS:
+                self._write_cache(self._sp_cache)
+            else:
+                self._append_cache_segment(
+                    add={_id: self._sp_cache[_id] for _id in to_add},
+                    remove=list(to_remove))
+        delta = time.time() - start
+        logger.info("Updated cache in {:.3f} seconds.".format(delta))
+        return len(self._sp_cache)
+
+    def compact_cache(self):
+        """Merge the state point cache log into the persistent state point cache file.
+
+        The state point cache log is automatically compacted by :meth:`~.update_cache`
+        when necessary, however it may be compacted explicitly with this method.
+        This function does nothing if there is no persistent cache.
+        """
+        cache = self._read_cache()
+        if cache is not None and self._cache_num_segments:
+            self._write_cache(cache)
+
+    def _cache_files_key(self):
+        "Return a key of the status of the persistent cache file and cache log."
+        key = []
+        for fn in (self.FN_CACHE, self.FN_CACHE_LOG):
             try:
-                with gzip.open(fn_cache_tmp, 'wb') as cachefile:
-                    cachefile.write(json.dumps(self._sp_cache).encode())
-            except OSError:  # clean-up
-                try:
-                    os.remove(fn_cache_tmp)
-                except (OSError, IOError):
-                    pass
-                raise
+                st = os.stat(self.fn(fn))
+            except OSError as error:
+                if error.errno != errno.ENOENT:
+                    raise
+                key.append(None)
             else:
-                if six.PY2:
-                    os.rename(fn_cache_tmp, fn_cache)
-                else:
-                    os.replace(fn_cache_tmp, fn_cache)
-            delta = time.time() - start
-            logger.info("Updated cache in {:.3f} seconds.".format(delta))
-            return len(self._sp_cache)
-        else:
-            logger.info("Cache is up to date.")
+                key.append([st.st_ino, st.st_size, st.st_mtime])
+        return key
+
+    def _get_cache_ids(self):
+        """Return the ids of the persistent state point cache or None if there is none.
+
+        The cache is only read if the cache file or cache log changed since
+        they were last read or written by this instance.
+        """
+        key, ids = self._cache_ids
+        if ids is None or key != self._cache_files_key():
+            self._read_cache()
+        return self._cache_ids[1]
+
+    def _write_cache(self, cache):
+        "Write the cache to the persistent cache file and remove the cache log."
+        _write_json_gz(self.fn(self.FN_CACHE), cache)
+        try:
+            os.remove(self.fn(self.FN_CACHE_LOG))
+        except (OSError, IOError) as error:
+            if error.errno != errno.ENOENT:
+                raise
+        self._cache_num_segments = 0
+        self._cache_ids = self._cache_files_key(), set(cache)
+
+    def _append_cache_segment(self, add, remove):
+        "Append a segment of added and removed state points to the cache log."
+        blob = json.dumps({'add': add, 'remove': remove}) + '\n'
+        with open(self.fn(self.FN_CACHE_LOG), 'ab+') as logfile:
+            # Terminate a segment that was only partially written, such that
+            # it does not corrupt the segment that is appended.
+            logfile.seek(0, os.SEEK_END)
+            if logfile.tell():
+                logfile.seek(-1, os.SEEK_END)
+                if logfile.read(1) != b'\n':
+                    blob = '\n' + blob
+            logfile.write(blob.encode())
+        self._cache_num_segments += 1
+        ids = self._cache_ids[1]
+        if ids is not None:
+            ids.difference_update(remove)
+            ids.update(add)
+            self._cache_ids = self._cache_files_key(), ids
+
+    def _prune_doc_cache(self, job_ids):
+        "Remove all job document cache entries of jobs that are not in job_ids."
+        self._load_doc_cache()
+        to_remove = set(self._doc_cache).difference(job_ids)
+        for _id in to_remove:
+            del self._doc_cache[_id]
+        if to_remove:
+            self._doc_cache_modified = True
+
+    def _update_doc_cache(self, new_ids):
+        """Update the persistent job document cache.
+
+        Only the documents of the jobs in new_ids are read, unless there is
+        no persistent job document cache yet.
+        """
+        if self.Job is not Job:
+            return
+        wd = self.workspace()
+        job_ids = self.find_job_ids()
+        if not self.isfile(self.FN_DOC_CACHE):
+            new_ids = job_ids
+        for _id in new_ids:
+            self._get_job_document(wd, _id)
+        self._prune_doc_cache(job_ids)
+        if self._doc_cache_modified or not self.isfile(self.FN_DOC_CACHE):
+            self._write_doc_cache()
+
+    def _load_doc_cache(self):
+        "Load the job document cache from the persistent cache file if necessary."
+        if self._doc_cache is None:
+            self._doc_cache = self._read_doc_cache() or dict()
+
+    def _write_doc_cache(self):
+        "Write the job document cache to the persistent cache file."
+        logger.debug("Writing job document cache...")
+        _write_json_gz(self.fn(self.FN_DOC_CACHE), self._doc_cache)
+        self._doc_cache_modified = False
+
+    def _read_doc_cache(self):
+        "Read the persistent job document cache (if available)."
+        try:
+            with gzip.open(self.fn(self.FN_DOC_CACHE), 'rb') as cachefile:
+                return json.loads(cachefile.read().decode())
+        except IOError as error:
+            if not error.errno == errno.ENOENT:
+                raise
+        except ValueError as error:
+            logger.warning("Ignoring corrupted job document cache: {}".format(error))
 
     def _read_cache(self):
         "Read the persistent state point cache (if available)."
         logger.debug("Reading cache...")
         start = time.time()
+        key = self._cache_files_key()
         try:
             with gzip.open(self.fn(self.FN_CACHE), 'rb') as cachefile:
                 cache = json.loads(cachefile.read().decode())
-            self._sp_cache.update(cache)
         except IOError as error:
             if not error.errno == errno.ENOENT:
                 raise
+            cache = None
+        cache = self._replay_cache_log(cache)
+        self._cache_ids = key, None if cache is None else set(cache)
+        if cache is None:
             logger.debug("No cache file found.")
         else:
+            self._sp_cache.update(cache)
             delta = time.time() - start
             logger.debug("Read cache in {:.3f} seconds.".format(delta))
             return cache
 
+    def _replay_cache_log(self, cache):
+        "Apply all segments of the state point cache log (if available) to cache."
+        self._cache_num_segments = 0
+        try:
+            with open(self.fn(self.FN_CACHE_LOG), 'rb') as logfile:
+                for line in logfile:
+                    try:
+                        segment = json.loads(line.decode())
+                    except ValueError:
+                        # Segments may be incomplete when the process writing
+                        # them was interrupted; the cache is still valid.
+                        logger.warning("Ignoring corrupted state point cache log segment.")
+                        continue
+                    if cache is None:
+                        cache = dict()
+                    for _id in segment['remove']:
+                        cache.pop(_id, None)
+                    cache.update(segment['add'])
+                    self._cache_num_segments += 1
+        except IOError as error:
+            if not error.errno == errno.ENOENT:
+                raise
+        return cache
+
     def index(self, formats=None, depth=0,
-              skip_errors=False, include_job_document=True):
+              skip_errors=False, include_job_document=True, parallel=None):
         r"""Generate an index of the project's workspace.
 
         This generator function indexes every file in the project's
@@ -1330,6 +1838,10 @@ class Project(object):
         :param include_job_document: Include the contents of job
             documents.
         :type include_job_document: bool
+        :param parallel: The number of threads used to read the job
+            documents. Defaults to the 'index_parallel' configuration
+            option or 1 if it is not set.
+        :type parallel: int
         :yields: index documents"""
         if formats is None:
             root = self.workspace()
@@ -1339,7 +1851,8 @@ class Project(object):
                 doc['root'] = root
                 return doc
 
-            docs = self._build_index(include_job_document=include_job_document)
+            docs = self._build_index(
+                include_job_document=include_job_document, parallel=parallel)
             docs = map(_full_doc, docs)
         else:
             if six.PY2:
@@ -1566,6 +2079,25 @@ def TemporaryProject(name=None, cls=None, **kwargs):
         yield cls.init_project(name=name, root=tmp_dir)
 
 
+def _write_json_gz(fn, data):
+    "Atomically write the JSON-encoded data to a gzip-compressed file."
+    fn_tmp = fn + '~'
+    try:
+        with gzip.open(fn_tmp, 'wb') as file:
+            file.write(json.dumps(data).encode())
+    except OSError:  # clean-up
+        try:
+            os.remove(fn_tmp)
+        except (OSError, IOError):
+            pass
+        raise
+    else:
+        if six.PY2:
+            os.rename(fn_tmp, fn)
+        else:
+            os.replace(fn_tmp, fn)
+
+
 def _skip_errors(iterable, log=print):
     while True:
         try:
@@ -1603,26 +2135,48 @@ class JobsCursor(object):
         self._filter = filter
         self._doc_filter = doc_filter
 
+        # The materialized search result and the workspace listing it is based on.
+        self._ids = None
+        self._ids_job_dirs = None
+
         # This private attribute allows us to implement the deprecated
         # next() method for this class.
         self._next_iter = None
 
-    def __len__(self):
+    @property
+    def ids(self):
+        """The ids of all jobs matching the filters.
+
+        The search is only executed once and its result is reused until the
+        project's workspace listing changes or :meth:`~.refresh` is called.
+
+        :rtype: tuple
+        """
         # Highly performance critical code path!!
-        if self._filter or self._doc_filter:
-            # We use the standard function for determining job ids if and only if
-            # any of the two filter is provided.
-            return len(self._project.find_job_ids(self._filter, self._doc_filter))
-        else:
-            # Without filter we can simply return the length of the whole project.
-            return self._project.__len__()
+        job_dirs = self._project._job_dirs()
+        if self._ids is None or job_dirs is not self._ids_job_dirs:
+            if self._filter or self._doc_filter:
+                self._ids = tuple(self._project.find_job_ids(self._filter, self._doc_filter))
+            else:
+                # Without filter, the result is simply the workspace listing.
+                self._ids = tuple(job_dirs)
+            self._ids_job_dirs = job_dirs
+        return self._ids
+
+    def refresh(self):
+        """Discard the materialized search result.
+
+        Call this function to account for changes of job documents, which
+        may affect the result of a search with a document filter.
+        """
+        self._ids = None
+        self._ids_job_dirs = None
+
+    def __len__(self):
+        return len(self.ids)
 
     def __iter__(self):
-        # Code duplication here for improved performance.
-        return _JobsCursorIterator(
-            self._project,
-            self._project.find_job_ids(self._filter, self._doc_filter),
-            )
+        return _JobsCursorIterator(self._project, self.ids)
 
     def next(self):
         """Return the next element.
@@ -1758,6 +2312,67 @@ class JobsCursor(object):
                 return key(job.document)
         return groupby(sorted(iter(self), key=keyfunction), key=keyfunction)
 
+    def _search_index(self, doc):
+        "Return the project's job search index and the filter of this cursor for it."
+        search_index = self._project._job_search_index(
+            include_job_document=doc or bool(self._doc_filter))
+        return search_index, _resolve_index_filter(self._filter, self._doc_filter)
+
+    def distinct(self, key, doc=False):
+        """Return a list of the distinct values of a state point or document key.
+
+        For example, to determine all values of the state point key 'b'
+        among all jobs where 'a' is 0:
+
+        .. code-block:: python
+
+            values = project.find_jobs({'a': 0}).distinct('b')
+
+        The values are determined from the indexes of the project's job
+        search index, without opening any job. Jobs without a value for key
+        and mapping values are ignored.
+
+        :param key: The (nested) state point key.
+        :type key: str
+        :param doc: If True, key refers to the job document instead of the state point.
+        :type doc: bool
+        :returns: A list of distinct values.
+        """
+        search_index, filter = self._search_index(doc)
+        return search_index._collection.distinct(
+            key if doc else 'statepoint.' + key, filter)
+
+    def group_count(self, keys, doc=False):
+        """Return the number of jobs per distinct value(s) of state point or document keys.
+
+        For example, to count the jobs per value of the state point key 'a'
+        and per combination of values of 'a' and 'b':
+
+        .. code-block:: python
+
+            project.find_jobs().group_count('a')         # {0: 10, 1: 12, ...}
+            project.find_jobs().group_count(['a', 'b'])  # {(0, 'x'): 3, ...}
+
+        Unlike :meth:`~.groupby`, the counts are determined from the indexes
+        of the project's job search index, without opening any job. Jobs
+        without a value for any of the keys and mapping values are ignored.
+        List values are represented as tuples.
+
+        :param keys: The (nested) state point key or a sequence of keys to group by.
+        :type keys: str or sequence of str
+        :param doc: If True, the keys refer to the job document instead of the state point.
+        :type doc: bool
+        :returns: A mapping of values, or tuples of values for a sequence of keys,
+            to the number of jobs.
+        """
+        search_index, filter = self._search_index(doc)
+        if not doc:
+            if isinstance(keys, six.string_types):
+                keys = 'statepoint.' + keys
+            else:
+                keys = ['statepoint.' + key for key in keys]
+        return search_index._collection.group_count(keys, filter)
+
     def export_to(self, target, path=None, copytree=None):
         """Export all jobs to a target location, such as a directory or a (zipped) archive file.
 
@@ -1788,14 +2403,15 @@ class JobsCursor(object):
         """
         import pandas
 
-        def _export_sp_and_doc(job):
-            for key, value in job.sp.items():
+        def _export_sp_and_doc(_id, doc):
+            for key, value in self._project.get_statepoint(_id).items():
                 yield sp_prefix + key, value
-            for key, value in job.doc.items():
+            for key, value in doc.items():
                 yield doc_prefix + key, value
 
+        docs = self._project._read_job_documents(self.ids)
         return pandas.DataFrame.from_dict(
-            data={job._id: dict(_export_sp_and_doc(job)) for job in self},
+            data={_id: dict(_export_sp_and_doc(_id, doc)) for _id, doc in docs},
             orient='index').infer_objects()
 
     def __repr__(self):
@@ -0,0 +1,212 @@
+# Copyright (c) 2019 The Regents of the University of Michigan
+# All rights reserved.
+# This software is licensed under the BSD 3-Clause License.
+"""A local index server for a project.
+
+The index server keeps a project's state point and document index in memory
+and answers queries from the command line interface over a Unix domain socket
+within the project's root directory. Requests and responses are encoded as
+JSON documents, one per line. A request has the form ``{"cmd": <command>,
+<arguments>}``, the response is either ``{"result": <result>}`` or
+``{"error": <message>}``.
+"""
+import os
+import errno
+import socket
+import logging
+import threading
+
+from ..core import json
+from ..common.six.moves import socketserver
+from .job import Job
+
+logger = logging.getLogger(__name__)
+
+FN_SOCKET = '.signac_server.sock'
+"The name of the index server's socket file within the project root directory."
+
+UNIX_SOCKETS = hasattr(socket, 'AF_UNIX')
+
+
+class _RequestHandler(socketserver.StreamRequestHandler):
+
+    def handle(self):
+        for line in iter(self.rfile.readline, b''):
+            if not line.strip():
+                continue
+            response = self.server.index_server.respond(line.decode())
+            self.wfile.write((json.dumps(response) + '\n').encode())
+            self.wfile.flush()
+
+
+if UNIX_SOCKETS:
+    class _UnixStreamServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+        daemon_threads = True
+
+
+class IndexServer(object):
+    """Answer find, schema, and len queries for a project.
+
+    All queries are executed on the same project instance, which keeps the
+    state point cache, the job document cache, and the workspace listing in
+    memory. All of these are validated against the workspace for each query,
+    additionally the server refreshes them every `poll_interval` seconds.
+
+    .. code-block:: python
+
+        server = IndexServer(project)
+        server.serve_forever()
+
+    :param project: The project to serve.
+    :type project: :class:`~.Project`
+    :param poll_interval: The number of seconds between two refreshes of
+        the in-memory index, or None to disable periodic refreshes.
+    :type poll_interval: float
+    """
+
+    def __init__(self, project, poll_interval=5):
+        if not UNIX_SOCKETS:
+            raise RuntimeError("The index server requires Unix domain sockets.")
+        self._project = project
+        self._poll_interval = poll_interval
+        self._filename = project.fn(FN_SOCKET)
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._server = None
+        self._commands = {
+            'ping': self._ping,
+            'find': self._find,
+            'len': self._len,
+            'schema': self._schema,
+        }
+
+    @property
+    def filename(self):
+        "The filename of the server's socket file."
+        return self._filename
+
+    def _ping(self):
+        return True
+
+    def _find(self, filter=None, doc_filter=None):
+        return list(self._project.find_job_ids(filter=filter, doc_filter=doc_filter))
+
+    def _len(self):
+        return self._project.num_jobs()
+
+    def _schema(self, exclude_const=False, subset=None,
+                depth=0, precision=None, max_num_range=5):
+        schema = self._project.detect_schema(exclude_const=exclude_const, subset=subset)
+        return schema.format(depth=depth, precision=precision, max_num_range=max_num_range)
+
+    def respond(self, request):
+        """Execute a JSON-encoded request and return the response.
+
+        :param request: The JSON-encoded request.
+        :type request: str
+        :returns: The response document.
+        :rtype: dict
+        """
+        try:
+            request = json.loads(request)
+            command = self._commands[request.pop('cmd')]
+            with self._lock:
+                return dict(result=command(**request))
+        except Exception as error:
+            logger.debug("Failed to answer request: {}".format(error))
+            return dict(error='{}: {}'.format(type(error).__name__, error))
+
+    def refresh(self):
+        "Update the in-memory state point and document index from the workspace."
+        with self._lock:
+            project = self._project
+            project._sp_index()
+            if project.Job is Job:
+                job_ids = project.find_job_ids()
+                for _ in project._read_job_documents(job_ids):
+                    pass
+                project._prune_doc_cache(job_ids)
+
+    def _poll(self):
+        while not self._stopped.wait(self._poll_interval):
+            try:
+                self.refresh()
+            except Exception as error:
+                logger.warning("Failed to refresh the index: {}".format(error))
+
+    def _bind(self):
+        if query_server(self._project, 'ping'):
+            raise RuntimeError(
+                "An index server is already running for project '{}'.".format(self._project))
+        try:    # Remove a stale socket file of a server that was not shut down.
+            os.remove(self._filename)
+        except OSError as error:
+            if error.errno != errno.ENOENT:
+                raise
+        server = _UnixStreamServer(self._filename, _RequestHandler)
+        server.index_server = self
+        return server
+
+    def serve_forever(self):
+        "Serve requests until :meth:`shutdown` is called."
+        self.refresh()
+        self._server = self._bind()
+        self._stopped.clear()
+        if self._poll_interval is not None:
+            poller = threading.Thread(target=self._poll)
+            poller.daemon = True
+            poller.start()
+        logger.info("Serving project '{}' on '{}'.".format(self._project, self._filename))
+        try:
+            self._server.serve_forever()
+        finally:
+            self._stopped.set()
+            self._server.server_close()
+            try:
+                os.remove(self._filename)
+            except OSError:
+                pass
+
+    def shutdown(self):
+        "Stop serving requests; must be called from a different thread."
+        if self._server is not None:
+            self._server.shutdown()
+
+
+def query_server(project, cmd, timeout=600, **kwargs):
+    """Send a query to the index server of a project.
+
+    :param project: The project, whose index server is queried.
+    :type project: :class:`~.Project`
+    :param cmd: The name of the command.
+    :type cmd: str
+    :param timeout: The number of seconds to wait for a response.
+    :type timeout: float
+    :param kwargs: The command's arguments.
+    :returns: The result, or None if no index server is running for the
+        project or the query failed.
+    """
+    filename = project.fn(FN_SOCKET)
+    if not UNIX_SOCKETS or not os.path.exists(filename):
+        return None
+    request = dict(kwargs, cmd=cmd)
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.settimeout(1)
+        sock.connect(filename)
+        sock.settimeout(timeout)
+        sock.sendall((json.dumps(request) + '\n').encode())
+        file = sock.makefile('rb')
+        try:
+            response = json.loads(file.readline().decode())
+        finally:
+            file.close()
+    except (socket.error, IOError, OSError, ValueError) as error:
+        logger.debug("Failed to query index server: {}".format(error))
+        return None
+    finally:
+        sock.close()
+    if 'error' in response:
+        logger.debug("Index server error: {}".format(response['error']))
+        return None
+    return response['result']
@@ -4,10 +4,13 @@
 "Dict implementation with backend JSON file."
 import os
 import sys
+import time
 import errno
 import uuid
-import hashlib
 import logging
+import threading
+from collections import OrderedDict
+from multiprocessing.pool import ThreadPool
 from tempfile import mkstemp
 from contextlib import contextmanager
 
@@ -21,12 +24,19 @@ logger = logging.getLogger(__name__)
 
 DEFAULT_BUFFER_SIZE = 32 * 2**20    # 32 MB
 
+DEFAULT_READ_CACHE_SIZE = 32 * 2**20    # 32 MB
+
+# Cached file contents are only trusted if the file was last modified more
+# than this number of seconds before it was read, which guarantees that any
+# later modification changes the file's modification time.
+_MTIME_RESOLUTION = 2
+
+DEFAULT_WRITE_BEHIND_WORKERS = 4
+
 _BUFFERED_MODE = 0
 _BUFFERED_MODE_FORCE_WRITE = None
 _BUFFER_SIZE = None
-_JSONDICT_BUFFER = dict()
-_JSONDICT_HASHES = dict()
-_JSONDICT_META = dict()
+_WRITE_BEHIND = None
 
 
 class BufferException(Error):
@@ -50,14 +60,6 @@ class BufferedFileError(BufferException):
         return "{}({})".format(type(self).__name__, self.files)
 
 
-def _hash(blob):
-    "Calculate and return the md5 hash value for the file data."
-    if blob is not None:
-        m = hashlib.md5()
-        m.update(blob)
-        return m.hexdigest()
-
-
 def _get_filemetadata(filename):
     try:
         return os.path.getsize(filename), os.path.getmtime(filename)
@@ -66,54 +68,374 @@ def _get_filemetadata(filename):
             raise
 
 
-def _store_in_buffer(filename, blob, store_hash=False):
+def _stat_key(st):
+    "Return the key of a file's status used to validate the read cache."
+    return st.st_ino, st.st_size, getattr(st, 'st_mtime_ns', st.st_mtime)
+
+
+class _ReadCache(object):
+    """A cache of the contents of JSON files with least-recently-used eviction.
+
+    Each entry is validated by the (inode, size, modification time) key of the
+    file's status at the time it was read. The total size of all cached file
+    contents is bounded by max_size.
+    """
+
+    def __init__(self, max_size):
+        self.max_size = max_size
+        self.size = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, filename, key):
+        "Return the cached content of the file or None if it is missing or outdated."
+        with self._lock:
+            entry = self._entries.pop(filename, None)
+            if entry is None:
+                return None
+            elif entry[0] == key:
+                self._entries[filename] = entry     # mark as most recently used
+                return entry[1]
+            self.size -= len(entry[1])
+
+    def put(self, filename, key, blob):
+        "Store the content of the file, evicting the least recently used entries."
+        with self._lock:
+            entry = self._entries.pop(filename, None)
+            if entry is not None:
+                self.size -= len(entry[1])
+            if len(blob) > self.max_size:
+                return
+            self._entries[filename] = key, blob
+            self.size += len(blob)
+            while self.size > self.max_size:
+                _, (_, evicted) = self._entries.popitem(last=False)
+                self.size -= len(evicted)
+
+    def discard(self, filename):
+        "Remove the entry of the file if it exists."
+        with self._lock:
+            entry = self._entries.pop(filename, None)
+            if entry is not None:
+                self.size -= len(entry[1])
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.size = 0
+
+
+_READ_CACHE = _ReadCache(DEFAULT_READ_CACHE_SIZE)
+
+
+def _write_file(filename, blob):
+    "Write the blob to a temporary file, which then replaces the original file."
+    try:
+        fd_tmp, fn_tmp = mkstemp(dir=os.path.dirname(filename), suffix='.json')
+        with os.fdopen(fd_tmp, 'wb') as file:
+            file.write(blob)
+    except OSError:
+        os.remove(fn_tmp)
+        raise
+    else:
+        if six.PY2:
+            os.rename(fn_tmp, filename)
+        else:
+            os.replace(fn_tmp, filename)
+
+
+class _BufferManager(object):
+    """The buffer of JSONDict files in buffered mode.
+
+    The buffer keeps the content of each file together with the metadata of
+    the file at the time it was read. Files are explicitly marked as modified
+    when they are saved with a different content, only modified files are
+    written when the buffer is flushed. Unmodified and modified files are kept
+    in least-recently-used order and the total size of their contents is
+    tracked as the buffer load.
+    """
+
+    def __init__(self):
+        self.load = 0
+        self._clean = OrderedDict()
+        self._modified = OrderedDict()
+        self._meta = dict()
+        self._lock = threading.RLock()
+
+    def __contains__(self, filename):
+        return filename in self._clean or filename in self._modified
+
+    def __len__(self):
+        return len(self._clean) + len(self._modified)
+
+    def _pop(self, filename):
+        "Remove and return the content of the file, which must be buffered."
+        entries = self._modified if filename in self._modified else self._clean
+        blob = entries.pop(filename)
+        self.load -= sys.getsizeof(blob)
+        return blob
+
+    def get(self, filename):
+        "Return the content of the file and mark it as most recently used."
+        with self._lock:
+            entries = self._modified if filename in self._modified else self._clean
+            blob = entries.pop(filename)
+            entries[filename] = blob
+            return blob
+
+    def get_modified(self, filename):
+        "Return the content of the file if it is buffered and modified, otherwise None."
+        with self._lock:
+            return self._modified.get(filename)
+
+    def get_meta(self, filename):
+        with self._lock:
+            return self._meta.get(filename)
+
+    def store(self, filename, blob, modified, force_write=False):
+        """Store the content of the file.
+
+        Unless the file is modified, i.e., it was just read, the metadata of the
+        file are stored along with it, if force_write is False. A modification
+        that does not change the content of an unmodified file is ignored.
+
+        Returns True if the file is marked as modified.
+        """
+        with self._lock:
+            if modified and filename in self._clean and self._clean[filename] == blob:
+                self._clean[filename] = self._clean.pop(filename)
+                return False
+            if filename in self:
+                self._pop(filename)
+            if modified:
+                self._modified[filename] = blob
+            else:
+                if not force_write:
+                    self._meta[filename] = _get_filemetadata(filename)
+                self._clean[filename] = blob
+            self.load += sys.getsizeof(blob)
+            return modified
+
+    def discard(self, filename):
+        "Remove the file from the buffer without writing it."
+        with self._lock:
+            if filename in self:
+                self._pop(filename)
+            self._meta.pop(filename, None)
+
+    def mark_written(self, filename, blob, meta):
+        "Record that the content of the file was written to disk."
+        with self._lock:
+            if filename in self._meta:
+                self._meta[filename] = meta
+            if self._modified.get(filename) is blob:
+                del self._modified[filename]
+                self._clean[filename] = blob
+
+    def reduce(self, max_load, exclude=None):
+        """Evict unmodified files until the load does not exceed max_load.
+
+        Returns the least recently used modified files that must be flushed
+        to reduce the load any further. The most recently used file given by
+        exclude is neither evicted nor returned.
+        """
+        with self._lock:
+            while self.load > max_load and self._clean:
+                filename, blob = self._clean.popitem(last=False)
+                if filename == exclude:
+                    self._clean[filename] = blob
+                    break
+                self.load -= sys.getsizeof(blob)
+                self._meta.pop(filename, None)
+            excess = self.load - max_load
+            filenames = []
+            for filename, blob in self._modified.items():
+                if excess <= 0 or filename == exclude:
+                    break
+                filenames.append(filename)
+                excess -= sys.getsizeof(blob)
+            return filenames
+
+    def flush(self, filenames=None, force_write=False):
+        """Write the modified files and remove them from the buffer.
+
+        All files are flushed if filenames is None. Returns a dictionary of
+        files that could not be written, mapped to the reason.
+        """
+        issues = dict()
+        with self._lock:
+            if filenames is None:
+                filenames = list(self._modified) + list(self._clean)
+            for filename in filenames:
+                modified = filename in self._modified
+                blob = self._pop(filename)
+                read = filename in self._meta
+                meta = self._meta.pop(filename, None)
+                if not modified:
+                    continue
+                try:
+                    if read and not force_write and _get_filemetadata(filename) != meta:
+                        issues[filename] = 'File appears to have been externally modified.'
+                        continue
+                    _write_file(filename, blob)
+                except OSError as error:
+                    logger.error(str(error))
+                    issues[filename] = error
+        return issues
+
+
+_BUFFER = _BufferManager()
+
+
+class _WriteBehindFlusher(object):
+    """Flush modified buffered files in the background.
+
+    Modified files are flushed every `interval` seconds or as soon as their
+    total size exceeds `threshold` bytes. The files are written on a pool
+    of `workers` threads and remain in the buffer for subsequent reads.
+
+    Files that appear to have been externally modified are not written, but
+    reported by the next call to :func:`flush_all`, just like errors that
+    occured while writing.
+    """
+
+    def __init__(self, interval, threshold, workers):
+        self.interval = interval
+        self.threshold = threshold
+        self.issues = dict()
+        self._pending = dict()   # filename -> size of the modified blob
+        self._pending_size = 0
+        self._writing = set()
+        self._paused = 0
+        self._stopped = False
+        self._lock = threading.Lock()
+        self._wakeup = threading.Condition(self._lock)
+        self._done = threading.Condition(self._lock)
+        self._pool = ThreadPool(workers)
+        self._thread = threading.Thread(target=self._run, name='signac-write-behind')
+        self._thread.daemon = True
+        self._thread.start()
+
+    def mark_modified(self, filename, size):
+        with self._lock:
+            self._pending_size += size - self._pending.get(filename, 0)
+            self._pending[filename] = size
+            if self.threshold > 0 and self._pending_size > self.threshold:
+                self._wakeup.notify()
+
+    def _run(self):
+        with self._lock:
+            while not self._stopped:
+                self._wakeup.wait(self.interval)
+                if not self._paused:
+                    self._submit()
+
+    def _submit(self):
+        # Files which are still being written are deferred to the next round,
+        # to ensure that the most recent blob is written last.
+        for filename in list(self._pending):
+            if filename not in self._writing:
+                self._pending_size -= self._pending.pop(filename)
+                self._writing.add(filename)
+                self._pool.apply_async(self._write, (filename, ))
+
+    def _write(self, filename):
+        try:
+            blob = _BUFFER.get_modified(filename)
+            if blob is None:
+                return
+            if not _BUFFERED_MODE_FORCE_WRITE:
+                if _get_filemetadata(filename) != _BUFFER.get_meta(filename):
+                    with self._lock:
+                        self.issues[filename] = 'File appears to have been externally modified.'
+                    return
+            _write_file(filename, blob)
+            _BUFFER.mark_written(filename, blob, _get_filemetadata(filename))
+        except OSError as error:
+            logger.error(str(error))
+            with self._lock:
+                self.issues[filename] = error
+        finally:
+            with self._lock:
+                self._writing.discard(filename)
+                self._done.notify_all()
+
+    @contextmanager
+    def barrier(self, filenames=None):
+        """Wait for all in-flight writes and suspend the background flush.
+
+        Pending modifications of the given files, or all files if filenames
+        is None, are discarded, since they are expected to be flushed within
+        this context.
+        """
+        with self._lock:
+            self._paused += 1
+            while self._writing:
+                self._done.wait()
+            for filename in list(self._pending) if filenames is None else filenames:
+                self._pending_size -= self._pending.pop(filename, 0)
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._paused -= 1
+
+    def stop(self):
+        with self._lock:
+            self._stopped = True
+            self._wakeup.notify()
+        self._thread.join()
+        self._pool.close()
+        self._pool.join()
+
+
+@contextmanager
+def _write_behind_barrier(filenames=None):
+    "Suspend the background flush in write-behind mode."
+    if _WRITE_BEHIND is None:
+        yield
+    else:
+        with _WRITE_BEHIND.barrier(filenames):
+            yield
+
+
+def _store_in_buffer(filename, blob, modified=True):
     assert _BUFFERED_MODE > 0
-    blob_size = sys.getsizeof(blob)
-    buffer_load = get_buffer_load()
-    if _BUFFER_SIZE > 0:
-        if blob_size > _BUFFER_SIZE:
-            return False
-        elif blob_size + buffer_load > _BUFFER_SIZE:
-            logger.debug("Buffer overflow, flushing...")
-            flush_all()
-
-    _JSONDICT_BUFFER[filename] = blob
-    if store_hash:
-        if not _BUFFERED_MODE_FORCE_WRITE:
-            _JSONDICT_META[filename] = _get_filemetadata(filename)
-        _JSONDICT_HASHES[filename] = _hash(blob)
+    if _BUFFER_SIZE > 0 and sys.getsizeof(blob) > _BUFFER_SIZE:
+        if modified:
+            # The buffered content of the file is outdated.
+            with _write_behind_barrier([filename]):
+                _BUFFER.discard(filename)
+        return False
+
+    modified = _BUFFER.store(filename, blob, modified, force_write=_BUFFERED_MODE_FORCE_WRITE)
+    if modified and _WRITE_BEHIND is not None:
+        _WRITE_BEHIND.mark_modified(filename, sys.getsizeof(blob))
+
+    if _BUFFER_SIZE > 0 and _BUFFER.load > _BUFFER_SIZE:
+        filenames = _BUFFER.reduce(_BUFFER_SIZE, exclude=filename)
+        if filenames:
+            logger.debug("Buffer overflow, flushing {} file(s)...".format(len(filenames)))
+            with _write_behind_barrier(filenames):
+                issues = _BUFFER.flush(filenames, _BUFFERED_MODE_FORCE_WRITE)
+            if issues:
+                raise BufferedFileError(issues)
     return True
 
 
 def flush_all():
-    "Execute all deferred JSONDict write operations."
+    """Execute all deferred JSONDict write operations.
+
+    In write-behind mode, this function first waits for all writes
+    that are currently executed in the background.
+    """
     logger.debug("Flushing buffer...")
-    issues = dict()
-    while _JSONDICT_BUFFER:
-        filename, blob = _JSONDICT_BUFFER.popitem()
-        if not _BUFFERED_MODE_FORCE_WRITE:
-            meta = _JSONDICT_META.pop(filename)
-        if _hash(blob) != _JSONDICT_HASHES.pop(filename):
-            try:
-                if not _BUFFERED_MODE_FORCE_WRITE:
-                    if _get_filemetadata(filename) != meta:
-                        issues[filename] = 'File appears to have been externally modified.'
-                        continue
-                try:
-                    fd_tmp, fn_tmp = mkstemp(dir=os.path.dirname(filename), suffix='.json')
-                    with os.fdopen(fd_tmp, 'wb') as file:
-                        file.write(blob)
-                except OSError:
-                    os.remove(fn_tmp)
-                    raise
-                else:
-                    if six.PY2:
-                        os.rename(fn_tmp, filename)
-                    else:
-                        os.replace(fn_tmp, filename)
-            except OSError as error:
-                logger.error(str(error))
-                issues[filename] = error
+    with _write_behind_barrier():
+        issues = dict()
+        if _WRITE_BEHIND is not None:
+            issues.update(_WRITE_BEHIND.issues)
+            _WRITE_BEHIND.issues.clear()
+        issues.update(_BUFFER.flush(force_write=_BUFFERED_MODE_FORCE_WRITE))
     if issues:
         raise BufferedFileError(issues)
 
@@ -125,7 +447,7 @@ def get_buffer_size():
 
 def get_buffer_load():
     "Returns the current actual size of the read/write buffer."
-    return sum((sys.getsizeof(x) for x in _JSONDICT_BUFFER.values()))
+    return _BUFFER.load
 
 
 def in_buffered_mode():
@@ -134,7 +456,8 @@ def in_buffered_mode():
 
 
 @contextmanager
-def buffer_reads_writes(buffer_size=DEFAULT_BUFFER_SIZE, force_write=False):
+def buffer_reads_writes(buffer_size=DEFAULT_BUFFER_SIZE, force_write=False,
+                        write_behind=None, write_behind_workers=DEFAULT_WRITE_BEHIND_WORKERS):
     """Enter a global buffer mode for all JSONDict instances.
 
     All future write operations are written to the buffer, read
@@ -147,16 +470,32 @@ def buffer_reads_writes(buffer_size=DEFAULT_BUFFER_SIZE, force_write=False):
     can only be set *once*. Any subsequent specifications of the buffer
     size are ignored.
 
+    In write-behind mode, modified files are additionally flushed in the
+    background every `write_behind` seconds or as soon as the modified files
+    occupy more than half of the buffer. Errors that occur in the background
+    are raised by the next call to flush_all(). The write-behind mode can only
+    be enabled when entering the buffer mode for the first time.
+
     :param buffer_size:
         Specify the maximum size of the read/write buffer. Defaults
         to DEFAULT_BUFFER_SIZE. A negative number indicates to not
         restrict the buffer size.
     :type buffer_size:
         int
+    :param write_behind:
+        The interval in seconds in which modified files are flushed in
+        the background. Defaults to None, which disables the write-behind mode.
+    :type write_behind:
+        float
+    :param write_behind_workers:
+        The number of threads used to write files in write-behind mode.
+    :type write_behind_workers:
+        int
     """
     global _BUFFERED_MODE
     global _BUFFERED_MODE_FORCE_WRITE
     global _BUFFER_SIZE
+    global _WRITE_BEHIND
     assert _BUFFERED_MODE >= 0
 
     # Basic type check (to prevent common user error)
@@ -174,8 +513,18 @@ def buffer_reads_writes(buffer_size=DEFAULT_BUFFER_SIZE, force_write=False):
     if _BUFFER_SIZE is not None and _BUFFER_SIZE != buffer_size:
         raise BufferException("Buffer size already set, unable to change its size!")
 
+    # The write-behind mode can only be enabled in the outermost context:
+    if write_behind is not None and _BUFFERED_MODE > 0 and (
+            _WRITE_BEHIND is None or _WRITE_BEHIND.interval != write_behind):
+        raise BufferException(
+            "Unable to enter buffered mode with write-behind interval {}, because we are "
+            "already in buffered mode with a different configuration.".format(write_behind))
+
     _BUFFER_SIZE = buffer_size
     _BUFFERED_MODE_FORCE_WRITE = force_write
+    if write_behind is not None and _WRITE_BEHIND is None:
+        _WRITE_BEHIND = _WriteBehindFlusher(
+            interval=write_behind, threshold=buffer_size // 2, workers=write_behind_workers)
 
     _BUFFERED_MODE += 1
     try:
@@ -184,11 +533,12 @@ def buffer_reads_writes(buffer_size=DEFAULT_BUFFER_SIZE, force_write=False):
         _BUFFERED_MODE -= 1
         if _BUFFERED_MODE == 0:
             try:
+                if _WRITE_BEHIND is not None:
+                    _WRITE_BEHIND.stop()
                 flush_all()
             finally:
-                assert not _JSONDICT_BUFFER
-                assert not _JSONDICT_HASHES
-                assert not _JSONDICT_META
+                _WRITE_BEHIND = None
+                assert not _BUFFER
                 _BUFFER_SIZE = None
                 _BUFFERED_MODE_FORCE_WRITE = None
 
@@ -236,16 +586,40 @@ class JSONDict(SyncedAttrDict):
         first, before replacing the original file. Default is False.
     :param parent:
         A parent instance of JSONDict or None.
+    :param cache:
+        Keep the file's content in a process-wide read cache, which is validated
+        by the file's inode, size, and modification time. A read then only
+        requires a call to `stat` as long as the file remains unchanged.
+        Default is False.
     """
-    def __init__(self, filename=None, write_concern=False, parent=None):
+    _PROTECTED_KEYS = SyncedAttrDict._PROTECTED_KEYS + ('_cache_key', )
+
+    def __init__(self, filename=None, write_concern=False, parent=None, cache=False):
         if (filename is None) == (parent is None):
             raise ValueError(
                 "Illegal argument combination, one of the two arguments, "
                 "parent or filename must be None, but not both.")
         self._filename = None if filename is None else os.path.realpath(filename)
         self._write_concern = write_concern
+        self._cache = cache
+        # The status key of the file at the last load, if the data is in sync with it.
+        self._cache_key = None
         super(JSONDict, self).__init__(parent=parent)
 
+    def _storage_key(self):
+        """Return the status key of the file, unless the file was recently modified.
+
+        Files in buffered mode are not identified by a key.
+        """
+        if _BUFFERED_MODE > 0:
+            return None
+        try:
+            st = os.stat(self._filename)
+        except OSError:
+            return None
+        if time.time() - st.st_mtime > _MTIME_RESOLUTION:
+            return _stat_key(st)
+
     def _load_from_disk(self):
         try:
             with open(self._filename, 'rb') as file:
@@ -254,17 +628,50 @@ class JSONDict(SyncedAttrDict):
             if error.errno == errno.ENOENT:
                 return None
 
+    def _load_with_cache(self):
+        """Load the data with the read cache.
+
+        Returns None if the file has not been modified since the last load.
+        """
+        try:
+            st = os.stat(self._filename)
+        except OSError as error:
+            if error.errno != errno.ENOENT:
+                raise
+            self._cache_key = None
+            _READ_CACHE.discard(self._filename)
+            return dict()
+        key = _stat_key(st)
+        if key == self._cache_key:
+            return None
+        blob = _READ_CACHE.get(self._filename, key)
+        if blob is None:
+            blob = self._load_from_disk()
+            if blob is None:
+                self._cache_key = None
+                return dict()
+            if time.time() - st.st_mtime > _MTIME_RESOLUTION:
+                _READ_CACHE.put(self._filename, key, blob)
+                self._cache_key = key
+            else:
+                self._cache_key = None
+        else:
+            self._cache_key = key
+        return json.loads(blob.decode())
+
     def _load(self):
         assert self._filename is not None
 
-        if _BUFFERED_MODE > 0:
-            if self._filename in _JSONDICT_BUFFER:
+        if self._cache and _BUFFERED_MODE == 0:
+            return self._load_with_cache()
+        elif _BUFFERED_MODE > 0:
+            if self._filename in _BUFFER:
                 # Load from buffer:
-                blob = _JSONDICT_BUFFER[self._filename]
+                blob = _BUFFER.get(self._filename)
             else:
                 # Load from disk and store in buffer
                 blob = self._load_from_disk()
-                _store_in_buffer(self._filename, blob, store_hash=True)
+                _store_in_buffer(self._filename, blob, modified=False)
         else:
             # Just load from disk
             blob = self._load_from_disk()
@@ -280,22 +687,27 @@ class JSONDict(SyncedAttrDict):
         # Serialize data:
         blob = json.dumps(data).encode()
 
-        if _BUFFERED_MODE > 0:
-            _store_in_buffer(self._filename, blob)
-        else:   # Saving to disk:
-            if self._write_concern:
-                dirname, filename = os.path.split(self._filename)
-                fn_tmp = os.path.join(dirname, '._{uid}_{fn}'.format(
-                    uid=uuid.uuid4(), fn=filename))
-                with open(fn_tmp, 'wb') as tmpfile:
-                    tmpfile.write(blob)
-                if six.PY2:
-                    os.rename(fn_tmp, self._filename)
-                else:
-                    os.replace(fn_tmp, self._filename)
+        if self._cache:
+            self._cache_key = None
+            _READ_CACHE.discard(self._filename)
+
+        if _BUFFERED_MODE > 0 and _store_in_buffer(self._filename, blob):
+            return
+
+        # Saving to disk, which includes files that exceed the buffer size:
+        if self._write_concern:
+            dirname, filename = os.path.split(self._filename)
+            fn_tmp = os.path.join(dirname, '._{uid}_{fn}'.format(
+                uid=uuid.uuid4(), fn=filename))
+            with open(fn_tmp, 'wb') as tmpfile:
+                tmpfile.write(blob)
+            if six.PY2:
+                os.rename(fn_tmp, self._filename)
             else:
-                with open(self._filename, 'wb') as file:
-                    file.write(blob)
+                os.replace(fn_tmp, self._filename)
+        else:
+            with open(self._filename, 'wb') as file:
+                file.write(blob)
 
     @contextmanager
     def buffered(self):
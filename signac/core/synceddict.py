@@ -3,6 +3,7 @@
 # This software is licensed under the BSD 3-Clause License.
 "Synchronized dictionary."
 import logging
+import threading
 from contextlib import contextmanager
 from functools import wraps
 from copy import deepcopy
@@ -24,11 +25,53 @@ except ImportError:
 
 logger = logging.getLogger(__name__)
 
+# Every load of a container advances the load epoch. A nested container
+# returned by a read access is stamped with the current epoch and the storage
+# key of its root, e.g., the status of a JSONDict's file at the time it was
+# loaded. The next read access of the nested container is served without
+# another load, if no other load happened in the meantime and the root's
+# storage key is unchanged. An expression like ``doc.a.b.c`` therefore loads
+# the root's data only once. Modifications always load the data first.
+_LOAD_EPOCH = 0
+_LOAD_EPOCH_LOCK = threading.Lock()
+
+
+def _advance_load_epoch():
+    global _LOAD_EPOCH
+    with _LOAD_EPOCH_LOCK:
+        _LOAD_EPOCH += 1
+
+
+def _root(container):
+    "Return the outermost synced dict of a (nested) container."
+    while isinstance(container._parent, _SyncedDict):
+        container = container._parent
+    return container
+
+
+def _consume_snapshot(container):
+    "Return True if the container's data is still current since it was accessed."
+    snapshot = container._snapshot_
+    if snapshot is None:
+        return False
+    container._snapshot_ = None
+    epoch, key = snapshot
+    return epoch == _LOAD_EPOCH and key == _root(container)._storage_key()
+
+
+def _stamp_snapshot(container, value):
+    "Stamp a nested container, which was just accessed through container."
+    if isinstance(value, (_SyncedDict, _SyncedList)):
+        key = _root(container)._loaded_key_
+        value._snapshot_ = None if key is None else (_LOAD_EPOCH, key)
+    return value
+
 
 class _SyncedList(list):
 
     def __init__(self, iterable, parent):
         self._parent = parent
+        self._snapshot_ = None
         super(_SyncedList, self).__init__(iterable)
 
     def __deepcopy__(self, memo):
@@ -38,17 +81,20 @@ class _SyncedList(list):
         return ret
 
     def __getitem__(self, key):
-        self._parent.load()
+        if not _consume_snapshot(self):
+            self._parent.load()
         ret = super(_SyncedList, self).__getitem__(key)
         return ret
 
     def __setitem__(self, key, value):
+        self._snapshot_ = None
         self._parent.load()
         ret = super(_SyncedList, self).__setitem__(key, value)
         self._parent.save()
         return ret
 
     def __delitem__(self, key):
+        self._snapshot_ = None
         self._parent.load()
         super(_SyncedList, self).__delitem__(key)
         self._parent.save()
@@ -62,6 +108,7 @@ class _SyncedList(list):
             @wraps(outer)
             def outer_wrapped_in_load_and_save(*args, **kwargs):
                 if hasattr(self, '_parent'):
+                    self._snapshot_ = None
                     self._parent.load()
                     ret = outer(*args, **kwargs)
                     self._parent.save()
@@ -78,6 +125,8 @@ class _SyncedDict(MutableMapping):
 
     def __init__(self, initialdata=None, parent=None):
         self._suspend_sync_ = 1
+        self._snapshot_ = None
+        self._loaded_key_ = None
         self._parent = parent
         super(_SyncedDict, self).__init__()
         if initialdata is None:
@@ -144,6 +193,14 @@ class _SyncedDict(MutableMapping):
     def _load(self):
         return None
 
+    def _storage_key(self):
+        """Return a key that identifies the current state of the stored data.
+
+        Nested containers are only served from a snapshot of the data, if the
+        key is unchanged since the data was loaded. None disables snapshots.
+        """
+        return None
+
     def _save(self):
         pass
 
@@ -163,13 +220,19 @@ class _SyncedDict(MutableMapping):
         for key in remove:
             del old[key]
 
-    def _synced_load(self):
-        self.load()
+    def _synced_load(self, modify=False):
+        current = _consume_snapshot(self)
+        if modify or not current:
+            self.load()
 
     def load(self):
         if self._suspend_sync_ <= 0:
+            _advance_load_epoch()
             if self._parent is None:
+                self._loaded_key_ = None
+                key = self._storage_key()
                 data = self._load()
+                self._loaded_key_ = key
                 if data is not None:
                     with self._suspend_sync():
                         self._dfs_update(self._data, data)
@@ -190,7 +253,7 @@ class _SyncedDict(MutableMapping):
                 self._parent.save()
 
     def __setitem__(self, key, value):
-        self._synced_load()
+        self._synced_load(modify=True)
         with self._suspend_sync():
             self._data[self._validate_key(key)] = self._dfs_convert(value)
         self._synced_save()
@@ -198,32 +261,36 @@ class _SyncedDict(MutableMapping):
 
     def __getitem__(self, key):
         self._synced_load()
+        if self._suspend_sync_ <= 0:
+            return _stamp_snapshot(self, self._data[key])
         return self._data[key]
 
     def get(self, key, default=None):
         self._synced_load()
+        if self._suspend_sync_ <= 0:
+            return _stamp_snapshot(self, self._data.get(key, default))
         return self._data.get(key, default)
 
     def pop(self, key, default=None):
-        self._synced_load()
+        self._synced_load(modify=True)
         ret = self._data.pop(key, default)
         self._synced_save()
         return ret
 
     def popitem(self):
-        self._synced_load()
+        self._synced_load(modify=True)
         key, value = self._data.popitem()
         self._synced_save()
         return key, value._as_dict()
 
     def setdefault(self, key, default=None):
-        self._synced_load()
+        self._synced_load(modify=True)
         ret = self._data.setdefault(key, self._dfs_convert(default))
         self._synced_save()
         return ret
 
     def __delitem__(self, key):
-        self._synced_load()
+        self._synced_load(modify=True)
         del self._data[key]
         self._synced_save()
 
@@ -238,7 +305,7 @@ class _SyncedDict(MutableMapping):
                 self[key] = mapping[key]
 
     def update(self, mapping):
-        self._synced_load()
+        self._synced_load(modify=True)
         self._update(mapping)
         self._synced_save()
 
@@ -3,10 +3,11 @@
 # This software is licensed under the BSD 3-Clause License.
 import unittest
 import os
+import sys
 import json
 import logging
 import platform
-from time import sleep
+from time import sleep, time
 from stat import S_IREAD
 
 import signac
@@ -14,6 +15,7 @@ from signac.errors import Error
 from signac.errors import BufferException
 from signac.errors import BufferedFileError
 from signac.common import six
+from signac.core import jsondict
 
 from test_project import BaseProjectTest
 
@@ -172,6 +174,128 @@ class BufferedModeTest(BaseProjectTest):
                 with signac.buffered(buffer_size=14):
                     pass
 
+    def test_write_behind(self):
+        job = self.project.open_job(dict(a=0))
+        job.init()
+
+        def read_from_disk():
+            with open(job.doc._filename, 'rb') as file:
+                return json.loads(file.read().decode())
+
+        def wait_for_disk(doc):
+            for i in range(200):
+                if read_from_disk() == doc:
+                    break
+                sleep(0.01)
+            self.assertEqual(read_from_disk(), doc)
+
+        job.doc.a = 0
+        with signac.buffered(write_behind=0.01):
+            job.doc.a = 1
+            wait_for_disk({'a': 1})
+            self.assertEqual(job.doc.a, 1)
+            with signac.buffered():
+                job.doc.a = 2
+            with signac.buffered(write_behind=0.01):
+                job.doc.a = 3
+            with self.assertRaises(BufferException):
+                with signac.buffered(write_behind=1):
+                    pass
+            signac.flush()
+            self.assertEqual(read_from_disk(), {'a': 3})
+            job.doc.a = 4
+        self.assertEqual(read_from_disk(), {'a': 4})
+
+        # Modified files are flushed once they occupy half of the buffer:
+        with signac.buffered(buffer_size=1000, write_behind=3600):
+            job.doc.b = 'b' * 600
+            wait_for_disk({'a': 4, 'b': 'b' * 600})
+        self.assertEqual(job.doc.b, 'b' * 600)
+
+        # The size of modified files is measured like the buffer load:
+        with signac.buffered(buffer_size=1000, write_behind=3600):
+            job.doc.b = 'b' * 470
+            self.assertGreater(signac.get_buffer_load(), 500)
+            wait_for_disk({'a': 4, 'b': 'b' * 470})
+
+        with self.assertRaises(BufferedFileError) as cm:
+            with signac.buffered(write_behind=3600):
+                job.doc.a = 5
+                sleep(1.0)
+                with open(job.doc._filename, 'wb') as file:
+                    file.write(json.dumps({'a': 0}).encode())
+        self.assertIn(job.doc._filename, cm.exception.files)
+        self.assertEqual(job.doc(), {'a': 0})
+
+    def test_write_behind_external_modification(self):
+        job = self.project.open_job(dict(a=0))
+        job.doc.a = 0
+        with self.assertRaises(BufferedFileError) as cm:
+            with signac.buffered(write_behind=0.01):
+                self.assertEqual(job.doc.a, 0)
+                with open(job.doc._filename, 'wb') as file:
+                    file.write(json.dumps({'a': 10}).encode())
+                job.doc.a = 1
+                for i in range(200):
+                    issues = dict(jsondict._WRITE_BEHIND.issues)
+                    if issues:
+                        break
+                    sleep(0.01)
+        # The external modification is detected by the background flush:
+        self.assertIn(job.doc._filename, issues)
+        self.assertIn(job.doc._filename, cm.exception.files)
+        self.assertEqual(job.doc(), {'a': 10})
+
+    def test_buffer_eviction(self):
+        jobs = [self.project.open_job(dict(a=i)) for i in range(4)]
+        for job in jobs:
+            job.doc.b = 0
+        blob_size = sys.getsizeof(json.dumps({'b': 0}).encode())
+
+        def read_from_disk(job):
+            with open(job.doc._filename, 'rb') as file:
+                return json.loads(file.read().decode())
+
+        with signac.buffered(buffer_size=3 * blob_size):
+            jobs[0].doc.b = 1
+            self.assertEqual(jobs[1].doc.b, 0)
+            self.assertEqual(jobs[2].doc.b, 0)
+            self.assertEqual(signac.get_buffer_load(), 3 * blob_size)
+            # Unmodified files are evicted first:
+            self.assertEqual(jobs[3].doc.b, 0)
+            self.assertEqual(signac.get_buffer_load(), 3 * blob_size)
+            jobs[1].doc.b = 1
+            jobs[2].doc.b = 1
+            self.assertEqual(read_from_disk(jobs[0]), {'b': 0})
+            # Only the least recently used modified file is flushed:
+            self.assertEqual(jobs[3].doc.b, 0)
+            self.assertEqual(signac.get_buffer_load(), 3 * blob_size)
+            self.assertEqual(read_from_disk(jobs[0]), {'b': 1})
+            self.assertEqual(read_from_disk(jobs[1]), {'b': 0})
+            self.assertEqual(read_from_disk(jobs[2]), {'b': 0})
+            # Files that exceed the buffer size are written immediately:
+            jobs[3].doc.b = 'b' * 3 * blob_size
+            self.assertEqual(read_from_disk(jobs[3]), {'b': 'b' * 3 * blob_size})
+            self.assertEqual(jobs[1].doc.b, 1)
+        self.assertEqual(signac.get_buffer_load(), 0)
+        for job in jobs[:3]:
+            self.assertEqual(read_from_disk(job), {'b': 1})
+
+    def test_read_only_iteration(self):
+        for i in range(10):
+            self.project.open_job(dict(a=i)).doc.b = i
+        past = time() - 60
+        for job in self.project:
+            os.utime(job.fn(job.FN_DOCUMENT), (past, past))
+        with signac.buffered():
+            for job in self.project:
+                self.assertEqual(job.doc.b, job.sp.a)
+                job.doc.b = job.doc.b
+            self.assertEqual(signac.get_buffer_load(), sum(
+                sys.getsizeof(json.dumps({'b': i}).encode()) for i in range(10)))
+        for job in self.project:
+            self.assertEqual(os.path.getmtime(job.fn(job.FN_DOCUMENT)), past)
+
     def test_integration(self):
 
         def routine():
@@ -1,19 +1,26 @@
 from __future__ import division
 import os
 import io
+import gzip
+import json
 import unittest
 import array
+import operator
 from collections import OrderedDict
 from itertools import islice
 
 from signac import Collection
+from signac.contrib import collection as collection_module
 from signac.contrib.collection import JSONParseError
+from signac.contrib.collection import isclose
 from signac.common import six
 from signac.errors import InvalidKeyError
 if six.PY2:
     from tempdir import TemporaryDirectory
+    import mock
 else:
     from tempfile import TemporaryDirectory
+    from unittest import mock
 
 n = 42
 N = 100
@@ -53,6 +60,11 @@ LOGICAL_EXPRESSIONS = [
     ({'$or': [{'$not': {'a': n}}]}, N - 1),
     ({'$or': [{'a': n}, {'a': n + 1}]}, 2),
     ({'$or': [{'a': n}, {'$not': {'a': n}}]}, N),
+    ({'$not': {}}, 0),
+    ({'$not': {}, 'a': {'$gt': 1}}, 0),
+    ({'$and': [{}]}, N),
+    ({'$and': [{}, {'$not': {}}]}, 0),
+    ({'$or': [{}, {'a': n}]}, N),
 ]
 
 
@@ -569,6 +581,254 @@ class CollectionTest(unittest.TestCase):
                 self.assertEqual(len(self.c.find({'$not': expr})), N - expectation)
                 self.assertEqual(len(self.c.find({'$not': {'$not': expr}})), expectation)
 
+    def test_compile(self):
+        self.c.update({'a': i, 'b': i % 3, 'c': {'d': i % 2}} for i in range(N))
+        expr = {'a': {'$lt': n}, 'b': 0, 'c.d': {'$exists': True}}
+        plan = self.c.compile(expr)
+        self.assertIs(self.c.compile(expr), plan)
+        # Plans are cached by the filter including its key order.
+        reordered = {'c.d': {'$exists': True}, 'b': 0, 'a': {'$lt': n}}
+        self.assertEqual(self.c.compile(reordered).filter, expr)
+        self.assertEqual(plan.filter, expr)
+        expectation = {doc['_id'] for doc in self.c.find(expr)}
+        self.assertEqual(len(expectation), len([i for i in range(n) if i % 3 == 0]))
+        self.assertEqual({doc['_id'] for doc in self.c.find(plan)}, expectation)
+        self.assertEqual(len(self.c.find(plan, limit=3)), 3)
+        self.assertEqual(self.c.find_one(plan)['b'], 0)
+        self.c.insert_one({'a': -1, 'b': 0, 'c': {'d': 0}})
+        self.assertEqual(len(self.c.find(plan)), len(expectation) + 1)
+        plan = self.c.compile({'$or': [{'a': 0}, {'a': 1}], '$not': {'b': 0}})
+        self.assertEqual([doc['a'] for doc in self.c.find(plan)], [1])
+        self.assertEqual(len(self.c.find(self.c.compile({}))), len(self.c))
+        with self.assertRaises(ValueError):
+            self.c.compile({'a': {'$exists': 0}})
+        with self.assertRaises(KeyError):
+            self.c.compile({'a': {'$foo': 0}})
+
+    def test_index_incremental_update(self):
+        self.c.update({'a': i % 7, 'b': {'c': i % 2 == 0}, 'd': [i % 3]} for i in range(N))
+        keys = ('a', 'b', 'b.c', 'd')
+        for key in keys:
+            self.c.index(key, build=True)
+        self.c.delete_many({'a': {'$lt': 2}})
+        self.c.update({'_id': doc['_id'], 'a': 1.0, 'd': None} for doc in self.c.find({'a': 6}))
+        self.c.delete_one({'b.c': True})
+        self.c.insert_one({'a': 'x'})
+        for key in keys:
+            expected = Collection(self.c).index(key, build=True)
+            index = self.c.index(key)
+            self.assertEqual(len(index), len(expected))
+            for value, _ids in expected.items():
+                self.assertEqual(index[value], _ids)
+        self.assertEqual(len(self.c.find({'a': 1})), len(self.c.find({'d': None})))
+
+    def test_find_limit(self):
+        self.c.update({'a': i, 'b': {'c': i % 3} if i % 2 else [i % 3], 'd': str(i)}
+                      for i in range(N))
+        exprs = [{'a': expr} for expr, _ in ARITHMETIC_EXPRESSIONS + ARRAY_EXPRESSIONS]
+        exprs.extend(expr for expr, expectation in LOGICAL_EXPRESSIONS
+                     if isinstance(expectation, int))
+        exprs.extend([
+            {'b.c': 1}, {'b.c': {'$exists': False}}, {'b': [1]}, {'b': {'$type': 'list'}},
+            {'d': {'$regex': '^1'}}, {'a': 1.0, 'd': '1'}, {'a': {'$near': [n, 0.1]}},
+            {'$or': [{'b.c': 2}, {'d': {'$regex': '2$'}}], 'a': {'$lt': n}},
+            {'$not': {'b.c': {'$exists': True}}, 'a': {'$gt': n}},
+            {'_id': self.c.find_one()['_id']}])
+        for expr in exprs:
+            expected = {doc['_id'] for doc in self.c.find(expr)}
+            for limit in (1, 2, N):
+                result = {doc['_id'] for doc in self.c.find(expr, limit=limit)}
+                self.assertEqual(len(result), min(limit, len(expected)))
+                self.assertTrue(result.issubset(expected))
+            doc = self.c.find_one(expr)
+            if expected:
+                self.assertIn(doc['_id'], expected)
+            else:
+                self.assertIsNone(doc)
+
+    def test_find_limit_mixed_types(self):
+        values = [True, 1, False, 0, 0.0, 1.0, 2, [1], [True], [0.0], 'x', None, {'y': 1}]
+        exprs = [
+            {}, {'$not': {}}, {'a': 1}, {'a': True}, {'a': [1]},
+            {'a': {'$exists': True}}, {'a': {'$exists': False}}, {'a.y': 1},
+            {'a': {'$ne': 1}}, {'a': {'$in': [0, 'x']}}, {'a': {'$nin': [1, None]}},
+            {'a': {'$regex': 'x'}}, {'a': {'$where': 'lambda x: x is True'}},
+            {'$not': {'a': {'$type': 'int'}}}, {'$or': [{'a': {'$type': 'bool'}}, {'b': 0}]}]
+        exprs.extend({'a': {'$type': t}} for t in ('int', 'float', 'bool', 'str', 'list', 'null'))
+        for order in (values, values[::-1]):
+            self.c.clear()
+            self.c.update({'a': v, 'b': i % 2} for i, v in enumerate(order))
+            self.c.insert_one({'b': 0})
+            for expr in exprs:
+                with self.subTest(expr=expr, order=order[0]):
+                    expected = {doc['_id'] for doc in self.c.find(expr)}
+                    for limit in (1, 2, 3, len(self.c)):
+                        result = {doc['_id'] for doc in self.c.find(expr, limit=limit)}
+                        self.assertEqual(len(result), min(limit, len(expected)))
+                        self.assertTrue(result.issubset(expected))
+        # The branches of $or are not compared before the other terms exclude a document.
+        self.c.clear()
+        self.c.insert_one({'_id': '1', 'a': 'x', 'n': {'x': 1}})
+        expr = {'a': {'$in': ['y']}, '$or': [{'n': {'$gte': 1}}]}
+        self.assertEqual(len(self.c.find(expr)), 0)
+        self.assertIsNone(self.c.find_one(expr))
+
+    @unittest.skipIf(six.PY2, 'values of mixed types can be compared on Python 2')
+    def test_find_mixed_types_term_order(self):
+        self.c.update([{'a': 'x', 'b': 1}, {'a': 1, 'b': 2}, {'a': None, 'b': 3, 'c': 'z'}])
+        # Terms are evaluated in the order of the filter if a comparison may raise.
+        for expr in (
+                {'b': {'$in': [9]}, 'a': {'$gt': 0}},
+                {'c': {'$regex': 'y'}, 'b': {'$lt': 3}, 'a': {'$gt': 0}},
+                {'d': {'$exists': True}, 'a': {'$near': 1}}):
+            with self.subTest(expr=expr):
+                self.assertEqual(len(self.c.find(expr)), 0)
+                self.assertEqual(len(self.c.find(self.c.compile(expr))), 0)
+                with self.assertRaises(TypeError):
+                    self.c.find(dict(reversed(list(expr.items()))))
+
+    def test_find_sorted_index(self):
+        values = [i // 2 if i % 2 else float(i // 2) for i in range(N)] + [0.5, -1, True]
+        self.c.update({'a': v} for v in values)
+
+        def check():
+            docs = list(self.c)
+            for op, func in (('$eq', operator.eq), ('$gt', operator.gt), ('$gte', operator.ge),
+                             ('$lt', operator.lt), ('$lte', operator.le)):
+                for arg in (-2, 0, 0.5, 1, n, n + 0.5, float(N)):
+                    expected = {doc['_id'] for doc in docs if func(doc['a'], arg)}
+                    result = {doc['_id'] for doc in self.c.find({'a': {op: arg}})}
+                    self.assertEqual(result, expected)
+            for arg in ([n, 0.02], [n, 0, 1.5], [0, 0, 0.5], [-1]):
+                expected = {doc['_id'] for doc in docs
+                            if isclose(doc['a'], arg[0], rel_tol=(arg[1:] or [1e-9])[0],
+                                       abs_tol=(arg[2:] or [0])[0])}
+                result = {doc['_id'] for doc in self.c.find({'a': {'$near': arg}})}
+                self.assertEqual(result, expected)
+
+        check()
+        self.c.delete_many({'a': {'$lt': 5}})
+        self.c.update([{'a': 3}, {'a': 3.0}, {'a': 7.5}])
+        check()
+        self.c.replace_one({'a': 7.5}, {'a': 2 * N})
+        check()
+        # Keys with values of mixed types fall back to a linear scan.
+        self.c.insert_one({'a': 'abc'})
+        self.c.delete_one({'a': 'abc'})
+        check()
+        self.c.insert_one({'a': None})
+        self.assertEqual(len(self.c.find({'a': {'$eq': n}})), 2)
+        if six.PY3:
+            with self.assertRaises(TypeError):
+                self.c.find({'a': {'$lt': 5}})
+
+    def test_find_projection(self):
+        self.c.update({'_id': str(i), 'a': i, 'b': {'c': i, 'd': [i]}, 'e': 'x'} for i in range(10))
+        doc = self.c.find_one({'a': 1})
+        self.assertEqual(list(self.c.find({'a': 1}, projection=['a', 'b.c'])),
+                         [{'_id': '1', 'a': 1, 'b': {'c': 1}}])
+        self.assertEqual(list(self.c.find({'a': 1}, projection={'a': 1, '_id': 0})), [{'a': 1}])
+        self.assertEqual(list(self.c.find({'a': 1}, projection={'b.d': 0, 'e': 0})),
+                         [{'_id': '1', 'a': 1, 'b': {'c': 1}}])
+        self.assertEqual(list(self.c.find({'a': 1}, projection={'_id': 0})),
+                         [{k: v for k, v in doc.items() if k != '_id'}])
+        self.assertEqual(list(self.c.find({'a': 1}, projection=['a.x', 'b.x', 'y'])),
+                         [{'_id': '1', 'b': {}}])
+        self.assertEqual(len(self.c.find(projection=['a'])), 10)
+        # Projections do not modify the stored documents.
+        self.assertEqual(self.c['1'], doc)
+        for projection in ({'a': 1, 'e': 0}, ['a', 'a.b'], ['b.c', 'b'], [''], 'a'):
+            with self.assertRaises((TypeError, ValueError)):
+                self.c.find(projection=projection)
+
+    def test_find_sort_skip(self):
+        values = [i // 2 if i % 2 else float(i // 2) for i in range(N)]
+        self.c.update({'_id': str(i), 'a': v, 'b': i % 3} for i, v in enumerate(values))
+
+        def check(filter=None):
+            docs = list(self.c.find(filter))
+            a = sorted(doc['a'] for doc in docs)
+            self.assertEqual([doc['a'] for doc in self.c.find(filter, sort='a')], a)
+            self.assertEqual([doc['a'] for doc in self.c.find(filter, sort=[('a', -1)])],
+                             a[::-1])
+            self.assertEqual([doc['a'] for doc in self.c.find(
+                filter, sort=[('a', 1)], skip=3, limit=5)], a[3:8])
+            self.assertEqual([doc['a'] for doc in self.c.find(
+                filter, sort=[('a', -1)], skip=len(a) - 2)], a[:2][::-1])
+            expected = sorted(((doc['b'], -doc['a'], doc['_id']) for doc in docs))
+            self.assertEqual(
+                [(doc['b'], -doc['a'], doc['_id']) for doc in self.c.find(
+                    filter, sort=[('b', 1), ('a', -1), ('_id', 1)])], expected)
+            ids = [doc['_id'] for doc in self.c.find(filter, sort='_id')]
+            self.assertEqual(ids, sorted(ids))
+            self.assertEqual(len(self.c.find(filter, skip=3)), max(0, len(docs) - 3))
+            self.assertEqual(len(self.c.find(filter, skip=3, limit=2)), min(2, len(docs) - 3))
+            # Consecutive pages do not overlap.
+            pages = [[doc['_id'] for doc in self.c.find(filter, skip=skip, limit=10)]
+                     for skip in range(0, len(docs), 10)]
+            self.assertEqual(sorted(_id for page in pages for _id in page), sorted(ids))
+
+        check()
+        check({'b': 1})
+        check({'a': {'$gt': n}})
+        # Missing and null values are sorted first, followed by numbers and strings.
+        self.c.update([{'_id': 'x', 'a': 'abc'}, {'_id': 'y', 'b': 0}, {'_id': 'z', 'a': None}])
+        result = [doc['_id'] for doc in self.c.find(sort='a')]
+        self.assertEqual(set(result[:2]), {'y', 'z'})
+        self.assertEqual(result[-1], 'x')
+        self.assertEqual([doc['_id'] for doc in self.c.find(sort=[('a', -1)])][0], 'x')
+        for sort in ([], [('a', 0)], [(1, 1)]):
+            with self.assertRaises(ValueError):
+                self.c.find(sort=sort)
+        with self.assertRaises(ValueError):
+            self.c.find(skip=-1)
+
+    def test_find_sort_bool(self):
+        expected = [0, 0.5, 1, 2, False, True]
+        for values in ([True, 2, False, 0.5, 1, 0], [1, True, 2, 0, False, 0.5]):
+            self.c.clear()
+            self.c.update({'_id': str(i), 'a': v, 'b': 0} for i, v in enumerate(values))
+            for filter in (None, {'b': 0}, {'a': {'$exists': True}}):
+                for sort in ('a', [('a', 1), ('_id', 1)]):
+                    result = [doc['a'] for doc in self.c.find(filter, sort=sort)]
+                    self.assertEqual(result, expected)
+                    self.assertEqual([type(v) for v in result], [type(v) for v in expected])
+                result = [doc['a'] for doc in self.c.find(filter, sort=[('a', -1)])]
+                self.assertEqual([type(v) for v in result], [type(v) for v in expected[::-1]])
+                self.assertEqual(result, expected[::-1])
+                result = [doc['a'] for doc in self.c.find(filter, sort='a', limit=2, skip=3)]
+                self.assertEqual(result, expected[3:5])
+            # Booleans and integers may share a value of the index.
+            for i, v in sorted(enumerate(values), key=lambda item: type(item[1]) is bool):
+                if v == 1:
+                    del self.c[str(i)]
+            self.assertEqual([doc['a'] for doc in self.c.find(sort='a')], [0, 0.5, 2, False])
+            self.c.insert_one({'a': None})
+            if six.PY3:
+                with self.assertRaises(TypeError):
+                    self.c.find({'a': {'$lt': 1}})
+
+    def test_count_distinct_group_count(self):
+        self.c.update({'a': i % 4, 'b': {'c': float(i % 2)}, 'd': [i % 3]} for i in range(N))
+        self.c.update([{'a': 1.0}, {'b': 0}, {'a': {'x': 0}}])
+        self.assertEqual(self.c.count(), N + 3)
+        self.assertEqual(self.c.count({'a': 0}), N // 4)
+        self.assertEqual(self.c.count({'a': 1}), N // 4 + 1)
+        self.assertEqual(self.c.count({'a': {'$in': [2, 3]}}), N // 2)
+        self.assertEqual(sorted(self.c.distinct('a')), [0, 1, 2, 3])
+        self.assertEqual(sorted(self.c.distinct('b.c')), [0.0, 1.0])
+        self.assertEqual(sorted(self.c.distinct('d')), [[0], [1], [2]])
+        self.assertEqual(sorted(self.c.distinct('b', {'a': 1})), [])
+        self.assertEqual(sorted(self.c.distinct('a', {'b.c': 1})), [1, 3])
+        self.assertEqual(self.c.distinct('d', {'b': 0}), [])
+        self.assertEqual(self.c.group_count('a'), {0: 25, 1: 26, 2: 25, 3: 25})
+        self.assertEqual(self.c.group_count('a', {'a': {'$in': [0, 1]}}), {0: 25, 1: 26})
+        self.assertEqual(self.c.group_count('d', {'a': 0}), {(0, ): 9, (1, ): 8, (2, ): 8})
+        self.assertEqual(self.c.group_count(['a', 'b.c']),
+                         {(0, 0.0): 25, (1, 1.0): 25, (2, 0.0): 25, (3, 1.0): 25})
+        self.assertEqual(self.c.group_count(['a', 'b.c'], {'a': 0}), {(0, 0.0): 25})
+        self.assertEqual(self.c.group_count(['a', 'x']), {})
+
 
 class CompressedCollectionTest(CollectionTest):
 
@@ -671,6 +931,190 @@ class FileCollectionTest(CollectionTest):
             for doc in self.c:
                 self.assertIn(doc['_id'], c)
 
+    def test_persistent_indexes(self):
+        fn = os.path.join(self._tmp_dir.name, 'indexed_' + self.filename)
+        docs = [dict(a=i, b=[i, i], c={'d': i % 3}) for i in range(100)]
+        with Collection.open(fn, persistent_indexes=True) as c:
+            c.update(docs)
+            self.assertEqual(len(c.find({'a': {'$lt': 10}})), 10)
+            c.index('c.d', build=True)
+        self.assertEqual(len(os.listdir(fn + '.idx')), 2)
+        with Collection.open(fn, persistent_indexes=True) as c:
+            self.assertEqual(len(c._indexes), 0)
+            self.assertEqual(len(c.index('a')), 100)
+            with self.assertRaises(KeyError):
+                c.index('b')
+            self.assertEqual(len(c.find({'c.d': 0})), 34)
+            self.assertEqual(len(c.find({'b': [1, 1]})), 1)
+            c.delete_many({'a': {'$lt': 50}})
+            c.insert_one(dict(a=100, c={'d': 0}))
+        with Collection.open(fn, persistent_indexes=True) as c:
+            self.assertEqual(len(c._indexes), 0)
+            self.assertEqual(len(c.index('a')), 51)
+            self.assertEqual(len(c.index('b')), 50)
+            self.assertEqual(len(c.find({'c.d': 0})), 18)
+            self.assertEqual(len(c.find({'a': {'$gte': 50}})), 51)
+        with Collection.open(fn) as c:
+            c.delete_many({'a': {'$lt': 75}})
+        with Collection.open(fn, persistent_indexes=True) as c:
+            with self.assertRaises(KeyError):
+                c.index('a')
+            self.assertEqual(len(c.find({'a': {'$gte': 50}})), 26)
+
+    def test_journal(self):
+        fn = os.path.join(self._tmp_dir.name, 'journal_' + self.filename)
+        docs = [dict(_id=str(i), a=i) for i in range(100)]
+        with Collection.open(fn, journal=True) as c:
+            c.update(docs)
+            c.flush()
+            size = os.path.getsize(fn)
+            c['0'] = dict(a=-1)
+            del c['1']
+            c.insert_one(dict(_id='100', a=100))
+            c.flush()
+            self.assertGreater(os.path.getsize(fn), size)
+            self.assertLess(os.path.getsize(fn), 2 * size)
+            with Collection.open(fn, mode='rb') as c2:
+                self.assertEqual(len(c2), 100)
+                self.assertEqual(c2['0']['a'], -1)
+                self.assertNotIn('1', c2)
+                self.assertEqual(len(c2.find({'a': 100})), 1)
+            del c['100']
+            c.insert_one(dict(_id='1', a=1))
+        compacted = os.path.getsize(fn)
+        with Collection.open(fn, journal=True) as c:
+            self.assertEqual(len(c), 100)
+            self.assertEqual(c['1']['a'], 1)
+            self.assertNotIn('100', c)
+            c.compact()
+            self.assertEqual(os.path.getsize(fn), compacted)
+            c.clear()
+            c.insert_one(dict(_id='0', a=0))
+        with Collection.open(fn, journal=True) as c:
+            self.assertEqual(list(c), [dict(_id='0', a=0)])
+
+    def test_journal_missing_newline(self):
+        fn = os.path.join(self._tmp_dir.name, 'journal_' + self.filename)
+        if fn.endswith('.gz'):
+            self.skipTest("Only uncompressed collection files are checked for torn records.")
+        with open(fn, 'w') as file:
+            file.write(json.dumps(dict(_id='0', a=0)))
+        with Collection.open(fn, journal=True) as c:
+            self.assertEqual(len(c), 1)
+            c.insert_one(dict(_id='1', a=1))
+        with Collection.open(fn, journal=True) as c:
+            self.assertEqual(len(c), 2)
+            self.assertEqual(c['1']['a'], 1)
+
+    def test_journal_torn_record(self):
+        fn = os.path.join(self._tmp_dir.name, 'journal_' + self.filename)
+        if fn.endswith('.gz'):
+            self.skipTest("Only uncompressed collection files are checked for torn records.")
+        docs = [dict(_id=str(i), a=i) for i in range(100)]
+        with Collection.open(fn, journal=True) as c:
+            c.update(docs)
+        with open(fn, 'a') as file:
+            file.write(json.dumps(dict(_id='0', a=-1))[:-3])
+        for workers in (None, 2):
+            with Collection.open(fn, mode='rb', journal=True, workers=workers) as c:
+                self.assertEqual(len(c), 100)
+                self.assertEqual(c['0']['a'], 0)
+        with self.assertRaises(JSONParseError):
+            Collection.open(fn, mode='rb')
+        with Collection.open(fn, journal=True) as c:
+            c['1'] = dict(a=-1)
+        with open(fn) as file:
+            self.assertEqual(len(file.readlines()), 100)
+        with Collection.open(fn) as c:
+            self.assertEqual(c['0']['a'], 0)
+            self.assertEqual(c['1']['a'], -1)
+
+    def test_lazy(self):
+        fn = os.path.join(self._tmp_dir.name, 'lazy_' + self.filename)
+        docs = [dict(_id=str(i), a=i, b={'c': i % 3}) for i in range(100)]
+        with Collection.open(fn, journal=True) as c:
+            c.update(docs)
+            c.flush()
+            c['0'] = dict(a=-1)
+            del c['1']
+            c.flush()
+            if fn.endswith('.gz'):
+                with self.assertRaises(RuntimeError):
+                    Collection.open(fn, lazy=True)
+                return
+            with Collection.open(fn, lazy=True) as c2:
+                self.assertEqual(len(c2), 99)
+                self.assertEqual(c2['0'], dict(_id='0', a=-1))
+                self.assertNotIn('1', c2)
+                self.assertEqual(len(c2.find({'b.c': 0})), 33)
+                self.assertEqual(len(c2.find({'a': {'$lt': 10}})), 9)
+                self.assertEqual(c2.find_one({'a': 50}), docs[50])
+                self.assertEqual(sorted(c2, key=lambda doc: doc['a']), [c['0']] + docs[2:])
+                with self.assertRaises(io.UnsupportedOperation):
+                    c2.insert_one(dict(a=100))
+                with self.assertRaises(io.UnsupportedOperation):
+                    c2.delete_many({'a': 2})
+                self.assertEqual(len(c2), 99)
+        with self.assertRaises(RuntimeError):
+            Collection.open(fn, mode='w', lazy=True)
+
+    def test_lazy_primary_key(self):
+        fn = os.path.join(self._tmp_dir.name, 'lazy_' + self.filename)
+        if fn.endswith('.gz'):
+            self.skipTest("Compressed collection files are not opened lazily.")
+        docs = [dict(_id=str(i), a=i) for i in range(10)]
+        docs.extend([
+            {'_id': 'x', 'a': {'_id': 'y'}}, {'a': [{'_id': 'y'}], '_id': 'z'},
+            {'a': 'x,"_id": "y"', '_id': 'w'}, {'a': {'b': '{'}, '_id': 'v'}, {'a': {'_id': 'y'}}])
+        with open(fn, 'w') as file:
+            for doc in docs:
+                file.write(json.dumps(doc) + '\n')
+        loads = collection_module.json.loads
+        with mock.patch.object(collection_module.json, 'loads', side_effect=loads) as m:
+            with Collection.open(fn, lazy=True) as c:
+                # Only the documents with nested primary keys are decoded.
+                decoded = [args[0] for args, _ in m.call_args_list if args[0].startswith('{')]
+                self.assertEqual(len(decoded), 3)
+                self.assertEqual(len(c), len(docs))
+                for doc in docs[:-1]:
+                    self.assertEqual(c[doc['_id']], doc)
+                _id, = set(c.ids).difference(doc['_id'] for doc in docs[:-1])
+                self.assertEqual(c[_id]['a'], {'_id': 'y'})
+
+    def test_workers(self):
+        fn = os.path.join(self._tmp_dir.name, 'parallel_' + self.filename)
+        docs = [dict(_id=str(i), a=i, b='x' * 100) for i in range(1000)]
+        chunk_size = collection_module._CHUNK_SIZE
+        collection_module._CHUNK_SIZE = 1024
+        self.addCleanup(setattr, collection_module, '_CHUNK_SIZE', chunk_size)
+        with Collection.open(fn, journal=True) as c:
+            c.update(docs)
+            c.flush()
+            c['0'] = dict(a=-1)
+            del c['1']
+            c.flush()
+            for workers in (None, 1, 2):
+                with Collection.open(fn, mode='rb', workers=workers) as c2:
+                    self.assertEqual(len(c2), 999)
+                    self.assertEqual(c2['0']['a'], -1)
+                    self.assertNotIn('1', c2)
+                    self.assertEqual(
+                        sorted(c2, key=lambda doc: doc['_id']),
+                        sorted(c, key=lambda doc: doc['_id']))
+        if fn.endswith('.gz'):
+            self.assertGreater(len(collection_module._gzip_member_chunks(fn)), 10)
+            # Files written by other gzip implementations are parsed sequentially.
+            with gzip.open(fn, 'wb') as file:
+                file.write(b'{"_id": "0", "a": 0}\n')
+            self.assertIsNone(collection_module._gzip_member_chunks(fn))
+            with Collection.open(fn, mode='rb', workers=2) as c:
+                self.assertEqual(list(c), [dict(_id='0', a=0)])
+        else:
+            with open(fn, 'a') as file:
+                file.write("{'a': 0}\n")
+            with self.assertRaises(JSONParseError):
+                Collection.open(fn, mode='rb', workers=2)
+
 
 class BinaryFileCollectionTest(CollectionTest):
     mode = 'wb'
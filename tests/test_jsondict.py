@@ -2,9 +2,12 @@
 # All rights reserved.
 # This software is licensed under the BSD 3-Clause License.
 import os
+import json
+import time
 import unittest
 import uuid
 
+from signac.core import jsondict
 from signac.core.jsondict import JSONDict
 from signac.common import six
 from signac.errors import InvalidKeyError
@@ -28,6 +31,20 @@ class BaseJSONDictTest(unittest.TestCase):
         self._fn_dict = os.path.join(self._tmp_dir.name, FN_DICT)
         self.addCleanup(self._tmp_dir.cleanup)
 
+    def _age(self, seconds):
+        "Move the file's modification time into the past."
+        t = time.time() - seconds
+        os.utime(self._fn_dict, (t, t))
+
+
+class _CountingJSONDict(JSONDict):
+    "A JSONDict that counts the number of loads."
+    loaded = 0
+
+    def _load(self):
+        type(self).loaded += 1
+        return super(_CountingJSONDict, self)._load()
+
 
 class JSONDictTest(BaseJSONDictTest):
 
@@ -226,6 +243,51 @@ class JSONDictTest(BaseJSONDictTest):
             self.assertNotIn(key, b)
         self.assertNotIn(key, jsd)
 
+    def test_nested_access_reload(self):
+        jsd = self.get_json_dict()
+        jsd['a'] = dict(b=dict(c=0))
+        a = jsd.a
+        jsd2 = self.get_json_dict()
+        jsd2.a.b.c = 1
+        self.assertEqual(jsd.a.b.c, 1)
+        self.assertEqual(a.b.c, 1)
+        jsd2.a.b.c = 2
+        self.assertEqual(a.b.c, 2)
+
+    def test_nested_access_coalesced(self):
+        jsd = self.get_json_dict()
+        jsd['a'] = dict(b=dict(c=[0]))
+        self._age(10)
+        jsd = _CountingJSONDict(filename=self._fn_dict)
+        _CountingJSONDict.loaded = 0
+        self.assertEqual(jsd.a.b.c[0], 0)
+        self.assertEqual(_CountingJSONDict.loaded, 1)
+        x = jsd.a
+        self.assertEqual(x.b, {'c': [0]})
+        self.assertEqual(_CountingJSONDict.loaded, 2)
+        self.assertEqual(x.b, {'c': [0]})
+        self.assertEqual(_CountingJSONDict.loaded, 3)
+        # Modifications always load the data:
+        x = jsd.a
+        x.d = 0
+        self.assertEqual(_CountingJSONDict.loaded, 5)
+
+    def test_nested_access_external_modification(self):
+        jsd = self.get_json_dict()
+        jsd['a'] = dict(b=0)
+        self._age(10)
+        x = jsd.a
+        with open(self._fn_dict, 'wb') as file:
+            file.write(json.dumps({'a': {'b': 2}, 'z': 'external'}).encode())
+        self._age(5)
+        self.assertEqual(x.b, 2)
+        x = jsd.a
+        with open(self._fn_dict, 'wb') as file:
+            file.write(json.dumps({'a': {'b': 0}, 'z': 'external'}).encode())
+        self._age(1)
+        x['b'] = 1
+        self.assertEqual(jsd(), {'a': {'b': 1}, 'z': 'external'})
+
     def test_keys_with_dots(self):
         jsd = self.get_json_dict()
         with self.assertRaises(InvalidKeyError):
@@ -249,5 +311,60 @@ class JSONDictNestedDataWriteConcernTest(JSONDictNestedDataTest, JSONDictWriteCo
     pass
 
 
+class JSONDictReadCacheTest(JSONDictNestedDataTest):
+
+    def get_json_dict(self):
+        return JSONDict(filename=self._fn_dict, write_concern=True, cache=True)
+
+    def setUp(self):
+        super(JSONDictReadCacheTest, self).setUp()
+        jsondict._READ_CACHE.clear()
+        self.addCleanup(jsondict._READ_CACHE.clear)
+
+    def test_read_cache(self):
+        jsd = self.get_json_dict()
+        jsd['a'] = self.get_testdata()
+        d = jsd()
+        # Recently modified files are not cached.
+        self.assertEqual(jsd(), d)
+        self.assertNotIn(jsd._filename, jsondict._READ_CACHE._entries)
+        self._age(10)
+        self.assertEqual(jsd(), d)
+        self.assertIn(jsd._filename, jsondict._READ_CACHE._entries)
+        # Other instances are served from the cache.
+        jsd2 = self.get_json_dict()
+        self.assertEqual(jsd2(), d)
+        self.assertEqual(jsd2._cache_key, jsd._cache_key)
+        # External modifications are detected.
+        d2 = dict(a=self.get_testdata())
+        with open(self._fn_dict, 'wb') as file:
+            file.write(jsondict.json.dumps(d2).encode())
+        self._age(5)
+        self.assertEqual(jsd(), d2)
+        self.assertEqual(jsd2(), d2)
+        # Writes invalidate the cache.
+        jsd2['a'] = self.get_testdata()
+        self.assertNotIn(jsd._filename, jsondict._READ_CACHE._entries)
+        self.assertEqual(jsd(), jsd2())
+        os.remove(self._fn_dict)
+        self.assertEqual(len(jsd), 0)
+
+    def test_read_cache_eviction(self):
+        cache = jsondict._ReadCache(max_size=10)
+        cache.put('a', 0, b'12345')
+        cache.put('b', 0, b'12345')
+        self.assertEqual(cache.get('a', 0), b'12345')
+        cache.put('c', 0, b'123')
+        self.assertIsNone(cache.get('b', 0))
+        self.assertEqual(cache.get('a', 0), b'12345')
+        self.assertIsNone(cache.get('c', 1))
+        self.assertIsNone(cache.get('c', 0))
+        self.assertEqual(cache.size, 5)
+        cache.put('d', 0, b'12345678901')
+        self.assertIsNone(cache.get('d', 0))
+        cache.discard('a')
+        self.assertEqual(cache.size, 0)
+
+
 if __name__ == '__main__':
     unittest.main()
@@ -8,6 +8,7 @@ import warnings
 import logging
 import json
 import pickle
+import time
 from tarfile import TarFile
 from zipfile import ZipFile
 
@@ -25,8 +26,10 @@ from test_job import BaseJobTest
 if six.PY2:
     logging.basicConfig(level=logging.WARNING)
     from tempdir import TemporaryDirectory
+    import mock
 else:
     from tempfile import TemporaryDirectory
+    from unittest import mock
 
 try:
     import pandas  # noqa
@@ -247,6 +250,94 @@ class ProjectTest(BaseProjectTest):
         for job_id in self.project.find_job_ids(index=index):
             self.assertEqual(self.project.open_job(id=job_id).get_id(), job_id)
 
+    def test_find_job_ids_job_document_cache(self):
+        if self.project.Job is not signac.contrib.job.Job:
+            self.skipTest("The job document cache is only used with the default job class.")
+        for i in range(5):
+            self.project.open_job({'a': i}).document['b'] = i
+        # Age the documents, such that they are eligible for caching.
+        past = time.time() - 60
+        for job in self.project:
+            os.utime(job.fn(job.FN_DOCUMENT), (past, past))
+        self.project.update_cache()
+        self.assertTrue(self.project.isfile(self.project.FN_DOC_CACHE))
+        project = type(self.project).get_project(root=self.project.root_directory())
+        self.assertEqual(len(project._read_doc_cache()), 5)
+        self.assertEqual(len(project.find_job_ids(doc_filter={'b': 0})), 1)
+        job = project.open_job({'a': 0})
+        job.document['b'] = 10
+        self.assertEqual(len(project.find_job_ids(doc_filter={'b': 0})), 0)
+        self.assertEqual(len(project.find_job_ids(doc_filter={'b': 10})), 1)
+        job.remove()
+        self.assertEqual(len(project.find_job_ids(doc_filter={'b': 10})), 0)
+        self.assertEqual(len(project._read_doc_cache()), 4)
+
+    def test_update_cache_log(self):
+        for i in range(3):
+            self.project.open_job({'a': i}).init()
+        self.project.update_cache()
+        self.project.compact_cache()
+        self.assertTrue(self.project.isfile(self.project.FN_CACHE))
+        self.assertFalse(self.project.isfile(self.project.FN_CACHE_LOG))
+        self.project.open_job({'a': 3}).init()
+        self.project.open_job({'a': 0}).remove()
+        self.assertEqual(self.project.update_cache(), 3)
+        self.assertTrue(self.project.isfile(self.project.FN_CACHE_LOG))
+        # A partially written segment is ignored.
+        with open(self.project.fn(self.project.FN_CACHE_LOG), 'a') as logfile:
+            logfile.write('{"add": {')
+        project = type(self.project).get_project(root=self.project.root_directory())
+        self.assertEqual(set(project._read_cache()), set(self.project.find_job_ids()))
+        self.assertGreater(project._cache_num_segments, 0)
+        project.compact_cache()
+        self.assertFalse(project.isfile(project.FN_CACHE_LOG))
+        self.assertEqual(set(project._read_cache()), set(self.project.find_job_ids()))
+
+    def test_update_cache_after_torn_segment(self):
+        for i in range(3):
+            self.project.open_job({'a': i}).init()
+        self.project.update_cache()
+        self.project.open_job({'a': 3}).init()
+        self.project.update_cache()
+        with open(self.project.fn(self.project.FN_CACHE_LOG), 'a') as logfile:
+            logfile.write('{"add": {')
+        self.project.open_job({'a': 4}).init()
+        self.project.update_cache()
+        project = type(self.project).get_project(root=self.project.root_directory())
+        self.assertEqual(set(project._read_cache()), set(self.project.find_job_ids()))
+
+    def test_update_cache_incremental(self):
+        for i in range(3):
+            self.project.open_job({'a': i}).init()
+        self.project.update_cache()
+        read_cache, get_job_document = self.project._read_cache, self.project._get_job_document
+        calls = []
+
+        def _read_cache():
+            calls.append(None)
+            return read_cache()
+
+        def _get_job_document(wd, _id):
+            calls.append(_id)
+            return get_job_document(wd, _id)
+
+        self.project._read_cache = _read_cache
+        self.project._get_job_document = _get_job_document
+        job = self.project.open_job({'a': 3})
+        job.init()
+        self.project.update_cache()
+        # Neither the cache nor the documents of other jobs are read.
+        self.assertLessEqual(set(calls), {job.get_id()})
+        self.assertEqual(self.project._get_cache_ids(), set(self.project.find_job_ids()))
+        # The cache is re-read after external modifications.
+        project = type(self.project).get_project(root=self.project.root_directory())
+        project.open_job({'a': 4}).init()
+        project.update_cache()
+        del calls[:]
+        self.project.update_cache()
+        self.assertIn(None, calls)
+        self.assertEqual(self.project._get_cache_ids(), set(project.find_job_ids()))
+
     def test_find_jobs(self):
         statepoints = [{'a': i} for i in range(5)]
         for sp in statepoints:
@@ -256,6 +347,23 @@ class ProjectTest(BaseProjectTest):
         self.assertEqual(1, len(list(self.project.find_jobs({'a': 0}))))
         self.assertEqual(0, len(list(self.project.find_jobs({'a': 5}))))
 
+    def test_find_jobs_ids(self):
+        for i in range(5):
+            self.project.open_job({'a': i}).document['b'] = i
+        jobs = self.project.find_jobs({'a': {'$lt': 3}}, {'b': {'$gt': 0}})
+        self.assertEqual(set(jobs.ids), {job.get_id() for job in jobs})
+        self.assertEqual(len(jobs.ids), 2)
+        self.assertIs(jobs.ids, jobs.ids)
+        self.project.open_job({'a': 0}).document['b'] = 1
+        self.assertEqual(len(jobs), 2)
+        jobs.refresh()
+        self.assertEqual(len(jobs), 3)
+        self.project.open_job({'a': 1}).remove()
+        self.assertEqual(len(jobs), 2)
+        self.project.open_job({'a': -1}).init()
+        self.assertEqual(len(jobs), 2)
+        self.assertEqual(len(self.project.find_jobs()), 5)
+
     def test_find_jobs_next(self):
         statepoints = [{'a': i} for i in range(5)]
         for sp in statepoints:
@@ -339,6 +447,34 @@ class ProjectTest(BaseProjectTest):
             pass
         self.assertEqual(i, len(self.project) - 1)
 
+    def test_open_jobs(self):
+        statepoints = [{'a': i} for i in range(5)]
+        jobs = self.project.open_jobs(statepoints)
+        self.assertEqual(jobs, [self.project.open_job(sp) for sp in statepoints])
+        self.assertEqual(len(self.project), 0)
+
+    def test_init_jobs(self):
+        statepoints = [{'a': i, 'b': {'c': i}} for i in range(20)]
+        # Custom job classes may not be safe to initialize concurrently.
+        parallel = 4 if self.project.Job is signac.contrib.job.Job else 1
+        jobs = self.project.init_jobs(statepoints, parallel=parallel)
+        self.assertEqual(len(self.project), len(statepoints))
+        for sp, job in zip(statepoints, jobs):
+            self.assertEqual(job.statepoint(), sp)
+            self.assertIn(job, self.project)
+            self.assertEqual(self.project.open_job(id=job.get_id()), job)
+        # Initializing existing jobs has no effect.
+        self.project.init_jobs(statepoints[:10], parallel=parallel)
+        self.assertEqual(len(self.project), len(statepoints))
+        self.assertEqual(len(self.project.find_jobs({'b.c': {'$lt': 10}})), 10)
+
+    def test_init_jobs_repeated_statepoints(self):
+        parallel = 16 if self.project.Job is signac.contrib.job.Job else 1
+        statepoints = [{'a': -1, 'b': i % 5} for i in range(400)]
+        jobs = self.project.init_jobs(statepoints, parallel=parallel)
+        self.assertEqual(len(self.project), 5)
+        self.assertEqual([job.statepoint() for job in jobs], statepoints)
+
     def test_open_job_by_id(self):
         statepoints = [{'a': i} for i in range(5)]
         jobs = [self.project.open_job(sp) for sp in statepoints]
@@ -374,6 +510,68 @@ class ProjectTest(BaseProjectTest):
         with self.assertRaises(KeyError):
             self.project.open_job(id='abc')
 
+    def test_workspace_listing_cache(self):
+        for i in range(3):
+            self.project.open_job({'a': i}).init()
+        # Age the workspace, such that the listing is validated by the mtime.
+        past = time.time() - 60
+        os.utime(self.project.workspace(), (past, past))
+        self.assertEqual(len(self.project), 3)
+        # The workspace is modified without a change of the modification time.
+        project = type(self.project).get_project(root=self.project.root_directory())
+        project.open_job({'a': 10}).init()
+        os.utime(self.project.workspace(), (past, past))
+        self.assertEqual(len(self.project), 3)
+        self.project.open_job({'a': 3}).init()
+        self.assertEqual(len(self.project), 5)
+        self.assertIn(self.project.open_job({'a': 3}), self.project)
+        self.project.config['workspace_listing_ttl'] = 60
+        jobs = self.project.find_jobs()
+        self.assertEqual(len(jobs), 5)
+        # Jobs added or removed by this instance are visible immediately,
+        job = self.project.open_job({'a': 4})
+        job.init()
+        self.assertEqual(len(self.project), 6)
+        self.assertIn(job, self.project)
+        self.assertEqual(len(jobs), 6)
+        self.assertEqual(len(self.project.find_jobs({'a': 4})), 1)
+        # in contrast to jobs added by other instances.
+        project.open_job({'a': 5}).init()
+        self.assertEqual(len(self.project), 6)
+        self.assertNotIn(self.project.open_job({'a': 5}), self.project)
+        job.remove()
+        self.assertNotIn(job, self.project)
+        self.assertEqual(len(self.project.find_jobs({'a': 4})), 0)
+        self.assertEqual(len(jobs), 6)
+        self.project.config['workspace_listing_ttl'] = 0
+        self.assertEqual(len(self.project), 6)
+        self.assertIn(self.project.open_job({'a': 5}), self.project)
+
+    def test_document_read_cache(self):
+        self.assertFalse(self.project.document._cache)
+        self.assertFalse(self.project.open_job({'a': 0}).document._cache)
+        project = type(self.project).get_project(root=self.project.root_directory())
+        project.config['document_read_cache'] = 'true'
+        self.assertTrue(project.document._cache)
+        job = project.open_job({'a': 0})
+        self.assertTrue(job.document._cache)
+        job.doc.b = 0
+        past = time.time() - 60
+        os.utime(job.fn(job.FN_DOCUMENT), (past, past))
+        self.assertEqual(job.doc(), {'b': 0})
+        self.assertEqual(project.open_job({'a': 0}).doc(), {'b': 0})
+        self.assertEqual(list(project.find_job_ids(doc_filter={'b': 0})), [job.get_id()])
+
+    def test_min_len_unique_id(self):
+        self.assertEqual(self.project.min_len_unique_id(), 0)
+        for i in range(100):
+            self.project.open_job({'a': i}).init()
+            job_ids = list(self.project.find_job_ids())
+            n = self.project.min_len_unique_id()
+            self.assertEqual(len({_id[:n] for _id in job_ids}), len(job_ids))
+            if len(job_ids) > 1:
+                self.assertLess(len({_id[:n - 1] for _id in job_ids}), len(job_ids))
+
     def test_missing_statepoint_file(self):
         job = self.project.open_job(dict(a=0))
         job.init()
@@ -513,6 +711,19 @@ class ProjectTest(BaseProjectTest):
         self.assertEqual(len(docs), 2 * len(statepoints))
         self.assertEqual(len(set((doc['_id'] for doc in docs))), len(docs))
 
+    def test_index_parallel(self):
+        for i in range(20):
+            self.project.open_job({'a': i}).document['b'] = i
+        docs = list(self.project.index(parallel=1))
+        self.assertEqual(len(docs), 20)
+        self.assertEqual(list(self.project.index(parallel=4)), docs)
+        self.project.config['index_parallel'] = 4
+        self.assertEqual(list(self.project.index()), docs)
+        for doc in docs:
+            self.assertEqual(doc['b'], doc['statepoint']['a'])
+        self.assertEqual(len(self.project.find_job_ids(doc_filter={'b': {'$lt': 5}})), 5)
+        del self.project.config['index_parallel']
+
     def test_signac_project_crawler(self):
         statepoints = [{'a': i} for i in range(5)]
         for sp in statepoints:
@@ -793,6 +1004,32 @@ class ProjectTest(BaseProjectTest):
                 self.assertEqual(str(job), k)
         self.assertEqual(group_count, len(list(self.project.find_jobs())))
 
+    def test_jobs_distinct_group_count(self):
+        for i in range(12):
+            job = self.project.open_job({'a': i % 4, 'b': {'c': i % 2}, 'd': [i % 3]})
+            job.document['e'] = i % 3
+        self.assertEqual(sorted(self.project.distinct('a')), [0, 1, 2, 3])
+        self.assertEqual(sorted(self.project.distinct('b.c')), [0, 1])
+        self.assertEqual(sorted(self.project.distinct('d')), [[0], [1], [2]])
+        self.assertEqual(self.project.distinct('b'), [])
+        self.assertEqual(self.project.distinct('x'), [])
+        self.assertEqual(sorted(self.project.distinct('e', doc=True)), [0, 1, 2])
+        self.assertEqual(self.project.group_count('a'), {0: 3, 1: 3, 2: 3, 3: 3})
+        self.assertEqual(self.project.group_count(['a', 'b.c']),
+                         {(0, 0): 3, (1, 1): 3, (2, 0): 3, (3, 1): 3})
+        self.assertEqual(self.project.group_count('e', doc=True), {0: 4, 1: 4, 2: 4})
+        jobs = self.project.find_jobs({'a': {'$lt': 2}})
+        self.assertEqual(sorted(jobs.distinct('a')), [0, 1])
+        self.assertEqual(jobs.group_count('d'), {(0, ): 2, (1, ): 2, (2, ): 2})
+        jobs = self.project.find_jobs(doc_filter={'e': 0})
+        self.assertEqual(jobs.group_count('b.c'), {0: 2, 1: 2})
+        self.assertEqual(sum(jobs.group_count('a').values()), len(jobs))
+        # The search index is renewed when jobs are added or removed.
+        self.project.open_job({'a': 4}).init()
+        self.assertEqual(self.project.group_count('a')[4], 1)
+        self.project.open_job({'a': 0, 'b': {'c': 0}, 'd': [0]}).remove()
+        self.assertEqual(self.project.group_count('a')[0], 2)
+
     def test_jobs_groupbydoc(self):
         def get_doc(i):
             return {
@@ -1764,6 +2001,109 @@ class CachedProjectTest(ProjectTest):
         repr(self)
 
 
+@unittest.skipIf(not signac.contrib.metadata_store.SQLITE3, 'test requires sqlite3')
+class MetadataStoreProjectTest(ProjectTest):
+
+    def setUp(self):
+        super(MetadataStoreProjectTest, self).setUp()
+        self.project.update_metadata_store()
+
+    def test_find_job_ids_job_document_cache(self):
+        self.skipTest("Searches with document filters use the metadata store.")
+
+    def test_metadata_store_find_job_ids(self):
+        for i in range(10):
+            job = self.project.open_job({'a': i, 'b': {'c': str(i % 3)}, 'd': i / 2.0})
+            job.doc.e = bool(i % 2)
+        self.project.open_job({'a': 10, 'b': [1, 2], 'f': None}).init()
+        index = list(self.project.index(include_job_document=True))
+        for filter, doc_filter in (
+                ({'a': 1}, None),
+                ({'a': 1.0}, None),
+                ({'d': 1}, None),
+                ({'f': None}, None),
+                ({'b.c': '1'}, None),
+                ({'b': {'c': '1'}}, None),
+                ({'b': [1, 2]}, None),
+                ({'b': {'$exists': True}}, None),
+                ({'b.c': {'$exists': False}}, None),
+                ({'a': {'$gt': 3}}, {'e': True}),
+                ({'a': {'$lte': 3, '$gte': 1}}, None),
+                ({'b.c': {'$lt': '2'}}, None),
+                ({'f': {'$in': [1, 2, None]}}, None),
+                ({'a': {'$near': 2}}, None),
+                ({'$or': [{'a': 1}, {'b.c': '2'}]}, None),
+                ({'$or': [{'a': 1}, {'a': {'$regex': '2'}}]}, None),
+                ({'$and': [{'a': {'$gt': 1}}, {'a': {'$lt': 8}}]}, {'e': False}),
+                (None, {'$not': {'e': True}}),
+                (None, {'e': {'$ne': True}})):
+            self.assertEqual(
+                set(self.project.find_job_ids(filter, doc_filter)),
+                set(self.project.find_job_ids(filter, doc_filter, index=index)))
+
+    def test_metadata_store_sync(self):
+        job = self.project.open_job({'a': 0})
+        job.doc.b = 0
+        self.assertEqual(len(self.project.find_job_ids(doc_filter={'b': 0})), 1)
+        job.doc.b = 1
+        self.assertEqual(len(self.project.find_job_ids(doc_filter={'b': 0})), 0)
+        self.assertEqual(len(self.project.find_job_ids(doc_filter={'b': 1})), 1)
+        job.sp.a = 1
+        self.assertEqual(len(self.project.find_job_ids({'a': 0})), 0)
+        self.assertEqual(list(self.project.find_job_ids({'a': 1})), [job.get_id()])
+        # Jobs initialized outside of this project instance are found.
+        project = type(self.project).get_project(root=self.project.root_directory())
+        project.open_job({'a': 2}).init()
+        self.assertEqual(len(self.project.find_job_ids({'a': {'$gt': 0}})), 2)
+        job.remove()
+        self.assertEqual(len(self.project.find_job_ids({'a': {'$gt': 0}})), 1)
+        # Changes made directly to the workspace require an update.
+        job = self.project.open_job({'a': 2})
+        with open(job.fn(job.FN_DOCUMENT), 'w') as file:
+            file.write(json.dumps({'b': 2}))
+        self.assertEqual(len(self.project.find_job_ids(doc_filter={'b': 2})), 0)
+        self.assertEqual(self.project.update_metadata_store(), 1)
+        self.assertEqual(len(self.project.find_job_ids(doc_filter={'b': 2})), 1)
+
+    def test_metadata_store_large_integers(self):
+        for a in (2**63 - 1, 2**63, 2**63 + 1, 2**64, -2**63, -2**63 - 1):
+            self.project.open_job({'a': a}).init()
+        index = list(self.project.index())
+        for filter in (
+                {'a': 2**63 + 1},
+                {'a': {'$in': [2**63 + 1, 0]}},
+                {'a': {'$gt': 2**63}},
+                {'a': {'$gte': 2**63 + 1}},
+                {'a': {'$gt': float(2**63)}},
+                {'a': {'$lt': -2**63}},
+                {'a': {'$lte': 2**63 - 1}}):
+            self.assertEqual(
+                set(self.project.find_job_ids(filter)),
+                set(self.project.find_job_ids(filter, index=index)))
+        self.assertEqual(len(self.project.find_job_ids({'a': {'$gt': 2**63}})), 2)
+
+    def test_metadata_store_created_by_other_instance(self):
+        os.remove(self.project.fn(self.project.FN_METADATA_STORE))
+        project = type(self.project).get_project(root=self.project.root_directory())
+        job = project.open_job({'a': 0})
+        job.doc.b = 0
+        # Without a metadata store, saving a document does not access the file system.
+        with mock.patch.object(project, 'isfile', wraps=project.isfile) as isfile:
+            job.doc.b = 1
+        self.assertEqual(isfile.call_count, 0)
+        other = type(self.project).get_project(root=self.project.root_directory())
+        other.update_metadata_store()
+        job.doc.b = 2
+        self.assertEqual(len(project.find_job_ids(doc_filter={'b': 2})), 1)
+        self.assertEqual(len(other.find_job_ids(doc_filter={'b': 2})), 1)
+
+    def test_metadata_store_pickle_project(self):
+        self.project.open_job({'a': 0}).init()
+        self.assertEqual(len(self.project.find_job_ids({'a': 0})), 1)
+        project = pickle.loads(pickle.dumps(self.project))
+        self.assertEqual(len(project.find_job_ids({'a': 0})), 1)
+
+
 class ProjectInitTest(unittest.TestCase):
 
     def setUp(self):
@@ -3,11 +3,13 @@
 # This software is licensed under the BSD 3-Clause License.
 import os
 import json
+import time
 import unittest
 import subprocess
 
 import signac
 from signac.common import six
+from signac.contrib.server import UNIX_SOCKETS, query_server
 
 if six.PY2:
     from tempdir import TemporaryDirectory
@@ -180,6 +182,35 @@ class BasicShellTest(unittest.TestCase):
                           ['{"a": ' + str(i) + '}']).strip(),
                 list(project.find_job_ids(doc_filter={'a': i}))[0])
 
+    @unittest.skipIf(not UNIX_SOCKETS, 'test requires Unix domain sockets')
+    def test_serve(self):
+        self.call('python -m signac init my_project'.split())
+        project = signac.Project()
+        for i in range(3):
+            project.open_job({'a': i}).document['b'] = i
+        schema = self.call('python -m signac schema'.split())
+        self.assertIsNone(query_server(project, 'len'))
+        p = subprocess.Popen(
+            'python -m signac serve'.split(), stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        self.addCleanup(p.wait)
+        self.addCleanup(p.terminate)
+        for i in range(100):
+            if query_server(project, 'ping'):
+                break
+            time.sleep(0.1)
+        else:
+            self.fail("The index server did not start.")
+        self.assertEqual(query_server(project, 'len'), 3)
+        self.assertEqual(
+            set(query_server(project, 'find', doc_filter={'b': {'$lt': 2}})),
+            set(project.find_job_ids(doc_filter={'b': {'$lt': 2}})))
+        self.assertIsNone(query_server(project, 'find', filter={'$foo': 0}))
+        self.assertEqual(self.call('python -m signac schema'.split()), schema)
+        project.open_job({'a': 3}).init()
+        self.assertEqual(query_server(project, 'len'), 4)
+        out = self.call('python -m signac find'.split() + ['{"a": 3}']).strip()
+        self.assertEqual(out, project.open_job({'a': 3}).get_id())
+
     def test_remove(self):
         self.call('python -m signac init my_project'.split())
         project = signac.Project()